@@ -0,0 +1,267 @@
+"""An asyncio front end for fetching character pages politely and reliably.
+
+AsyncPageFetcher wraps a PageFetcher and adds, per host:
+    - a token bucket that caps the request rate, with some burst allowance
+    - a cap on the number of requests in flight at once
+    - a timeout on every attempt
+    - retries with jittered exponential backoff for timeouts, dropped
+      connections and 429/5xx responses, honouring Retry-After
+
+Requests themselves still go through the PageFetcher's pooled requests.Session
+on worker threads, so validators and conditional requests work the same way.
+BlockingFetcher runs an AsyncPageFetcher on a background event loop so the
+thread based RosterScraper, or anything else that expects a PageFetcher, can use it.
+"""
+import argparse
+import asyncio
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+import requests
+import pagefetcher
+import scrapemetrics
+
+class TokenBucket(object):
+    """Lets through rate requests a second on average, and up to burst at once
+
+    Args:
+        rate: The number of tokens added per second
+        burst: The most tokens the bucket holds
+    Raises:
+        ValueError: If rate isn't positive, since a bucket that never refills would wait forever
+    """
+    def __init__(self, rate, burst):
+        if not rate > 0:
+            raise ValueError("The rate of a token bucket must be positive, not {0}".format(rate))
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.__lock = asyncio.Lock()
+
+    async def acquire(self):
+        """Waits until a token is available and takes it
+
+        Returns:
+            The number of seconds spent waiting
+        """
+        waited = 0.0
+        async with self.__lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                delay = (1 - self.tokens) / self.rate
+                waited += delay
+                await asyncio.sleep(delay)
+
+def positive_rate(text):
+    """An argparse type for a --rate option, which has to be a positive number of requests a second"""
+    try:
+        rate = float(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError("{0} isn't a number".format(text))
+    if not 0 < rate < float("inf"):
+        raise argparse.ArgumentTypeError("the rate has to be a number more than 0, not {0}".format(text))
+    return rate
+
+class FetchOutcome(object):
+    """The result of fetching one character's page with AsyncPageFetcher.fetch_all
+
+    Args:
+        name: The name of the character
+        result: The FetchResult if the fetch succeeded, else None
+        error: The exception from the last attempt if every attempt failed, else None
+        attempts: The number of attempts made
+    """
+    def __init__(self, name, result=None, error=None, attempts=0):
+        self.name = name
+        self.result = result
+        self.error = error
+        self.attempts = attempts
+
+    @property
+    def ok(self):
+        return self.error is None
+
+class AsyncPageFetcher(object):
+    """Fetches pages concurrently without hammering the site
+
+    Args:
+        fetcher:
+            The PageFetcher that makes the requests. Defaults to a new PageFetcher.
+        rate:
+            The average number of requests a second allowed per host
+        burst:
+            The number of requests a host can get at once after being idle
+        per_host:
+            The most requests in flight to a single host
+        timeout:
+            Seconds before an attempt is abandoned and retried
+        retries:
+            The number of retries after the first attempt
+        backoff:
+            The base delay in seconds; retry n waits a random time up to backoff * 2**n
+        max_backoff:
+            The longest delay between attempts
+        metrics:
+            A scrapemetrics recorder that counts retries and times rate limit waits
+    """
+    retry_statuses = frozenset([429, 500, 502, 503, 504])
+
+    def __init__(self, fetcher=None, rate=5.0, burst=5, per_host=4, timeout=20.0, retries=4, backoff=0.5,
+                 max_backoff=30.0, metrics=None):
+        self.fetcher = fetcher if fetcher is not None else pagefetcher.PageFetcher(timeout=timeout)
+        self.rate = rate
+        self.burst = burst
+        self.per_host = per_host
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.metrics = metrics if metrics is not None else scrapemetrics.disabled
+        # Created lazily so they belong to the loop that's running the fetches
+        self.__buckets = {}
+        self.__slots = {}
+
+    async def fetch(self, char_name, url, conditional=True):
+        """Fetches a page, retrying transient failures. Matches PageFetcher.fetch.
+
+        Args:
+            char_name: The name of the character
+            url: The url of the character's frame data page
+            conditional: Whether to make a conditional request
+        Returns:
+            A FetchResult for the page
+        Raises:
+            The exception from the last attempt if every attempt failed
+        """
+        return (await self.__with_retries(char_name, url, self.fetcher.fetch, char_name, url, conditional))[0]
+
+    async def fetch_asset(self, url):
+        """Downloads a binary file with the same throttling and retries as pages
+
+        Args:
+            url: The url of the file
+        Returns:
+            The file's bytes
+        """
+        return (await self.__with_retries(None, url, self.fetcher.fetch_asset, url))[0]
+
+    async def fetch_all(self, pages):
+        """Fetches many pages at once. A failed page doesn't stop the others.
+
+        Args:
+            pages: A list of (character name, url, conditional) tuples
+        Returns:
+            A list of FetchOutcome objects in the same order as pages
+        """
+        async def fetch_one(char_name, url, conditional):
+            try:
+                result, attempts = await self.__with_retries(
+                    char_name, url, self.fetcher.fetch, char_name, url, conditional)
+                return FetchOutcome(char_name, result, attempts=attempts)
+            except Exception as ex:
+                return FetchOutcome(char_name, error=ex, attempts=getattr(ex, "attempts", self.retries + 1))
+        return await asyncio.gather(*(fetch_one(*page) for page in pages))
+
+    def save_validators(self):
+        self.fetcher.save_validators()
+
+    async def __with_retries(self, char_name, url, request_function, *args):
+        """Runs request_function(*args) on a worker thread under the host's
+        limits, retrying transient failures
+
+        Returns:
+            A (result, attempts) tuple
+        """
+        host = urlsplit(url).netloc
+        if host not in self.__buckets:
+            self.__buckets[host] = TokenBucket(self.rate, self.burst)
+            self.__slots[host] = asyncio.Semaphore(self.per_host)
+        loop = asyncio.get_running_loop()
+
+        slot = self.__slots[host]
+        attempt = 0
+        while True:
+            attempt += 1
+            retry_after = None
+            await slot.acquire()
+            request = None
+            try:
+                waited = await self.__buckets[host].acquire()
+                if waited:
+                    self.metrics.record("rate_limit_wait", waited, char_name)
+                request = loop.run_in_executor(None, request_function, *args)
+                # Shielded so a timeout abandons the attempt without pretending
+                # its thread stopped. The PageFetcher's own timeout ends it.
+                return await asyncio.wait_for(asyncio.shield(request), self.timeout), attempt
+            except Exception as ex:
+                if attempt > self.retries or not self.__is_transient(ex):
+                    ex.attempts = attempt
+                    raise
+                retry_after = self.__retry_after(ex)
+            finally:
+                # An abandoned request keeps its slot until its thread is done,
+                # so a slow host never has more than per_host requests running
+                if request is None or request.done():
+                    slot.release()
+                else:
+                    request.add_done_callback(lambda done: self.__release_abandoned(slot, done))
+            self.metrics.count("retries", 1, char_name)
+            # Full jitter keeps a batch of failed requests from retrying in lockstep
+            delay = random.uniform(0, min(self.max_backoff, self.backoff * 2 ** (attempt - 1)))
+            if retry_after is not None:
+                delay = max(delay, min(self.max_backoff, retry_after))
+            await asyncio.sleep(delay)
+
+    def __release_abandoned(self, slot, request):
+        if not request.cancelled():
+            # Nobody is waiting on the result anymore, so don't let asyncio
+            # complain that its exception was never retrieved
+            request.exception()
+        slot.release()
+
+    def __is_transient(self, ex):
+        if isinstance(ex, requests.HTTPError):
+            return ex.response is not None and ex.response.status_code in self.retry_statuses
+        return isinstance(ex, (asyncio.TimeoutError, requests.ConnectionError, requests.Timeout))
+
+    def __retry_after(self, ex):
+        response = getattr(ex, "response", None)
+        if response is None:
+            return None
+        try:
+            return float(response.headers.get("Retry-After"))
+        except (TypeError, ValueError):
+            return None
+
+class BlockingFetcher(object):
+    """Runs an AsyncPageFetcher on its own event loop thread and exposes the
+    blocking fetch of a PageFetcher, so the throttling and retries apply to
+    every thread that shares it
+
+    Args:
+        async_fetcher: The AsyncPageFetcher to run
+    """
+    def __init__(self, async_fetcher):
+        self.async_fetcher = async_fetcher
+        self.loop = asyncio.new_event_loop()
+        self.__thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.__thread.start()
+
+    def fetch(self, char_name, url, conditional=True):
+        future = asyncio.run_coroutine_threadsafe(self.async_fetcher.fetch(char_name, url, conditional), self.loop)
+        return future.result()
+
+    def save_validators(self):
+        self.async_fetcher.save_validators()
+
+    def close(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.__thread.join()
+        self.loop.close()
@@ -0,0 +1,117 @@
+"""Freezes character pages into benchmarks/corpus so parser benchmarks run
+offline against the exact same html on every branch.
+
+The corpus is a directory of <character>.html files and a manifest.json of
+each page's sha256, which load_corpus checks so an edited page can't quietly
+skew a comparison. Pages are copied out of the page cache, or downloaded
+with --fetch.
+
+The checked in corpus was generated by benchmarks/fixturepages.py, since the
+site couldn't be reached when it was frozen. Refreeze it with --fetch to
+benchmark against the real pages.
+
+Usage:
+    python benchmarks/corpus.py [--cache-dir page_cache] [--fetch] [--corpus-dir benchmarks/corpus] [character ...]
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+import pagecache
+import pagefetcher
+import scrapeengine as engine
+
+default_corpus_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'corpus')
+manifest_filename = 'manifest.json'
+
+# The pages that have tripped up the parsers before: bowser's extra section,
+# cloud's limit rows, terry's odd specials and dodge, the Miis' special lists,
+# and kirby's throws with active frames. mario is the plain baseline.
+default_characters = (
+    "mario", "bowser", "cloud", "terry", "kirby", "mii_brawler", "mii_swordfighter", "mii_gunner"
+)
+
+class CorpusError(Exception):
+    """Raised when the corpus is missing pages or a page doesn't match the manifest"""
+    pass
+
+def freeze_corpus(pages, corpus_dir=default_corpus_dir):
+    """Writes pages into the corpus and records their hashes in the manifest
+
+    Args:
+        pages: A list of (character name, html) tuples
+        corpus_dir: The corpus directory
+    """
+    os.makedirs(corpus_dir, exist_ok=True)
+    manifest_path = os.path.join(corpus_dir, manifest_filename)
+    manifest = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as manifest_file:
+            manifest = json.load(manifest_file)
+
+    for name, html in pages:
+        data = html.encode('utf-8')
+        with open(os.path.join(corpus_dir, name + '.html'), 'wb') as page_file:
+            page_file.write(data)
+        manifest[name] = hashlib.sha256(data).hexdigest()
+
+    with open(manifest_path, 'w') as manifest_file:
+        json.dump(manifest, manifest_file, indent=2, sort_keys=True)
+
+def load_corpus(corpus_dir=default_corpus_dir, characters=None):
+    """Reads the frozen pages, checking each one against the manifest
+
+    Args:
+        corpus_dir: The corpus directory
+        characters: The characters to load. Defaults to every page in the manifest.
+    Returns:
+        A list of (character name, html) tuples, in the order asked for or sorted by name
+    """
+    manifest_path = os.path.join(corpus_dir, manifest_filename)
+    if not os.path.exists(manifest_path):
+        raise CorpusError("There's no corpus in {0}, freeze one with benchmarks/corpus.py".format(corpus_dir))
+    with open(manifest_path) as manifest_file:
+        manifest = json.load(manifest_file)
+
+    pages = []
+    for name in characters or sorted(manifest):
+        if name not in manifest:
+            raise CorpusError("{0} isn't in the corpus".format(name))
+        with open(os.path.join(corpus_dir, name + '.html'), 'rb') as page_file:
+            data = page_file.read()
+        if hashlib.sha256(data).hexdigest() != manifest[name]:
+            raise CorpusError("{0}.html doesn't match the corpus manifest".format(name))
+        pages.append((name, data.decode('utf-8')))
+    return pages
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Freeze character pages into the benchmark corpus")
+    arg_parser.add_argument("characters", nargs="*", help="Characters to freeze (defaults to the awkward pages)")
+    arg_parser.add_argument("--cache-dir", default=os.path.join(os.path.dirname(engine.__file__), 'page_cache'))
+    arg_parser.add_argument("--fetch", action="store_true", help="Download the pages instead of reading the page cache")
+    arg_parser.add_argument("--corpus-dir", default=default_corpus_dir)
+    args = arg_parser.parse_args()
+
+    cache = None if args.fetch else pagecache.PageCache(args.cache_dir)
+    fetcher = pagefetcher.PageFetcher() if args.fetch else None
+    pages = []
+    for name in args.characters or default_characters:
+        if fetcher is not None:
+            html = fetcher.fetch(name, engine.ScrapeEngine(name).get_page_url(), conditional=False).html
+        else:
+            html = cache.get(name, allow_stale=True)
+        if html is None:
+            print("{0} is not in the page cache, skipping".format(name), file=sys.stderr)
+        else:
+            pages.append((name, html))
+
+    freeze_corpus(pages, args.corpus_dir)
+    print("Froze {0} pages into {1}".format(len(pages), args.corpus_dir))
+    return 0 if pages else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,66 @@
+"""Parses the same saved character pages with every parse engine, checks that
+they produce identical DTOs and reports how long each engine took.
+
+Usage:
+    python benchmarks/engines.py [--cache-dir page_cache] [character ...]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+import lxmlengine
+import pagecache
+import scrapeengine as engine
+
+def character_signature(char):
+    """Flattens a Character DTO into plain data that can be compared across engines"""
+    sections = {}
+    for section, moves in char.section_moves.items():
+        sections[section] = [(type(m).__name__, m.to_action_dict()) for m in moves]
+    return {"sections": sections, "misc": char.misc_data.to_attributes_dict()}
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Cross-check and time the parse engines on cached pages")
+    arg_parser.add_argument("characters", nargs="*", help="Characters to parse (defaults to every cached page)")
+    arg_parser.add_argument("--cache-dir", default=os.path.join(os.path.dirname(engine.__file__), 'page_cache'))
+    args = arg_parser.parse_args()
+
+    cache = pagecache.PageCache(args.cache_dir)
+    pages = []
+    for name in args.characters or sorted(cache.index):
+        html = cache.get(name, allow_stale=True)
+        if html is None:
+            print("{0} is not in the page cache, skipping".format(name), file=sys.stderr)
+        else:
+            pages.append((name, html))
+    if not pages:
+        # Nothing compared is not the same as nothing differing
+        print("No pages to parse in {0}".format(args.cache_dir), file=sys.stderr)
+        return 1
+
+    report = {"pages": len(pages), "seconds": {}, "mismatches": []}
+    signatures = {}
+    for engine_name, engine_class in sorted(lxmlengine.engines.items()):
+        start = time.perf_counter()
+        parsed = []
+        for name, html in pages:
+            scraper = engine_class(name)
+            parsed.append(scraper.get_frame_data(scraper.parse_page(html)))
+        report["seconds"][engine_name] = time.perf_counter() - start
+        signatures[engine_name] = [character_signature(c) for c in parsed]
+
+    baseline_name = "bs4"
+    for engine_name, engine_signatures in signatures.items():
+        for (name, _), expected, actual in zip(pages, signatures[baseline_name], engine_signatures):
+            if expected != actual:
+                report["mismatches"].append({"engine": engine_name, "character": name})
+
+    print(json.dumps(report, indent=2))
+    return 1 if report["mismatches"] else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
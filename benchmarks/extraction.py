@@ -0,0 +1,79 @@
+"""Benchmarks the single pass MoveContainerExtractor against the per-class
+lookups of AttackDataParser on the same saved character pages.
+
+Usage:
+    python benchmarks/extraction.py [--cache-dir page_cache] [--repeat 5] [character ...]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+import dataparser as hdp
+import pagecache
+import scrapeengine as engine
+
+def get_move_containers(char_name, html):
+    scraper = engine.ScrapeEngine(char_name)
+    sections = scraper.get_sections(scraper.parse_page(html))
+    containers = []
+    # The misc section doesn't go through move extraction
+    for section in sections[:5]:
+        containers.extend(section.find_all("div", class_="movecontainer"))
+    return containers
+
+def time_extraction(extract, containers, repeat):
+    """Returns the best time of extracting every container, out of repeat runs"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for container in containers:
+            extract(container)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Compare move extraction paths on cached pages")
+    arg_parser.add_argument("characters", nargs="*", help="Characters to benchmark (defaults to every cached page)")
+    arg_parser.add_argument("--cache-dir", default=os.path.join(os.path.dirname(engine.__file__), 'page_cache'))
+    arg_parser.add_argument("--repeat", type=int, default=5)
+    args = arg_parser.parse_args()
+
+    cache = pagecache.PageCache(args.cache_dir)
+    names = args.characters or sorted(cache.index)
+    extractor = engine.ScrapeEngine.move_extractor
+    html_classes = engine.ScrapeEngine.html_classes
+
+    def legacy(container):
+        return hdp.AttackDataParser(container).get_move_data(html_classes)
+
+    report = {"pages": 0, "moves": 0, "legacy_seconds": 0.0, "single_pass_seconds": 0.0, "mismatches": []}
+    for name in names:
+        html = cache.get(name, allow_stale=True)
+        if html is None:
+            print("{0} is not in the page cache, skipping".format(name), file=sys.stderr)
+            continue
+        containers = get_move_containers(name, html)
+        for container in containers:
+            if legacy(container) != extractor.extract(container):
+                report["mismatches"].append(name)
+                break
+        report["pages"] += 1
+        report["moves"] += len(containers)
+        report["legacy_seconds"] += time_extraction(legacy, containers, args.repeat)
+        report["single_pass_seconds"] += time_extraction(extractor.extract, containers, args.repeat)
+
+    if not report["pages"]:
+        print("No pages to extract in {0}".format(args.cache_dir), file=sys.stderr)
+        return 1
+    if report["single_pass_seconds"]:
+        report["speedup"] = report["legacy_seconds"] / report["single_pass_seconds"]
+    print(json.dumps(report, indent=2))
+    return 1 if report["mismatches"] else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,184 @@
+"""Generates stand-in character pages in the site's markup, for the frozen
+benchmark corpus and for running the whole pipeline offline.
+
+The pages aren't copies of the site: they're built here from the markup the
+parsers expect (the 'moves' sections, movecontainer fields, hitbox links and
+the em dash separated misc rows) and reproduce the layouts that have tripped
+the parsers up before:
+    bowser              a section of one-off information before his moves
+    cloud               Limit Break values in the misc rows
+    terry               a spot dodge attack with frame data, and named specials
+    kirby               throws with active frames (every grab has them too)
+    mii_brawler         a long list of specials
+    mii_swordfighter    counters without shield data, which are laid out like dodges
+    mii_gunner          a long list of specials
+Every other character gets the plain layout. Frame values are varied per
+character so the pages don't all parse to the same numbers.
+
+Once the site can be reached, benchmarks/corpus.py --fetch replaces the
+corpus with real pages.
+
+Usage:
+    python benchmarks/fixturepages.py [--corpus-dir benchmarks/corpus] [character ...]
+    python benchmarks/fixturepages.py --page-cache page_cache
+"""
+import argparse
+import hashlib
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+import corpus
+import pagecache
+
+em_dash = u'—'
+roster_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'characters.txt')
+
+ground_moves = ("Jab 1", "Jab 2", "Forward Tilt", "Up Tilt", "Down Tilt", "Dash Attack",
+                "Forward Smash", "Up Smash", "Down Smash")
+aerial_moves = ("Neutral Air", "Forward Air", "Back Air", "Up Air", "Down Air")
+specials = {
+    "terry": ("Neutral B (Power Wave)", "Side B Forward (Burning Knuckle)", "Side B Back (Crack Shoot)",
+              "Up B (Rising Tackle)", "Down B (Power Dunk)"),
+    "mii_brawler": ("Shot Put", "Flashing Mach Punch", "Exploding Side Kick", "Onslaught", "Burning Dropkick",
+                    "Suplex", "Soaring Axe Kick", "Helicopter Kick", "Thrust Uppercut", "Head-On Assault",
+                    "Feint Jump", "Counter Throw"),
+    "mii_swordfighter": ("Gale Strike", "Shuriken of Light", "Blurring Blade", "Airborne Assault",
+                         "Gale Stab", "Chakram", "Stone Scabbard", "Skyward Slash Dash", "Hero's Spin",
+                         "Blade Counter", "Reversal Slash", "Power Thrust"),
+    "mii_gunner": ("Charge Blast", "Laser Blaze", "Grenade Launch", "Flame Pillar", "Stealth Burst",
+                   "Gunner Missile", "Lunar Launch", "Cannon Jump Kick", "Arm Rocket", "Echo Reflector",
+                   "Bomb Drop", "Absorbing Vortex")
+}
+default_specials = ("Neutral B", "Side B", "Up B", "Down B")
+# Specials that have no hitbox or shield data on the page
+counters = frozenset(["Blade Counter", "Reversal Slash"])
+dodges = ("Spot Dodge", "Forward Roll", "Back Roll", "Air Dodge, Neutral", "Air Dodge, Down",
+          "Air Dodge, Diagonally Down", "Air Dodge, Left/Right", "Air Dodge, Up", "Air Dodge, Diagonally Up")
+
+def character_offset(name):
+    """A small number that varies the frame values from character to character"""
+    return hashlib.sha256(name.encode('utf-8')).digest()[0] % 5
+
+def move_container(name, fields, hitboxes=1):
+    slug = "".join(c for c in name.lower() if c.isalnum())
+    inner = '<div class="movename"> {0} </div>'.format(name)
+    for html_class, value in fields:
+        inner += '<div class="{0}"> {1} </div>'.format(html_class, value)
+    links = "".join('<a class="hitboximg" data-featherlight=" https://ultimateframedata.com/hitboxes/{0}{1}.gif ">'
+                    'Hitbox</a>'.format(slug, i) for i in range(hitboxes))
+    return '<div class="movecontainer">{0}<div class="hitbox">{1}</div></div>\n'.format(inner, links)
+
+def attack(name, startup, landing_lag="--", damage="4.0%", active=None, advantage="-20"):
+    active = active if active is not None else "{0}-{1}".format(startup, startup + 2)
+    return move_container(name, [
+        ("startup", startup), ("totalframes", startup + 25), ("landinglag", landing_lag),
+        ("notes", "Some notes about {0}".format(name)), ("basedamage", damage), ("shieldlag", 4),
+        ("shieldstun", 3), ("whichhitbox", "--"), ("advantage", advantage), ("activeframes", active)
+    ])
+
+def fixture_page(name):
+    """Builds the stand-in page of a character
+
+    Args:
+        name: The character's name as in characters.txt
+    Returns:
+        The html of the page
+    """
+    offset = character_offset(name)
+    sections = []
+    if name == "bowser":
+        sections.append('<div class="movecontainer plain">Bowser has a tough guy mechanic</div>')
+    sections.append("".join(attack(m, 3 + offset + i) for i, m in enumerate(ground_moves)))
+    sections.append("".join(attack(m, 5 + offset + i, landing_lag=8 + i) for i, m in enumerate(aerial_moves)))
+
+    special_html = ""
+    for i, move in enumerate(specials.get(name, default_specials)):
+        if move in counters:
+            special_html += move_container(move, [("totalframes", 60), ("landinglag", "--"),
+                                                  ("notes", "Counters on frames 6-28")], hitboxes=0)
+        elif move == "Side B Forward (Burning Knuckle)":
+            special_html += attack(move, 14 + offset, damage="14 (Hit 1), 17", active="14-17/18-25")
+        else:
+            special_html += attack(move, 10 + offset + i, active="{0}-{1}/{2}-{3}".format(
+                10 + offset + i, 12 + offset + i, 20 + i, 23 + i), advantage="-8 to -4")
+    sections.append(special_html)
+
+    throws = ""
+    for move, startup in (("Grab", 6), ("Dash Grab", 9), ("Pivot Grab", 10)):
+        throws += move_container(move, [("startup", startup), ("totalframes", 30 + startup), ("landinglag", "--"),
+                                        ("notes", "Grab"), ("basedamage", "--"),
+                                        ("activeframes", "{0}-{1}".format(startup, startup + 1))])
+    throws += move_container("Pummel", [("startup", 1), ("totalframes", 7), ("landinglag", "--"),
+                                        ("notes", "Pummel"), ("basedamage", "1.3%")])
+    for i, move in enumerate(("Forward Throw", "Back Throw", "Up Throw", "Down Throw")):
+        fields = [("startup", 12 + i), ("totalframes", 30 + offset), ("landinglag", "--"),
+                  ("notes", "Throw"), ("basedamage", "{0}%".format(7 + i))]
+        if name == "kirby":
+            fields.append(("activeframes", "{0}-{1}".format(12 + i, 14 + i)))
+        throws += move_container(move, fields)
+    sections.append(throws)
+
+    dodge_html = "".join(move_container(m, [("totalframes", 27 + offset), ("landinglag", "--"),
+                                            ("notes", "Intangible 3-17")], hitboxes=0) for m in dodges)
+    if name == "terry":
+        dodge_html += move_container("Spot Dodge Attack", [("totalframes", 27), ("landinglag", "--"),
+                                                           ("notes", "Armor"), ("startup", 4),
+                                                           ("activeframes", "4-6"), ("advantage", -3)])
+    sections.append(dodge_html)
+
+    rows = [
+        "Weight {0} {1}".format(em_dash, 90 + offset * 5),
+        "Gravity {0} 0.1{1}".format(em_dash, offset),
+        "Walk Speed {0} 1.{1}".format(em_dash, offset),
+        "Run Speed {0} 1.8".format(em_dash),
+        "Initial Dash {0} 2.1".format(em_dash),
+        "Air Speed {0} 1.0".format(em_dash),
+        "Total Air Acceleration {0} 0.08".format(em_dash),
+        "SH / FH / SHFF / FHFF Frames {0} 39 frames / 53 frames / 27 frames / 37 frames".format(em_dash),
+        "Fall Speed / Fast Fall Speed {0} 1.6 / 2.5".format(em_dash),
+        "Shield Grab (Grab, post-Shieldstun) {0} {1} frames".format(em_dash, 8 + offset),
+        "Shield Drop {0} 11 frames".format(em_dash),
+        "Jump Squat (pre-jump frames) {0} 3 frames".format(em_dash)
+    ]
+    if name == "cloud":
+        rows[2] = "Walk Speed {0} 1.1 (Limit) {0} 1.2".format(em_dash)
+        rows[8] = "Fall Speed / Fast Fall Speed {0} 1.68 {0} 1.74 (Limit) / 2.69 {0} 2.78 (Limit)".format(em_dash)
+    misc = "<div>" + "".join("<div>{0}</div>\n".format(r) for r in rows)
+    for i, (move, startup) in enumerate((("Up B", 3 + offset), ("Neutral Air", 7), ("Up Smash", 9))):
+        misc += '<div class="oos{0}">Out of Shield, {1} {2} {3} frames</div>\n'.format(i + 1, move, em_dash, startup)
+    misc += '<div class="ledgegrab">Ledge grab</div><div class="ledgegrab2">Ledge grab</div></div>'
+
+    html = "<html><head><title>{0}</title></head><body>\n".format(name)
+    for section in sections:
+        html += '<div class="moves">\n{0}</div>\n'.format(section)
+    html += '<div class="moves">{0}<div class="movecontainer">Grab graphic</div></div>\n'.format(misc)
+    return html + "</body></html>\n"
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Generate stand-in character pages")
+    arg_parser.add_argument("characters", nargs="*", help="Characters to generate (defaults to the corpus set, "
+                                                          "or the whole roster with --page-cache)")
+    arg_parser.add_argument("--corpus-dir", default=corpus.default_corpus_dir)
+    arg_parser.add_argument("--page-cache", default=None,
+                            help="Write the pages into this page cache instead of the corpus, so scrape.py "
+                                 "--offline can run on them")
+    args = arg_parser.parse_args()
+
+    if args.page_cache:
+        with open(roster_path) as char_file:
+            names = args.characters or char_file.read().split()
+        cache = pagecache.PageCache(args.page_cache)
+        for name in names:
+            cache.put(name, fixture_page(name))
+        cache.flush()
+        print("Wrote {0} pages into {1}".format(len(names), args.page_cache))
+    else:
+        names = args.characters or corpus.default_characters
+        corpus.freeze_corpus([(name, fixture_page(name)) for name in names], args.corpus_dir)
+        print("Froze {0} pages into {1}".format(len(names), args.corpus_dir))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
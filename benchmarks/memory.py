@@ -0,0 +1,74 @@
+"""Measures the memory footprint of the whole roster's move DTOs, comparing the
+slotted records in character.py against the __dict__-backed layout they used to have.
+
+Usage:
+    python benchmarks/memory.py [--db framedata.db]
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+import framedatastore
+
+class DictRecord(object):
+    """The layout the move DTOs had before __slots__: the raw fields of the
+    move in a per-instance __dict__"""
+    def __init__(self, fields):
+        self.__dict__.update(fields)
+
+def raw_fields(move):
+    """The attributes of a move DTO, minus the typed *_value attributes that
+    the old layout didn't have"""
+    fields = {}
+    for cls in type(move).__mro__:
+        for attribute in getattr(cls, '__slots__', ()):
+            if not attribute.endswith('_value'):
+                fields[attribute] = getattr(move, attribute)
+    return fields
+
+def measure(build):
+    """Returns the number of bytes still allocated by whatever build() returns"""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    built = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del built
+    return after - before
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Compare the memory footprint of move DTO layouts")
+    arg_parser.add_argument("--db", default=os.path.join(os.path.dirname(framedatastore.__file__), 'framedata.db'))
+    args = arg_parser.parse_args()
+
+    store = framedatastore.FrameDataStore(args.db)
+    roster = store.load_roster()
+    store.close()
+    moves = [m for char in roster for section in char.section_moves.values() for m in section]
+    action_dicts = [(type(m), m.to_action_dict()) for m in moves]
+    fields = [raw_fields(m) for m in moves]
+    del roster, moves
+    if not action_dicts:
+        print("No moves stored in {0}".format(args.db), file=sys.stderr)
+        return 1
+
+    slotted_bytes = measure(lambda: [cls(d) for cls, d in action_dicts])
+    dict_bytes = measure(lambda: [DictRecord(f) for f in fields])
+    report = {
+        "moves": len(action_dicts),
+        "dict_records_bytes": dict_bytes,
+        "slotted_records_bytes": slotted_bytes,
+        "dict_bytes_per_move": dict_bytes / max(1, len(action_dicts)),
+        "slotted_bytes_per_move": slotted_bytes / max(1, len(action_dicts))
+    }
+    print(json.dumps(report, indent=2))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,161 @@
+"""Benchmarks every stage of parsing a character page over the frozen corpus
+and writes the results as JSON, so runs on different branches can be compared.
+
+Each page is taken through the stages one at a time with every parse engine:
+    html_build       ScrapeEngine.parse_page
+    section_split    ScrapeEngine.get_sections
+    move_extraction  ScrapeEngine.extract_move_data over every move container
+    misc_parsing     ScrapeEngine.get_section_data for the misc section
+    dto_construction ScrapeEngine.create_move for every move, and the Character DTO
+The best time of --repeat runs is kept for each stage. Throughput is measured
+separately over whole get_frame_data calls, and peak memory is the largest
+tracemalloc peak of parsing a single page.
+
+Usage:
+    python benchmarks/parsing.py [--corpus-dir benchmarks/corpus] [--repeat 5]
+                                 [--output results.json] [--compare baseline.json] [character ...]
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+import character as dto
+import lxmlengine
+import corpus
+
+stages = ("html_build", "section_split", "move_extraction", "misc_parsing", "dto_construction")
+
+def time_stages(engine_class, name, html):
+    """Runs one page through each stage once
+
+    Returns:
+        A dictionary of stage name to seconds
+    """
+    timings = {}
+    scraper = engine_class(name)
+
+    start = time.perf_counter()
+    page = scraper.parse_page(html)
+    timings["html_build"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    sections = scraper.get_sections(page)
+    timings["section_split"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    extracted = []
+    for section_name, section in zip(scraper.section_names[:5], sections[:5]):
+        extracted.append([scraper.extract_move_data(c, section_name) for c in scraper.get_move_containers(section)])
+    timings["move_extraction"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    misc = scraper.get_section_data("misc", sections[5])
+    timings["misc_parsing"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    moves = [[scraper.create_move(d, section_name) for d in section_data]
+             for section_name, section_data in zip(scraper.section_names, extracted)]
+    dto.Character(name, *moves, misc)
+    timings["dto_construction"] = time.perf_counter() - start
+    return timings
+
+def benchmark_engine(engine_class, pages, repeat):
+    """Times every stage of every page, then whole parses, then memory
+
+    Returns:
+        A dictionary of results for the engine
+    """
+    best = {name: {} for name, _ in pages}
+    for _ in range(repeat):
+        for name, html in pages:
+            for stage, seconds in time_stages(engine_class, name, html).items():
+                best[name][stage] = min(seconds, best[name].get(stage, seconds))
+
+    best_total = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for name, html in pages:
+            scraper = engine_class(name)
+            scraper.get_frame_data(scraper.parse_page(html))
+        elapsed = time.perf_counter() - start
+        best_total = elapsed if best_total is None else min(best_total, elapsed)
+
+    peak_bytes = 0
+    for name, html in pages:
+        tracemalloc.start()
+        scraper = engine_class(name)
+        scraper.get_frame_data(scraper.parse_page(html))
+        peak_bytes = max(peak_bytes, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+
+    return {
+        "stages": {stage: sum(best[name][stage] for name, _ in pages) for stage in stages},
+        "pages": best,
+        "total_seconds": best_total,
+        "pages_per_second": len(pages) / best_total if best_total else None,
+        "peak_memory_bytes": peak_bytes
+    }
+
+def compare(report, baseline):
+    """Prints the ratio of each stage's time to the baseline's, where < 1 is faster"""
+    for engine_name, results in sorted(report["engines"].items()):
+        base = baseline["engines"].get(engine_name)
+        if base is None:
+            continue
+        print(engine_name)
+        for stage in stages + ("total_seconds",):
+            current = results["stages"][stage] if stage in stages else results[stage]
+            previous = base["stages"][stage] if stage in stages else base[stage]
+            ratio = current / previous if previous else float('nan')
+            print("  {0:<18}{1:>10.5f}s {2:>7.2f}x".format(stage, current, ratio))
+        print("  {0:<18}{1:>10d}B {2:>7.2f}x".format(
+            "peak_memory", results["peak_memory_bytes"],
+            results["peak_memory_bytes"] / base["peak_memory_bytes"] if base["peak_memory_bytes"] else float('nan')))
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Benchmark the parse stages over the frozen corpus")
+    arg_parser.add_argument("characters", nargs="*", help="Characters to benchmark (defaults to the whole corpus)")
+    arg_parser.add_argument("--corpus-dir", default=corpus.default_corpus_dir)
+    arg_parser.add_argument("--repeat", type=int, default=5)
+    arg_parser.add_argument("--engine", choices=sorted(lxmlengine.engines), action="append",
+                            help="Only benchmark this engine (can be repeated)")
+    arg_parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    arg_parser.add_argument("--compare", help="A previous JSON report to compare this run against")
+    args = arg_parser.parse_args()
+
+    try:
+        pages = corpus.load_corpus(args.corpus_dir, args.characters)
+    except corpus.CorpusError as e:
+        print(e, file=sys.stderr)
+        return 1
+
+    report = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "repeat": args.repeat,
+        "characters": [name for name, _ in pages],
+        "page_bytes": sum(len(html) for _, html in pages),
+        "engines": {}
+    }
+    for engine_name in args.engine or sorted(lxmlengine.engines):
+        report["engines"][engine_name] = benchmark_engine(lxmlengine.engines[engine_name], pages, args.repeat)
+
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            json.dump(report, output_file, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            compare(report, json.load(baseline_file))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
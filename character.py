@@ -1,6 +1,7 @@
 """A DTO module for the various pieces of frame data information on UltimateFrameData"""
 
-import bs4 as BeautifulSoup
+import re
+from dataformat import parse_frame_value
 
 class Character(object):
     """A DTO for a given character's frame data.
@@ -21,30 +22,68 @@ class Character(object):
         misc:
             Various character data such as weight, move speed, air accel, etc., as a CharacterMiscAttributes object
     """
+    sections = ("ground", "aerial", "special", "throw", "dodge")
+
     def __init__(self, name, ground, aerial, special, throw, dodges, misc):
         self.character_name = name
-        self.ground_attacks = CharacterGroundAttacks(ground)
-        self.aerial_attacks = CharacterAerialAttacks(aerial)
+        # Keep the moves of each section in page order. The section DTOs below only
+        # hold the moves they recognize, so this is what gets persisted.
+        self.section_moves = {
+            "ground": ground,
+            "aerial": aerial,
+            "special": special,
+            "throw": throw,
+            "dodge": dodges
+        }
+        # One name index per section, shared by the section DTOs and find_move
+        self.move_indexes = {s: MoveNameIndex(m) for s, m in self.section_moves.items()}
+        self.ground_attacks = CharacterGroundAttacks(ground, self.move_indexes["ground"])
+        self.aerial_attacks = CharacterAerialAttacks(aerial, self.move_indexes["aerial"])
         self.special_attacks = self.__create_unique_dto_for_specials_if_necessary(special)
-        self.throw_attacks = CharacterThrowAttacks(throw)
-        self.dodges = CharacterDodgeAttributes(dodges)
+        self.throw_attacks = CharacterThrowAttacks(throw, self.move_indexes["throw"])
+        self.dodges = CharacterDodgeAttributes(dodges, self.move_indexes["dodge"])
         self.misc_data = CharacterMiscAttributes(misc)
 
+    def find_move(self, name, section=None):
+        """Looks up a move by its exact name, ignoring case
+
+        Args:
+            name: The name of the move as it appears on the page
+            section: Only look in this section
+        Returns:
+            The move DTO, or None if there's no such move
+        """
+        for s in ([section] if section is not None else self.sections):
+            move = self.move_indexes[s].exact(name)
+            if move is not None:
+                return move
+        return None
+
+    def to_dict(self):
+        """Returns the character as plain data, with the moves of each section
+        as action dictionaries in page order and the misc attributes"""
+        return {
+            "name": self.character_name,
+            "sections": {s: [m.to_action_dict() for m in self.section_moves[s]] for s in self.sections},
+            "misc": self.misc_data.to_attributes_dict()
+        }
+
     def __create_unique_dto_for_specials_if_necessary(self, specials):
         """This method shouldn't have to exist. This is a pseudo-factory
         for creating DTOs for the edge case characters that have otherwise
         broken the CharacterSpecialAttacks DTO due to the author of
         UltimateFrameData not keeping a consistent move organization scheme."""
+        index = self.move_indexes["special"]
         if self.character_name == "mii_brawler":
-            return MiiBrawlerSpecialAttacks(specials)
+            return MiiBrawlerSpecialAttacks(specials, index)
         elif self.character_name == "mii_gunner":
-            return MiiGunnerSpecialAttacks(specials)
+            return MiiGunnerSpecialAttacks(specials, index)
         elif self.character_name == "mii_swordfighter":
-            return MiiSwordFighterSpecialAttacks(specials)
+            return MiiSwordFighterSpecialAttacks(specials, index)
         elif self.character_name == "terry":
-            return TerrySpecialAttacks(specials)
+            return TerrySpecialAttacks(specials, index)
         else:
-            return CharacterSpecialAttacks(specials)
+            return CharacterSpecialAttacks(specials, index)
     
     # def __create_terry_dto_for_dodge_if_necessary(self, dodges):
     #     """Neither should this one, but I kinda get it since it's
@@ -52,76 +91,124 @@ class Character(object):
     #     """
     #     if 
 
-class CharacterGroundAttacks(object):
+class MoveNameIndex(object):
+    """A lookup table over the move names of one section, built once so the
+    section DTOs don't lowercase and rescan the move list for every slot.
+
+    Each name is normalized (lowercased, whitespace collapsed) and split into
+    words, and every run of up to max_phrase_words words is indexed, so that
+    both single words ("up", "left/right") and multi-word move names
+    ("skyward slash dash") are dictionary lookups. Matching on whole words
+    also stops "up" from matching a name like "Uppercut".
+
+    Args:
+        moves: The move DTOs of the section, in page order
+    """
+    max_phrase_words = 3
+    word_pattern = re.compile(r"[a-z0-9'/-]+")
+
     def __init__(self, moves):
-        self.jabs = [j for j in moves if "jab" in j.name.lower()]
-        self.tilts = [a for a in moves if "air" in a.name.lower()]
-        self.dash = next(d for d in moves if "dash" in d.name.lower())
-        self.smashes = [s for s in moves if "smash" in s.name.lower()]
+        self.moves = moves
+        self.__by_name = {}
+        self.__by_phrase = {}
+        for position, move in enumerate(moves):
+            name = self.normalize_name(move.name)
+            self.__by_name.setdefault(name, move)
+            words = self.word_pattern.findall(name)
+            phrases = set()
+            for length in range(1, self.max_phrase_words + 1):
+                for start in range(len(words) - length + 1):
+                    phrases.add(" ".join(words[start:start + length]))
+            for phrase in phrases:
+                self.__by_phrase.setdefault(phrase, []).append((position, move))
+
+    @staticmethod
+    def normalize_name(name):
+        return " ".join(name.lower().replace(u"\u2019", "'").split())
+
+    def exact(self, name):
+        """Returns the first move with exactly this name (ignoring case), or None"""
+        return self.__by_name.get(self.normalize_name(name))
+
+    def all(self, *phrases):
+        """Returns every move whose name contains any of the phrases as whole
+        words, in page order"""
+        matches = {}
+        for phrase in phrases:
+            for position, move in self.__by_phrase.get(self.normalize_name(phrase), ()):
+                matches[position] = move
+        return [matches[p] for p in sorted(matches)]
+
+    def first(self, *phrases):
+        """Returns the first move on the page whose name contains any of the
+        phrases as whole words, or None"""
+        firsts = [self.__by_phrase[p][0] for p in map(self.normalize_name, phrases) if p in self.__by_phrase]
+        return min(firsts, key=lambda f: f[0])[1] if firsts else None
+
+class CharacterGroundAttacks(object):
+    def __init__(self, moves, index=None):
+        index = index if index is not None else MoveNameIndex(moves)
+        self.jabs = index.all("jab")
+        self.tilts = index.all("tilt")
+        self.dash = index.first("dash")
+        self.smashes = index.all("smash")
 
 class CharacterAerialAttacks(object):
-    def __init__(self, moves):
-        self.neutral_air = next(n for n in moves if "neutral" in n.name.lower())
-        self.forward_air = next(f for f in moves if "forward" in f.name.lower())
-        self.back_air = next(b for b in moves if "back" in b.name.lower())
-        self.up_air = next(u for u in moves if "up" in u.name.lower())
-        self.down_air = next(d for d in moves if "down" in d.name.lower())
+    def __init__(self, moves, index=None):
+        index = index if index is not None else MoveNameIndex(moves)
+        self.neutral_air = index.first("neutral")
+        self.forward_air = index.first("forward")
+        self.back_air = index.first("back")
+        self.up_air = index.first("up")
+        self.down_air = index.first("down")
 
 class CharacterSpecialAttacks(object):
-    def __init__(self, moves):
-        self.neutral_special = next(n for n in moves if "neutral" in n.name.lower())
-        self.side_special = next(s for s in moves if "side" in s.name.lower())
-        self.up_special = next(u for u in moves if "up" in u.name.lower())
-        self.down_special = next(d for d in moves if "down" in d.name.lower())
+    def __init__(self, moves, index=None):
+        index = index if index is not None else MoveNameIndex(moves)
+        self.neutral_special = index.first("neutral")
+        self.side_special = index.first("side")
+        self.up_special = index.first("up")
+        self.down_special = index.first("down")
 
-class MiiBrawlerSpecialAttacks(object):
+class MiiSpecialAttacks(object):
     """The Miis need special attention because they can have a bunch of
     different move combinations and the dude who made the frame data website 
-    just shoved every last Mii move under "specials". For the Mii Brawler:
+    just shoved every last Mii move under "specials". Each Mii lists the
+    names of the three custom moves that can fill each special slot.
     """
+    neutral_moves = []
+    side_moves = []
+    up_moves = []
+    down_moves = []
+
+    def __init__(self, moves, index=None):
+        index = index if index is not None else MoveNameIndex(moves)
+        self.neutral_special = index.all(*self.neutral_moves)
+        self.side_special = index.all(*self.side_moves)
+        self.up_special = index.all(*self.up_moves)
+        self.down_special = index.all(*self.down_moves)
+
+class MiiBrawlerSpecialAttacks(MiiSpecialAttacks):
+    """For the Mii Brawler:"""
     neutral_moves = ["Shot Put", "Flashing Mach Punch", "Exploding Side Kick"]
     side_moves = ["Onslaught", "Burning Dropkick", "Suplex"]
     up_moves = ["Soaring Axe Kick", "Helicopter Kick", "Thrust Uppercut"]
     down_moves = ["Head-On Assault", "Feint Jump", "Counter Throw"]
 
-    def __init__(self, moves):
-        self.neutral_special = [n for n in moves if any(m in self.neutral_moves for m in n.name.lower())]
-        self.side_special = [s for s in moves if any(m in self.side_moves for m in s.name.lower())]
-        self.up_special = [u for u in moves if any(m in self.up_moves for m in u.name.lower())]
-        self.down_special = [d for d in moves if any(m in self.down_moves for m in d.name.lower())]
-
-class MiiSwordFighterSpecialAttacks(object):
-    """The Miis need special attention because they can have a bunch of
-    different move combinations and the dude who made the frame data website 
-    just shoved every last Mii move under "specials". For the Mii SwordFighter:
-    """
+class MiiSwordFighterSpecialAttacks(MiiSpecialAttacks):
+    """For the Mii SwordFighter:"""
     neutral_moves = ["Gale Strike", "Shuriken of Light", "Blurring Blade"]
     side_moves = ["Airborne Assault", "Gale Stab", "Chakram"]
     up_moves = ["Stone Scabbard", "Skyward Slash Dash", "Hero's Spin"]
     down_moves = ["Blade Counter", "Reversal Slash", "Power Thrust"]
 
-    def __init__(self, moves):
-        self.neutral_special = [n for n in moves if any(m in self.neutral_moves for m in n.name.lower())]
-        self.side_special = [s for s in moves if any(m in self.side_moves for m in s.name.lower())]
-        self.up_special = [u for u in moves if any(m in self.up_moves for m in u.name.lower())]
-        self.down_special = [d for d in moves if any(m in self.down_moves for m in d.name.lower())]
-
-class MiiGunnerSpecialAttacks(object):
-    """The Miis need special attention because they can have a bunch of
-    different move combinations and the dude who made the frame data website 
-    just shoved every last Mii move under "specials". For the Mii Gunner:
-    """
+class MiiGunnerSpecialAttacks(MiiSpecialAttacks):
+    """For the Mii Gunner:"""
     neutral_moves = ["Charge Blast", "Laser Blaze", "Grenade Launch"]
     side_moves = ["Flame Pillar", "Stealth Burst", "Gunner Missile"]
     up_moves = ["Lunar Launch", "Cannon Jump Kick", "Arm Rocket"]
     down_moves = ["Echo Reflector", "Bomb Drop", "Absorbing Vortex"]
 
-    def __init__(self, moves):
-        self.neutral_special = [n for n in moves if any(m in self.neutral_moves for m in n.name.lower())]
-        self.side_special = [s for s in moves if any(m in self.side_moves for m in s.name.lower())]
-        self.up_special = [u for u in moves if any(m in self.up_moves for m in u.name.lower())]
-        self.down_special = [d for d in moves if any(m in self.down_moves for m in d.name.lower())]
-
 class TerrySpecialAttacks(object):
     """Terry also requires special attention because he has a "forward" 
     B/Special and a "back" B/Special. These can be grouped as Side
@@ -129,66 +216,108 @@ class TerrySpecialAttacks(object):
     to break protocol for Terry too.
     
     Nothing's actually different about the class fields, but the population
-    for the side_special field is different because of the above difference."""
-    def __init__(self, moves):
-        self.neutral_special = next(n for n in moves if "neutral" in n.name.lower())
-        self.side_special = next(s for s in moves if "forward" in s.name.lower() or "back" in s.name.lower())
-        self.up_special = next(u for u in moves if "up" in u.name.lower())
-        self.down_special = next(d for d in moves if "down" in d.name.lower())
+    for the side_special field is different because of the above difference.
+    Each slot matches either the direction or the name of the move."""
+    neutral_moves = ["Neutral", "Power Wave"]
+    side_moves = ["Side", "Forward", "Back", "Burning Knuckle", "Crack Shoot"]
+    up_moves = ["Up", "Rising Tackle"]
+    down_moves = ["Down", "Power Dunk"]
+
+    def __init__(self, moves, index=None):
+        index = index if index is not None else MoveNameIndex(moves)
+        self.neutral_special = index.first(*self.neutral_moves)
+        self.side_special = index.first(*self.side_moves)
+        self.up_special = index.first(*self.up_moves)
+        self.down_special = index.first(*self.down_moves)
 
 class CharacterThrowAttacks(object):
-    def __init__(self, moves):
-        self.stand_grab = next(st for st in moves if st.name.lower() == "grab")
-        self.dash_grab = next(dsh for dsh in moves if "dash" in dsh.name.lower())
-        self.pivot_grab = next(pvt for pvt in moves if "pivot" in pvt.name.lower())
-        self.pummel = next(pml for pml in moves if "pummel" in pml.name.lower())
-        self.forward_throw = next(fwd for fwd in moves if "forward" in fwd.name.lower())
-        self.backward_throw = next(bck for bck in moves if "back" in bck.name.lower())
-        self.up_throw = next(up for up in moves if "up" in up.name.lower())
-        self.down_throw = next(dwn for dwn in moves if "down" in dwn.name.lower())
+    def __init__(self, moves, index=None):
+        index = index if index is not None else MoveNameIndex(moves)
+        self.stand_grab = index.exact("grab")
+        self.dash_grab = index.first("dash")
+        self.pivot_grab = index.first("pivot")
+        self.pummel = index.first("pummel")
+        self.forward_throw = index.first("forward")
+        self.backward_throw = index.first("back")
+        self.up_throw = index.first("up")
+        self.down_throw = index.first("down")
 
 class CharacterDodgeAttributes(object):
-    def __init__(self, moves):
-        self.spot_dodge = next(spt for spt in moves if "spot" in spt.name.lower())
-        self.forward_roll = next(fwd for fwd in moves if "forward" in fwd.name.lower())
-        self.backward_roll = next(bck for bck in moves if "back" in bck.name.lower())
-        self.neutral_air_dodge = next(n for n in moves if "neutral" in n.name.lower())
-        self.down_air_dodge = next(da for da in moves if da.name.lower() == "air dodge, down")
-        self.down_diagonal_air_dodge = next(dd for dd in moves if dd.name.lower() == "air dodge, diagonally down")
-        self.horizontal_air_dodge = next(hz for hz in moves if "left/right" in hz.name.lower())
-        self.up_air_dodge = next(ua for ua in moves if ua.name.lower() == "air dodge, up")
-        self.up_diagonal_air_dodge = next(ud for ud in moves if ud.name.lower() == "air dodge, diagonally up")
+    def __init__(self, moves, index=None):
+        index = index if index is not None else MoveNameIndex(moves)
+        self.spot_dodge = index.first("spot")
+        self.forward_roll = index.first("forward")
+        self.backward_roll = index.first("back")
+        self.neutral_air_dodge = index.first("neutral")
+        self.down_air_dodge = index.exact("air dodge, down")
+        self.down_diagonal_air_dodge = index.exact("air dodge, diagonally down")
+        self.horizontal_air_dodge = index.first("left/right")
+        self.up_air_dodge = index.exact("air dodge, up")
+        self.up_diagonal_air_dodge = index.exact("air dodge, diagonally up")
 
 class CharacterMiscAttributes(object):
+    # The DTO attribute for each key produced by MiscDataParser
+    attribute_keys = (
+        ("weight", "weight"),
+        ("gravity", "gravity"),
+        ("walk_speed", "walkspd"),
+        ("run_speed", "runspd"),
+        ("initial_dash_speed", "initdash"),
+        ("air_speed", "airspd"),
+        ("total_air_acceleration", "airaccel"),
+        ("fall_speed", "fallspd"),
+        ("fast_fall_speed", "fastfallspd"),
+        ("short_hop_frames", "shorthop"),
+        ("full_hop_frames", "fullhop"),
+        ("short_hop_fast_fall_frames", "shorthopfastfall"),
+        ("full_hop_fast_fall_frames", "fullhopfastfall"),
+        ("fastest_out_of_shield_options", "oos"),
+        ("shield_grab_post_shield_stun", "shieldgrab"),
+        ("shield_drop", "shielddrop"),
+        ("jump_squat", "jumpsquat")
+    )
+
     def __init__(self, attributes_dict):
-        self.weight = attributes_dict["weight"]
-        self.gravity = attributes_dict["gravity"]
-        self.walk_speed = attributes_dict["walkspd"]
-        self.run_speed = attributes_dict["runspd"]
-        self.initial_dash_speed = attributes_dict["initdash"]
-        self.air_speed = attributes_dict["airspd"]
-        self.total_air_acceleration = attributes_dict["airaccel"]
-        self.fall_speed = attributes_dict["fallspd"]
-        self.fast_fall_speed = attributes_dict["fastfallspd"]
-        self.short_hop_frames = attributes_dict["shorthop"]
-        self.full_hop_frames = attributes_dict["fullhop"]
-        self.short_hop_fast_fall_frames = attributes_dict["shorthopfastfall"]
-        self.full_hop_fast_fall_frames = attributes_dict["fullhopfastfall"]
-        self.fastest_out_of_shield_options = attributes_dict["oos"]
-        self.shield_grab_post_shield_stun = attributes_dict["shieldgrab"]
-        self.shield_drop = attributes_dict["shielddrop"]
-        self.jump_squat = attributes_dict["jumpsquat"]
+        for attribute, key in self.attribute_keys:
+            setattr(self, attribute, attributes_dict[key])
+
+    def to_attributes_dict(self):
+        """Returns the dictionary this DTO was built from"""
+        return {key: getattr(self, attribute) for attribute, key in self.attribute_keys}
 
 class CharacterAction(object):
-    """Represents the data for any possible action that a character could perform while in combat"""
+    """Represents the data for any possible action that a character could perform while in combat.
+
+    The roster holds thousands of these, so every class in this hierarchy declares
+    __slots__ instead of carrying a per-instance __dict__. The raw text of each
+    frame field is kept as is, and fields with a number are also typed once, at
+    construction, into a matching *_value attribute (a dataformat.FrameValue,
+    or None if the field has no number), so numeric filtering never touches the strings.
+    """
+    __slots__ = ("name", "total_frames", "landing_lag", "notes", "total_frames_value", "landing_lag_value")
+
     def __init__(self, action_dict):
         self.name = action_dict["movename"]
         self.total_frames = action_dict["totalframes"]
         self.landing_lag = action_dict["landinglag"]
         self.notes = action_dict["notes"]
+        self.total_frames_value = parse_frame_value(self.total_frames)
+        self.landing_lag_value = parse_frame_value(self.landing_lag)
+
+    def to_action_dict(self):
+        """Returns the parsed data dictionary this DTO was built from, keyed by
+        the html class of each field, so the DTO can be rebuilt later"""
+        return {
+            "movename": self.name,
+            "totalframes": self.total_frames,
+            "landinglag": self.landing_lag,
+            "notes": self.notes
+        }
 
 class CharacterDodge(CharacterAction):
     """Represents the data for possible dodges a characterr could make while in combat"""
+    __slots__ = ()
+
     def __init__(self, dodge_dict):
         super().__init__(dodge_dict)
 
@@ -199,12 +328,26 @@ class TerryDodge(CharacterDodge):
     IT'S A DODGE GUIZ' and now Terry has become another edge case that needs to be
     handled where a dodge attack.... has base damage....
     """
+    __slots__ = ("advantage", "hitbox", "active_frames", "startup", "advantage_value", "startup_value",
+                 "active_frames_value")
+
     def __init__(self, dodge_dict):
         super().__init__(dodge_dict)
         self.advantage = dodge_dict["advantage"]
         self.hitbox = dodge_dict["hitboximg"]
         self.active_frames = dodge_dict["activeframes"]
         self.startup = dodge_dict["startup"]
+        self.advantage_value = parse_frame_value(self.advantage)
+        self.startup_value = parse_frame_value(self.startup)
+        self.active_frames_value = parse_frame_value(self.active_frames)
+
+    def to_action_dict(self):
+        action_dict = super().to_action_dict()
+        action_dict["advantage"] = self.advantage
+        action_dict["hitboximg"] = self.hitbox
+        action_dict["activeframes"] = self.active_frames
+        action_dict["startup"] = self.startup
+        return action_dict
 
 # Ugh. There's a weird edge case that isn't covered in the move abstraction.
 # TODO: Revisit the class hierarchy to fix this weird abstraction "failure"
@@ -212,6 +355,8 @@ class CharacterThrow(CharacterAction):
     """Represents any possible throw a character can perform while in combat.
     Does not include command grabs.
     """
+    __slots__ = ("hitbox", "startup_frames", "base_damage", "startup_value", "base_damage_value")
+
     def __init__(self, throw_dict):
         super().__init__(throw_dict)
         # Going to take an L here and just attach the properties and
@@ -221,15 +366,38 @@ class CharacterThrow(CharacterAction):
         self.hitbox = throw_dict["hitboximg"]
         self.startup_frames = throw_dict["startup"]
         self.base_damage = throw_dict["basedamage"]
+        self.startup_value = parse_frame_value(self.startup_frames)
+        self.base_damage_value = parse_frame_value(self.base_damage)
+
+    def to_action_dict(self):
+        action_dict = super().to_action_dict()
+        action_dict["hitboximg"] = self.hitbox
+        action_dict["startup"] = self.startup_frames
+        action_dict["basedamage"] = self.base_damage
+        return action_dict
 
 class CharacterThrowActiveFrames(CharacterThrow):
     """Some characters have grabs/throws with active frames, like Kirby."""
+    __slots__ = ("active_frames", "active_frames_value")
+
     def __init__(self, throw_dict):
         super().__init__(throw_dict)
         self.active_frames = throw_dict["activeframes"]
+        self.active_frames_value = parse_frame_value(self.active_frames)
+
+    def to_action_dict(self):
+        action_dict = super().to_action_dict()
+        action_dict["activeframes"] = self.active_frames
+        return action_dict
 
 class CharacterAttack(CharacterAction):
     """Represents the data for any aggressive attack a character could make while in combat"""
+    __slots__ = (
+        "startup_frames", "base_damage", "shield_lag", "shield_stun", "multiple_hitboxes",
+        "advantage", "active_frames", "hitbox", "startup_value", "base_damage_value",
+        "shield_lag_value", "shield_stun_value", "advantage_value", "active_frames_value"
+    )
+
     def __init__(self, attack_dict):
         super().__init__(attack_dict)
         self.startup_frames = attack_dict["startup"]
@@ -242,4 +410,22 @@ class CharacterAttack(CharacterAction):
         # Some character attacks don't even have hitbox sections (?????)
         # so if there's no value assoc w/ the hitbox key, assign None so
         # the attack class can still be instantiated
-        self.hitbox = attack_dict.get("hitboximg", None)
\ No newline at end of file
+        self.hitbox = attack_dict.get("hitboximg", None)
+        self.startup_value = parse_frame_value(self.startup_frames)
+        self.base_damage_value = parse_frame_value(self.base_damage)
+        self.shield_lag_value = parse_frame_value(self.shield_lag)
+        self.shield_stun_value = parse_frame_value(self.shield_stun)
+        self.advantage_value = parse_frame_value(self.advantage)
+        self.active_frames_value = parse_frame_value(self.active_frames)
+
+    def to_action_dict(self):
+        action_dict = super().to_action_dict()
+        action_dict["startup"] = self.startup_frames
+        action_dict["basedamage"] = self.base_damage
+        action_dict["shieldlag"] = self.shield_lag
+        action_dict["shieldstun"] = self.shield_stun
+        action_dict["whichhitbox"] = self.multiple_hitboxes
+        action_dict["advantage"] = self.advantage
+        action_dict["activeframes"] = self.active_frames
+        action_dict["hitboximg"] = self.hitbox
+        return action_dict
@@ -0,0 +1,179 @@
+"""Flattens the move DTOs of the whole roster into columnar NumPy arrays for
+vectorized analytics, and saves them as a directory of memory-mappable .npy files.
+A columns.json manifest lists the columns of the last export, so loading never
+picks up a stale .npy file left by an older export to the same directory.
+
+Usage:
+    python columnarexport.py [--db framedata.db] output_dir
+"""
+import argparse
+import json
+import os
+import numpy as np
+import character as dto
+from dataformat import parse_frame_value
+
+# The numeric fields of a move, keyed by the html class used in the parsed move
+# dictionaries. Each one becomes <column>_first, <column>_low and <column>_high.
+NUMERIC_FIELDS = (
+    ("startup", "startup"),
+    ("activeframes", "active_frames"),
+    ("totalframes", "total_frames"),
+    ("landinglag", "landing_lag"),
+    ("basedamage", "base_damage"),
+    ("shieldlag", "shield_lag"),
+    ("shieldstun", "shield_stun"),
+    ("advantage", "advantage")
+)
+
+COLUMNS_FILENAME = "columns.json"
+
+MOVE_KINDS = (
+    "CharacterAttack", "CharacterThrow", "CharacterThrowActiveFrames", "CharacterDodge", "TerryDodge"
+)
+
+def read_column_manifest(directory):
+    """Returns the names of the columns an export wrote to the directory"""
+    with open(os.path.join(directory, COLUMNS_FILENAME)) as manifest_file:
+        return json.load(manifest_file)["columns"]
+
+class MoveTable(object):
+    """Every move on the roster as one row across a set of equal length columns.
+    Numeric columns are float32 with NaN where a move has no number for the
+    field. Characters, sections and move kinds are stored as small integer codes
+    that index into character_names, section_names and kind_names.
+
+    Args:
+        columns: A dictionary of column name to NumPy array
+    """
+    def __init__(self, columns):
+        self.columns = columns
+
+    def __getitem__(self, column):
+        return self.columns[column]
+
+    def __len__(self):
+        return len(self.columns["character_index"])
+
+    @property
+    def character_names(self):
+        return self.columns["character_names"]
+
+    @property
+    def section_names(self):
+        return self.columns["section_names"]
+
+    @property
+    def kind_names(self):
+        return self.columns["kind_names"]
+
+    def character_code(self, name):
+        return int(np.flatnonzero(self.character_names == name)[0])
+
+    def section_code(self, section):
+        return int(np.flatnonzero(self.section_names == section)[0])
+
+    @classmethod
+    def from_roster(cls, characters):
+        """Builds the table from Character DTOs
+
+        Args:
+            characters: An iterable of Character DTOs, i.e. FrameDataStore.iter_roster()
+        Returns:
+            A MoveTable with one row per move
+        """
+        character_index, section_code, kind_code, position, move_names = [], [], [], [], []
+        character_names = []
+        numeric = {column: ([], [], []) for _, column in NUMERIC_FIELDS}
+
+        for char_code, char in enumerate(characters):
+            character_names.append(char.character_name)
+            for section_index, section in enumerate(dto.Character.sections):
+                for move_position, move in enumerate(char.section_moves[section]):
+                    action_dict = move.to_action_dict()
+                    character_index.append(char_code)
+                    section_code.append(section_index)
+                    kind_code.append(MOVE_KINDS.index(type(move).__name__))
+                    position.append(move_position)
+                    move_names.append(move.name)
+                    for key, column in NUMERIC_FIELDS:
+                        value = parse_frame_value(action_dict.get(key))
+                        firsts, lows, highs = numeric[column]
+                        firsts.append(value.first if value is not None else np.nan)
+                        lows.append(value.low if value is not None else np.nan)
+                        highs.append(value.high if value is not None else np.nan)
+
+        columns = {
+            "character_index": np.array(character_index, dtype=np.int16),
+            "section_code": np.array(section_code, dtype=np.int8),
+            "kind_code": np.array(kind_code, dtype=np.int8),
+            "position": np.array(position, dtype=np.int16),
+            # Fixed width unicode rather than objects, so it can be memory mapped
+            "move_name": np.array(move_names, dtype=np.str_),
+            "character_names": np.array(character_names, dtype=np.str_),
+            "section_names": np.array(dto.Character.sections, dtype=np.str_),
+            "kind_names": np.array(MOVE_KINDS, dtype=np.str_)
+        }
+        for column, (firsts, lows, highs) in numeric.items():
+            columns[column + "_first"] = np.array(firsts, dtype=np.float32)
+            columns[column + "_low"] = np.array(lows, dtype=np.float32)
+            columns[column + "_high"] = np.array(highs, dtype=np.float32)
+        return cls(columns)
+
+    def save(self, directory):
+        """Writes each column to <directory>/<column>.npy, then the manifest of
+        columns, and removes the .npy files of columns the previous export to
+        the directory listed but this table doesn't have. Files the exporter
+        didn't write are left alone."""
+        os.makedirs(directory, exist_ok=True)
+        manifest_path = os.path.join(directory, COLUMNS_FILENAME)
+        previous_columns = read_column_manifest(directory) if os.path.exists(manifest_path) else []
+        for column, values in self.columns.items():
+            np.save(os.path.join(directory, column + ".npy"), values, allow_pickle=False)
+        # The manifest goes last, so an export that stops partway never lists a column it didn't write
+        with open(manifest_path + '.tmp', 'w') as manifest_file:
+            json.dump({"columns": sorted(self.columns)}, manifest_file, indent=1)
+        os.replace(manifest_path + '.tmp', manifest_path)
+        for column in previous_columns:
+            path = os.path.join(directory, column + ".npy")
+            if column not in self.columns and os.path.exists(path):
+                os.remove(path)
+
+    @classmethod
+    def load(cls, directory, mmap=True):
+        """Loads a table written by save
+
+        Args:
+            directory:
+                The directory holding the .npy files
+            mmap:
+                Whether to memory map the columns instead of reading them in,
+                so only the pages a query touches are read from disk
+        Returns:
+            A MoveTable with the columns listed in the directory's manifest
+        Raises:
+            FileNotFoundError: If the directory has no manifest, i.e. it wasn't written by save
+        """
+        mmap_mode = 'r' if mmap else None
+        columns = {}
+        for column in read_column_manifest(directory):
+            columns[column] = np.load(os.path.join(directory, column + ".npy"), mmap_mode=mmap_mode, allow_pickle=False)
+        return cls(columns)
+
+def main(argv=None):
+    import framedatastore
+
+    arg_parser = argparse.ArgumentParser(description="Export the stored roster's moves as NumPy columns")
+    arg_parser.add_argument("output_dir", help="Directory the .npy files are written to")
+    arg_parser.add_argument("--db", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'framedata.db'),
+                            help="SQLite database to read the roster from")
+    args = arg_parser.parse_args(argv)
+
+    store = framedatastore.FrameDataStore(args.db)
+    table = MoveTable.from_roster(store.iter_roster())
+    store.close()
+    table.save(args.output_dir)
+    print("Exported {0} moves to {1}".format(len(table), args.output_dir))
+
+if __name__ == '__main__':
+    main()
@@ -1,8 +1,189 @@
+import functools
 import re
 
+# A single number ("12", "4.0%") or a range of numbers ("5-7", "-8 to -4") in
+# a frame data field. A dash directly after a digit separates a range rather
+# than starting a negative number, but "-8 -4" is two numbers.
+frame_segment_pattern = re.compile(
+    r"(?<![\d.])(-?\d+(?:\.\d+)?)(?:(?:-|\s+-\s+|\s+to\s+)(-?\d+(?:\.\d+)?))?")
+# Which hit a number belongs to, i.e. the "(Hit 1)" of "14 (Hit 1), 17". The
+# hit numbers aren't frame data, so they're dropped before looking for segments.
+hit_annotation_pattern = re.compile(r"\(\s*hits?\b[^)]*\)", re.IGNORECASE)
+
+class FrameRange(object):
+    """An inclusive range of numbers, i.e. the active frames of one hit.
+    Immutable, since parse_frame_value shares them between moves."""
+    __slots__ = ("low", "high")
+
+    def __init__(self, low, high):
+        object.__setattr__(self, "low", low)
+        object.__setattr__(self, "high", high)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("FrameRange is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("FrameRange is immutable")
+
+    def __reduce__(self):
+        # Pickle and copy through __init__, since the slots can't be set afterwards
+        return (FrameRange, (self.low, self.high))
+
+    def __eq__(self, other):
+        return isinstance(other, FrameRange) and (self.low, self.high) == (other.low, other.high)
+
+    def __hash__(self):
+        return hash((self.low, self.high))
+
+    def __repr__(self):
+        return "FrameRange({0!r}, {1!r})".format(self.low, self.high)
+
+class FrameValue(object):
+    """A frame data field typed into numbers. "5-7/12-15" has the segments 5-7
+    and 12-15, "-8 to -4" has the single segment -8 to -4, and "4.0%" is the
+    segment 4.0 to 4.0. Immutable, since parse_frame_value shares them between moves.
+
+    Args:
+        segments:
+            The FrameRange of each number or range in the field, in page order
+    """
+    __slots__ = ("segments", "first", "low", "high")
+
+    def __init__(self, segments):
+        segments = tuple(segments)
+        object.__setattr__(self, "segments", segments)
+        # The first number on the page, i.e. the frame the first hit comes out on
+        object.__setattr__(self, "first", segments[0].low)
+        object.__setattr__(self, "low", min(s.low for s in segments))
+        object.__setattr__(self, "high", max(s.high for s in segments))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("FrameValue is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("FrameValue is immutable")
+
+    def __reduce__(self):
+        return (FrameValue, (self.segments,))
+
+    def contains(self, number):
+        """Whether the number falls inside any of the segments"""
+        return any(s.low <= number <= s.high for s in self.segments)
+
+    def __eq__(self, other):
+        return isinstance(other, FrameValue) and self.segments == other.segments
+
+    def __hash__(self):
+        return hash(self.segments)
+
+    def __repr__(self):
+        return "FrameValue({0!r})".format(list(self.segments))
+
+def _to_number(text):
+    return float(text) if '.' in text else int(text)
+
+@functools.lru_cache(maxsize=8192)
+def parse_frame_value(text):
+    """Types a raw frame data field, such as an attack's startup, active frames,
+    advantage, shield stun or base damage, into a FrameValue. Every consumer
+    goes through here instead of keeping its own regex, and since the same few
+    strings show up over and over across the roster, results are memoized and
+    shared. FrameValues are immutable, so sharing them is safe.
+
+    Args:
+        text: The raw text of the field
+    Returns:
+        A FrameValue, or None if the field has no numbers
+    """
+    if not text:
+        return None
+    segments = []
+    for low, high in frame_segment_pattern.findall(hit_annotation_pattern.sub(" ", text)):
+        low = _to_number(low)
+        high = _to_number(high) if high else low
+        segments.append(FrameRange(min(low, high), max(low, high)))
+    return FrameValue(segments) if segments else None
+
+# The readable key for each attribute in the 'misc info' section, by the
+# lowercased attribute text from the site
+misc_attribute_keys = {
+    "walk speed": "walkspd",
+    "run speed": "runspd",
+    "initial dash": "initdash",
+    "air speed": "airspd",
+    "total air acceleration": "airaccel",
+    "sh": "shorthop",
+    "fh": "fullhop",
+    "shff": "shorthopfastfall",
+    "fhff": "fullhopfastfall",
+    "fall speed": "fallspd",
+    "fast fall speed": "fastfallspd",
+    "shield grab (grab, post-shieldstun)": "shieldgrab",
+    "shield drop": "shielddrop",
+    "jump squat (pre-jump frames)": "jumpsquat"
+}
+
+# The number in a misc value like "9 frames" or "1.5 frames (universal)"
+misc_number_pattern = re.compile(r"[0-9]\.?[0-9]{0,}")
+# A number in one of Cloud's Limit Break values. The '.' matching any character is
+# what's always been used here, so it's kept to leave the output alone.
+limit_break_number_pattern = re.compile(r"\d.\d*")
+
+@functools.lru_cache(maxsize=1024)
+def readable_misc_key(attribute):
+    """The memoized body of MiscDataFormatter.convert_attribute_to_readable_key.
+    Every character's page has the same few dozen attributes, so after the
+    first page this is a dictionary lookup."""
+    lowercase_key = attribute.lower().strip()
+    # full-hop fastfall needs to have the 'frames' part removed
+    if "fhff" in lowercase_key:
+        lowercase_key = lowercase_key.replace("frames", '').strip()
+    return misc_attribute_keys.get(lowercase_key, lowercase_key)
+
+# Character name -> a function that fixes up the em dash separated fields of a
+# 'misc info' row before they're formatted, for pages laid out differently
+misc_row_overrides = {}
+
+def misc_row_override(character_name):
+    """Registers the decorated function as the misc row override for a character.
+    The function takes the list of stripped fields of a row and returns the
+    fields to use in their place.
+
+    Args:
+        character_name: The name of the character, as in characters.txt
+    """
+    def register(function):
+        misc_row_overrides[character_name] = function
+        return function
+    return register
+
+@misc_row_override("cloud")
+def cloud_limit_break_row(split_data):
+    """Takes Cloud's stat changes from Limit Break into account, folding the
+    Limit Break values into the regular value's field"""
+    if len(split_data) > 2 and split_data[1].find('L') != -1 and split_data[0].find('/') == -1:
+        regular_val = limit_break_number_pattern.search(split_data[1])
+        limit_val = limit_break_number_pattern.search(split_data[2])
+        if regular_val and limit_val:
+            split_data[1] = "{0}, {1}".format(regular_val.group().strip(), limit_val.group().strip())
+            del split_data[2]
+    if "Fall Speed" in split_data[0]:
+        fallspd_regular_val = limit_break_number_pattern.search(split_data[1])
+        fallspd_limit_ff_reg_vals = limit_break_number_pattern.findall(split_data[2])
+        fastfallspd_limit_val = limit_break_number_pattern.search(split_data[3])
+        if fallspd_regular_val and fallspd_limit_ff_reg_vals and fastfallspd_limit_val:
+            split_data[1] = "{0}, {1} / {2}, {3}".format(
+                fallspd_regular_val.group().strip(), fallspd_limit_ff_reg_vals[0].strip(),
+                fallspd_limit_ff_reg_vals[1].strip(), fastfallspd_limit_val.group().strip()
+                )
+            del split_data[2]
+            del split_data[2]
+    return split_data
+
 class MiscDataFormatter(object):
     def __init__(self, character_name):
         self.character_name = character_name
+        self.row_override = misc_row_overrides.get(character_name)
 
     def convert_attribute_to_readable_key(self, attribute):
         """Since the "keys" for the misc section dictionary are being
@@ -14,37 +195,7 @@ class MiscDataFormatter(object):
             attribute: The attribute to sanitize into something readable
         Returns:
             The sanitized attribute as a string"""
-        lowercase_key = attribute.lower().strip()
-
-        # full-hop fastfall needs to have the 'frames' part removed
-        if "fhff" in lowercase_key:
-            lowercase_key = lowercase_key.replace("frames", '').strip()
-
-        def switch(case):
-            conditions = {
-                "walk speed": "walkspd",
-                "run speed": "runspd",
-                "initial dash": "initdash",
-                "air speed": "airspd",
-                "total air acceleration": "airaccel",
-                "sh": "shorthop",
-                "fh": "fullhop",
-                "shff": "shorthopfastfall",
-                "fhff": "fullhopfastfall",
-                "fall speed": "fallspd",
-                "fast fall speed": "fastfallspd",
-                "shield grab (grab, post-shieldstun)": "shieldgrab",
-                "shield drop": "shielddrop",
-                "jump squat (pre-jump frames)": "jumpsquat"
-            }
-            return conditions[case] if case in conditions else None
-        
-        result = switch(lowercase_key)
-
-        if result is not None:
-            return result
-        else:
-            return lowercase_key
+        return readable_misc_key(attribute)
 
     def format_value_associated_with_key(self, value):
         """The values associated with each section will have extra spaces
@@ -56,12 +207,24 @@ class MiscDataFormatter(object):
             The sanitized value as a string"""
         clean_value = value.strip()
         if "frames" in value:
-            match = re.search("[0-9]\.?[0-9]{0,}", clean_value)
+            match = misc_number_pattern.search(clean_value)
             if match:
                 clean_value = match.group().strip()
             else:
                 print("format_value_associated_with_key failed to clean {0}".format(value))
         return clean_value
+
+    def apply_row_override(self, split_data):
+        """Runs the character's misc row override, if they have one
+
+        Args:
+            split_data: The stripped em dash separated fields of a 'misc info' row
+        Returns:
+            The fields to format
+        """
+        if self.row_override is None:
+            return split_data
+        return self.row_override(split_data)
     
     def create_out_of_shield_key(self, oos_key):
         """All OOS sections are prepended with 'Out of Shield, [move]'
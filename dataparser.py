@@ -1,6 +1,4 @@
-from bs4 import BeautifulSoup
-import re
-import difflib
+from bs4 import Tag
 from dataformat import MiscDataFormatter
 
 class HtmlDataParser(object):
@@ -33,6 +31,34 @@ class HtmlDataParser(object):
 class AttackDataParser(HtmlDataParser):
     def __init__(self, html):
         super().__init__(html)
+
+    def get_move_data(self, html_classes):
+        """Looks up each of the given classes in the move container one at a time
+
+        Args:
+            html_classes:
+                The classes of the elements that hold the move's data
+        Returns:
+            A dictionary of class name to the element's text. Classes that couldn't
+            be found are left out, except for 'hitboximg', which is always present.
+        """
+        parsed_data = {}
+        for c in html_classes:
+            if c == "hitboximg":
+                data = self.extract_hitbox()
+            else:
+                data = self.get_data_from_element("div", c)
+            # If the element couldn't be found, skip it and try the next
+            # (This covers elements that BS4 reports as nonexistent 
+            # or empty hitbox visualization lists)
+            if data is None:
+                if c == "hitboximg":
+                    parsed_data[c] = None
+                else:
+                    continue
+            else:
+                parsed_data[c] = data
+        return parsed_data
     
     def extract_hitbox(self):
         """Extract the hitbox animations from the move container html element.
@@ -53,6 +79,76 @@ class AttackDataParser(HtmlDataParser):
             hitboxImgUrls.append(url)
         return hitboxImgUrls
 
+class MoveContainerExtractor(object):
+    """Pulls every wanted field out of a move container in a single walk of the
+    container, rather than searching the whole container once per field with a
+    Python callback. Each element is checked against a precomputed set of the
+    wanted classes.
+
+    Args:
+        html_classes:
+            The classes of the elements that hold a move's data. 'hitboximg' refers
+            to the hitbox animation links, everything else to a div with exactly that class.
+    """
+    def __init__(self, html_classes):
+        self.html_classes = list(html_classes)
+        self.field_classes = frozenset(c for c in self.html_classes if c != "hitboximg")
+
+    def extract(self, container):
+        """Extracts the move's data from the container
+
+        Args:
+            container: The movecontainer element as a BeautifulSoup tag
+        Returns:
+            The same dictionary AttackDataParser.get_move_data would return
+        """
+        return self.read(*self.scan(container))
+
+    def scan(self, container):
+        """Finds the element of each wanted field without reading any text, so
+        the move's layout can be looked at before deciding what to read
+
+        Args:
+            container: The movecontainer element as a BeautifulSoup tag
+        Returns:
+            A (found, hitbox urls) tuple, where found is a dictionary of class name to element
+        """
+        found = {}
+        hitbox_urls = []
+        for tag in container.descendants:
+            if tag.__class__ is not Tag:
+                continue
+            tag_classes = tag.attrs.get('class')
+            if not tag_classes:
+                continue
+            if tag.name == "div":
+                # Like a find() per class, only the first div with exactly that class counts
+                if len(tag_classes) == 1 and tag_classes[0] in self.field_classes and tag_classes[0] not in found:
+                    found[tag_classes[0]] = tag
+            elif tag.name == "a" and "hitboximg" in tag_classes:
+                hitbox_urls.append(tag['data-featherlight'].strip())
+        return found, hitbox_urls
+
+    def read(self, found, hitbox_urls, fields=None):
+        """Reads the text of the fields that scan found
+
+        Args:
+            found: The dictionary of class name to element from scan
+            hitbox_urls: The hitbox urls from scan
+            fields: The classes to read, or None for every class
+        Returns:
+            A dictionary of class name to text, like extract
+        """
+        parsed_data = {}
+        for c in self.html_classes:
+            if fields is not None and c not in fields:
+                continue
+            if c == "hitboximg":
+                parsed_data[c] = hitbox_urls if hitbox_urls else None
+            elif c in found:
+                parsed_data[c] = found[c].text.strip()
+        return parsed_data
+
 class MiscDataParser(HtmlDataParser):
     def __init__(self, html, char_name):
         super().__init__(html)
@@ -74,20 +170,38 @@ class MiscDataParser(HtmlDataParser):
         # Remove all the newline elements
         misc_data_elements = [n for n in misc_data_elements if n != '\n']
         # From the complete list, get all the regular divs with information
-        regular_misc_data = [e for e in misc_data_elements if not e.attrs]
+        regular_misc_data = [e.text for e in misc_data_elements if not e.attrs]
         # Then, from the complete list, get all the divs with out of shield information
-        oos_elements = [t for t in misc_data_elements if t.attrs]
+        oos_elements = [(t.attrs.get('class', []), t.text) for t in misc_data_elements if t.attrs]
+        return self.parse_misc_rows(regular_misc_data, oos_elements)
+
+    def parse_misc_rows(self, regular_rows, oos_rows):
+        """Cleans the text of the rows in the 'misc info' section into the
+        dictionary of misc attributes. This is separate from pulling the rows
+        out of the html so that any html engine can share it.
+
+        Args:
+            regular_rows:
+                The text of each regular row, i.e. the weight row
+            oos_rows:
+                A (class list, text) tuple for each row that has attributes,
+                which are the out of shield rows and possibly ledge grab images
+        Returns:
+            A dictionary of the attributes and their respective values from
+            the 'misc info' section
+        """
         # The author added "ledge grab" photos to the misc data section and I'm not going
         # to work with that information unless it's desired
-        if len(oos_elements) > 3:
-            oos_elements = [o for o in oos_elements if difflib.get_close_matches("oos", o.attrs['class'])]
+        if len(oos_rows) > 3:
+            import difflib
+            oos_rows = [o for o in oos_rows if difflib.get_close_matches("oos", o[0])]
         # We're gonna shove everything in this dictionary in the end
         misc_data_dict = {}
         parsed_oos_moves = []
 
-        for msc in regular_misc_data:
-            split_text_data = self.__parse_data_from_html(msc.text)
-            if "/" in msc.text:
+        for msc in regular_rows:
+            split_text_data = self.__parse_data_from_html(msc)
+            if "/" in msc:
                 coupled_data = self.__split_data_loosely_coupled_by_forward_slash(split_text_data)
                 for k, v in coupled_data.items():
                     misc_data_dict[k] = v
@@ -95,8 +209,8 @@ class MiscDataParser(HtmlDataParser):
                 normal_entry_tuple = self.__create_entry_from_regular_misc_data(split_text_data)
                 misc_data_dict[normal_entry_tuple[0]] = normal_entry_tuple[1]
 
-        for oos in oos_elements:
-            split_oos_data = self.__parse_data_from_html(oos.text)
+        for _, oos_text in oos_rows:
+            split_oos_data = self.__parse_data_from_html(oos_text)
             parsed_oos_data = self.__create_out_of_shield_entry(split_oos_data)
             parsed_oos_moves.append(parsed_oos_data)
 
@@ -118,25 +232,8 @@ class MiscDataParser(HtmlDataParser):
         split_data = data.split(self.unicode_em_dash)
         split_data = [x.strip() for x in split_data]
 
-        # The following "if" statements take Cloud's stat changes from Limit Break into account
-        if self.character == "cloud" and split_data[1].find('L') != -1 and split_data[0].find('/') == -1:
-            regular_val = re.search("\d.\d*", split_data[1])
-            limit_val = re.search("\d.\d*", split_data[2])
-            if regular_val and limit_val:
-                split_data[1] = "{0}, {1}".format(regular_val.group().strip(), limit_val.group().strip())
-                del split_data[2]
-        if self.character == "cloud" and "Fall Speed" in split_data[0]:
-            fallspd_regular_val = re.search("\d.\d*", split_data[1])
-            fallspd_limit_ff_reg_vals = re.findall("\d.\d*", split_data[2])
-            fastfallspd_limit_val = re.search("\d.\d*", split_data[3])
-            if fallspd_regular_val and fallspd_limit_ff_reg_vals and fastfallspd_limit_val:
-                split_data[1] = "{0}, {1} / {2}, {3}".format(
-                    fallspd_regular_val.group().strip(), fallspd_limit_ff_reg_vals[0].strip(), 
-                    fallspd_limit_ff_reg_vals[1].strip(), fastfallspd_limit_val.group().strip()
-                    )
-                del split_data[2]
-                del split_data[2]
-        return split_data
+        # Some characters' rows need fixing up first, i.e. Cloud's Limit Break values
+        return self.misc_data_formatter.apply_row_override(split_data)
 
     def __create_entry_from_regular_misc_data(self, data):
         """Creates a tuple based on the provided data from the
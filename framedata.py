@@ -0,0 +1,102 @@
+"""The command line entry point for scraping, querying and exporting the frame data.
+
+Each subcommand imports only what it needs. query reads a roster snapshot
+through its manifest and decodes just the character asked for, so it never
+loads requests, BeautifulSoup or lxml and starts fast enough to call from
+shell scripts.
+
+Usage:
+    python framedata.py scrape [scrape.py options]
+    python framedata.py query [--snapshot roster.snap] <character> [<move name>]
+    python framedata.py query [--snapshot roster.snap] --list
+    python framedata.py query [--snapshot roster.snap] --search "super armor" [--limit 20]
+    python framedata.py export [columnarexport.py options]
+"""
+import argparse
+import json
+import os
+import sys
+
+script_path = os.path.dirname(os.path.abspath(__file__))
+default_snapshot_path = os.path.join(script_path, 'roster.snap')
+
+def scrape(args):
+    import scrape as scrape_command
+    scrape_command.main(args.options)
+
+def export(args):
+    import columnarexport
+    columnarexport.main(args.options)
+
+def query(args):
+    import rostermanifest
+    if not os.path.exists(args.snapshot):
+        return "There's no roster snapshot at {0}, write one with: framedata.py scrape --snapshot {0}".format(
+            args.snapshot)
+    manifest = rostermanifest.load_for_snapshot(args.snapshot)
+
+    if args.list:
+        for entry in manifest.entries:
+            print("{0}\t{1}".format(entry.slug, entry.name))
+        return None
+    if args.search is not None:
+        import movesearch
+        index = movesearch.load_for_snapshot(args.snapshot)
+        for hit in index.search(args.search, args.limit, args.character, args.section):
+            print("{0:.2f}  {1} {2}: {3}".format(hit.score, hit.character_name, hit.section, hit.move_name))
+        return None
+    if args.character is None:
+        return "Give a character, --list or --search"
+
+    char = manifest.load_character(args.character)
+    if char is None:
+        return "No character named {0}".format(args.character)
+    if args.move is None:
+        print(json.dumps(char.to_dict(), indent=2))
+        return None
+    sections = [args.section] if args.section is not None else char.sections
+    for section in sections:
+        move = char.find_move(args.move, section)
+        if move is not None:
+            print(json.dumps({"character": char.character_name, "section": section, "move": move.to_action_dict()},
+                             indent=2))
+            return None
+    return "{0} has no move named {1}".format(char.character_name, args.move)
+
+def build_arg_parser():
+    arg_parser = argparse.ArgumentParser(description="Scrape, query and export Smash Ultimate frame data")
+    subcommands = arg_parser.add_subparsers(dest="command", metavar="command")
+    subcommands.required = True
+
+    # scrape and export hand every option they're given to their own module's parser
+    scrape_parser = subcommands.add_parser("scrape", add_help=False, help="Scrape the site (see scrape.py -h)")
+    scrape_parser.set_defaults(run=scrape, passthrough=True)
+
+    query_parser = subcommands.add_parser("query", help="Look up characters and moves in a roster snapshot")
+    query_parser.add_argument("character", nargs="?", default=None,
+                              help="A character's slug or name, i.e. 'king_dedede' or 'King Dedede'")
+    query_parser.add_argument("move", nargs="?", default=None, help="A move of the character, i.e. 'Up Smash'")
+    query_parser.add_argument("--snapshot", default=default_snapshot_path, help="The rostersnapshot file to read")
+    query_parser.add_argument("--section", default=None, choices=("ground", "aerial", "special", "throw", "dodge"),
+                              help="Only look in this section of the page")
+    query_parser.add_argument("--list", action="store_true", help="List every character's slug and name")
+    query_parser.add_argument("--search", default=None, help="Search move names and notes for these words")
+    query_parser.add_argument("--limit", type=int, default=20, help="The most search results to show")
+    query_parser.set_defaults(run=query)
+
+    export_parser = subcommands.add_parser("export", add_help=False,
+                                           help="Export the moves as NumPy columns (see columnarexport.py -h)")
+    export_parser.set_defaults(run=export, passthrough=True)
+    return arg_parser
+
+def main(argv=None):
+    arg_parser = build_arg_parser()
+    args, options = arg_parser.parse_known_args(argv)
+    if getattr(args, "passthrough", False):
+        args.options = options
+    elif options:
+        arg_parser.error("unrecognized arguments: {0}".format(" ".join(options)))
+    return args.run(args)
+
+if __name__ == '__main__':
+    sys.exit(main())
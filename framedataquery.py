@@ -0,0 +1,177 @@
+import bisect
+import character as dto
+from dataformat import parse_frame_value
+
+class MoveRef(object):
+    """A move along with the character and section it belongs to"""
+    __slots__ = ("character_name", "section", "move")
+
+    def __init__(self, character_name, section, move):
+        self.character_name = character_name
+        self.section = section
+        self.move = move
+
+    def __repr__(self):
+        return "MoveRef({0!r}, {1!r}, {2!r})".format(self.character_name, self.section, self.move.name)
+
+class SortedIndex(object):
+    """A secondary index of items sorted by a numeric key. Range and top-k
+    lookups are a binary search and a slice instead of a scan.
+
+    Args:
+        keyed_items: An iterable of (key, item) tuples. Items with a None key are left out.
+    """
+    def __init__(self, keyed_items):
+        # Only compare keys so ties keep their original order
+        pairs = sorted((p for p in keyed_items if p[0] is not None), key=lambda p: p[0])
+        self.keys = [k for k, _ in pairs]
+        self.items = [item for _, item in pairs]
+
+    def range(self, low=None, high=None):
+        """Returns the items with low <= key <= high, in key order. Either bound can be None."""
+        start = 0 if low is None else bisect.bisect_left(self.keys, low)
+        end = len(self.keys) if high is None else bisect.bisect_right(self.keys, high)
+        return self.items[start:end]
+
+    # A k of 0 or less asks for nothing. Slicing with it would count from the
+    # other end of the index instead.
+    def smallest(self, k):
+        return self.items[:k] if k > 0 else []
+
+    def largest(self, k):
+        return self.items[max(0, len(self.items) - k):][::-1] if k > 0 else []
+
+    def __len__(self):
+        return len(self.keys)
+
+class FrameDataIndex(object):
+    """An in-memory query engine over a loaded roster. It keeps a sorted index
+    per numeric move field and per numeric character attribute, an index of
+    every out of shield option, and name indexes for characters and moves, so
+    that range, top-k and name lookups never scan the roster.
+
+    Args:
+        characters: A list of Character DTOs
+    """
+    # The move fields that can be queried, and the typed DTO attribute they're
+    # read from. A move is keyed by the first number in the field, and moves
+    # whose DTO doesn't have the field or whose field has no number are left out.
+    move_fields = {
+        "startup": "startup_value",
+        "active_frames": "active_frames_value",
+        "total_frames": "total_frames_value",
+        "landing_lag": "landing_lag_value",
+        "base_damage": "base_damage_value",
+        "shield_lag": "shield_lag_value",
+        "shield_stun": "shield_stun_value",
+        "advantage": "advantage_value"
+    }
+    # The character attributes that can be queried, from CharacterMiscAttributes
+    character_fields = (
+        "weight", "gravity", "walk_speed", "run_speed", "initial_dash_speed", "air_speed",
+        "total_air_acceleration", "fall_speed", "fast_fall_speed", "short_hop_frames",
+        "full_hop_frames", "shield_grab_post_shield_stun", "shield_drop", "jump_squat"
+    )
+
+    def __init__(self, characters):
+        self.characters = {c.character_name: c for c in characters}
+        self.moves = []
+        self.__moves_by_name = {}
+
+        for char in characters:
+            for section in dto.Character.sections:
+                for move in char.section_moves[section]:
+                    ref = MoveRef(char.character_name, section, move)
+                    self.moves.append(ref)
+                    self.__moves_by_name.setdefault(dto.MoveNameIndex.normalize_name(move.name), []).append(ref)
+
+        self.__move_indexes = {}
+        for field, attribute in self.move_fields.items():
+            self.__move_indexes[field] = SortedIndex(
+                [(self.__first(getattr(ref.move, attribute, None)), ref) for ref in self.moves])
+
+        self.__character_indexes = {}
+        for field in self.character_fields:
+            self.__character_indexes[field] = SortedIndex(
+                [(self.__first(self.__parse(getattr(c.misc_data, field))), c) for c in characters])
+
+        oos_options = []
+        for char in characters:
+            for oos in char.misc_data.fastest_out_of_shield_options:
+                oos_options.append((oos["startup"], (char.character_name, oos["move"], oos["startup"])))
+        self.__oos_index = SortedIndex(oos_options)
+
+    def character(self, name):
+        return self.characters.get(name)
+
+    def moves_named(self, move_name, character_name=None):
+        """Looks up moves by name, ignoring case and extra whitespace
+
+        Args:
+            move_name: The name of the move, i.e. 'Up Smash'
+            character_name: Only return the move for this character
+        Returns:
+            A list of MoveRefs
+        """
+        refs = self.__moves_by_name.get(dto.MoveNameIndex.normalize_name(move_name), [])
+        if character_name is not None:
+            refs = [r for r in refs if r.character_name == character_name]
+        return refs
+
+    def moves_in_range(self, field, low=None, high=None, section=None):
+        """Finds the moves whose field falls in the range, i.e. every move with
+        startup <= 5 is moves_in_range("startup", high=5)
+
+        Args:
+            field: One of move_fields
+            low: The inclusive lower bound, or None
+            high: The inclusive upper bound, or None
+            section: Only return moves from this section of the page
+        Returns:
+            A list of MoveRefs sorted by the field
+        """
+        refs = self.__move_indexes[field].range(low, high)
+        if section is not None:
+            refs = [r for r in refs if r.section == section]
+        return refs
+
+    def top_moves(self, field, k=10, highest=False):
+        """Returns the k moves with the lowest (or highest) value for the field, or none if k is less than 1"""
+        index = self.__move_indexes[field]
+        return index.largest(k) if highest else index.smallest(k)
+
+    def characters_in_range(self, field, low=None, high=None):
+        """Finds the characters whose misc attribute falls in the range
+
+        Args:
+            field: One of character_fields
+            low: The inclusive lower bound, or None
+            high: The inclusive upper bound, or None
+        Returns:
+            A list of Character DTOs sorted by the attribute
+        """
+        return self.__character_indexes[field].range(low, high)
+
+    def top_characters(self, field, k=10, highest=True):
+        """Returns the k characters with the highest (or lowest) value for the attribute, or none if k is less than 1"""
+        index = self.__character_indexes[field]
+        return index.largest(k) if highest else index.smallest(k)
+
+    def fastest_out_of_shield(self, k=10, max_startup=None):
+        """Returns the fastest out of shield options across the cast
+
+        Args:
+            k: The number of options to return
+            max_startup: Only return options that come out on or before this frame
+        Returns:
+            A list of (character name, move, startup) tuples, fastest first
+        """
+        options = self.__oos_index.range(None, max_startup) if max_startup is not None else self.__oos_index.smallest(k)
+        return options[:k] if k > 0 else []
+
+    def __parse(self, text):
+        # Misc attributes are only kept as text, unlike the moves' typed values
+        return parse_frame_value(text) if isinstance(text, str) else None
+
+    def __first(self, value):
+        return value.first if value is not None else None
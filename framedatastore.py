@@ -0,0 +1,356 @@
+import sqlite3
+from collections.abc import Mapping
+import character as dto
+from dataformat import parse_frame_value
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS characters (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS moves (
+    id INTEGER PRIMARY KEY,
+    character_id INTEGER NOT NULL REFERENCES characters(id) ON DELETE CASCADE,
+    section TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    name TEXT NOT NULL,
+    total_frames TEXT,
+    landing_lag TEXT,
+    notes TEXT,
+    startup TEXT,
+    active_frames TEXT,
+    base_damage TEXT,
+    shield_lag TEXT,
+    shield_stun TEXT,
+    which_hitbox TEXT,
+    advantage TEXT,
+    startup_frame INTEGER,
+    total_frames_value INTEGER,
+    advantage_value INTEGER
+);
+CREATE TABLE IF NOT EXISTS hitboxes (
+    move_id INTEGER NOT NULL REFERENCES moves(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    url TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS misc_attributes (
+    character_id INTEGER NOT NULL REFERENCES characters(id) ON DELETE CASCADE,
+    attribute TEXT NOT NULL,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS out_of_shield (
+    character_id INTEGER NOT NULL REFERENCES characters(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    move TEXT NOT NULL,
+    startup INTEGER
+);
+CREATE TABLE IF NOT EXISTS roster_order (
+    name TEXT PRIMARY KEY,
+    position INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS section_hashes (
+    character_id INTEGER NOT NULL REFERENCES characters(id) ON DELETE CASCADE,
+    section TEXT NOT NULL,
+    hash TEXT NOT NULL,
+    PRIMARY KEY (character_id, section)
+);
+CREATE INDEX IF NOT EXISTS ix_moves_character ON moves (character_id, section, position);
+CREATE INDEX IF NOT EXISTS ix_moves_name ON moves (name COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS ix_moves_startup ON moves (startup_frame);
+CREATE INDEX IF NOT EXISTS ix_moves_total_frames ON moves (total_frames_value);
+CREATE INDEX IF NOT EXISTS ix_moves_advantage ON moves (advantage_value);
+CREATE INDEX IF NOT EXISTS ix_hitboxes_move ON hitboxes (move_id, position);
+CREATE INDEX IF NOT EXISTS ix_misc_character ON misc_attributes (character_id);
+CREATE INDEX IF NOT EXISTS ix_oos_character ON out_of_shield (character_id, position);
+CREATE INDEX IF NOT EXISTS ix_oos_startup ON out_of_shield (startup);
+"""
+
+# The moves table column for each key of a parsed move dictionary
+MOVE_COLUMNS = (
+    ("movename", "name"),
+    ("totalframes", "total_frames"),
+    ("landinglag", "landing_lag"),
+    ("notes", "notes"),
+    ("startup", "startup"),
+    ("activeframes", "active_frames"),
+    ("basedamage", "base_damage"),
+    ("shieldlag", "shield_lag"),
+    ("shieldstun", "shield_stun"),
+    ("whichhitbox", "which_hitbox"),
+    ("advantage", "advantage")
+)
+
+# Characters come back in the order of characters.txt, as recorded by
+# set_roster_order, whatever order they were scraped and stored in. Characters
+# missing from it go last, in the order they were first stored.
+ROSTER_ORDER = "LEFT JOIN roster_order r ON r.name = c.name {0} ORDER BY r.position IS NULL, r.position, c.id"
+
+MOVE_KINDS = {
+    "CharacterAttack": dto.CharacterAttack,
+    "CharacterThrow": dto.CharacterThrow,
+    "CharacterThrowActiveFrames": dto.CharacterThrowActiveFrames,
+    "CharacterDodge": dto.CharacterDodge,
+    "TerryDodge": dto.TerryDodge
+}
+
+class FrameDataStore(object):
+    """Persists Character DTOs to a normalized SQLite database and loads them back.
+    Every move, hitbox, misc attribute and out of shield option gets its own row,
+    and writes are batched into a single transaction.
+
+    Args:
+        db_path: The path of the SQLite database file
+    """
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.connection = sqlite3.connect(db_path)
+        self.connection.execute("PRAGMA foreign_keys = ON")
+        self.connection.executescript(SCHEMA)
+
+    def save_roster(self, characters):
+        """Writes the characters to the database in one transaction, replacing
+        any data already stored for them
+
+        Args:
+            characters: An iterable of Character DTOs
+        """
+        with self.connection:
+            cursor = self.connection.cursor()
+            batch = _InsertBatch(cursor)
+            for char in characters:
+                char_id = self.__get_character_id(cursor, char.character_name)
+                # Nothing says the stored hashes match these DTOs, so the next
+                # incremental rescrape has to parse this character from scratch
+                cursor.execute("DELETE FROM section_hashes WHERE character_id = ?", (char_id,))
+                section_data = dict(char.section_moves)
+                section_data["misc"] = char.misc_data.to_attributes_dict()
+                self.__replace_sections(cursor, batch, char_id, section_data)
+            batch.flush()
+
+    def set_roster_order(self, names):
+        """Records the order of the roster, so characters load in it however
+        the scrape finished
+
+        Args:
+            names: The character names in roster order, as in characters.txt
+        """
+        with self.connection:
+            self.connection.execute("DELETE FROM roster_order")
+            self.connection.executemany("INSERT INTO roster_order (name, position) VALUES (?, ?)",
+                                        [(name, position) for position, name in enumerate(names)])
+
+    def save_sections(self, name, section_data, hashes):
+        """Upserts only the given sections of a character, leaving the rest of
+        its stored data alone, and records the hashes they were parsed from
+
+        Args:
+            name:
+                The name of the character
+            section_data:
+                A dictionary of section name to its parsed data; a list of move
+                DTOs, or the misc attributes dictionary for the misc section
+            hashes:
+                A dictionary of section name (or "page") to hash to store
+        """
+        with self.connection:
+            cursor = self.connection.cursor()
+            batch = _InsertBatch(cursor)
+            char_id = self.__get_character_id(cursor, name)
+            self.__replace_sections(cursor, batch, char_id, section_data)
+            batch.flush()
+            cursor.executemany(
+                "INSERT INTO section_hashes (character_id, section, hash) VALUES (?, ?, ?) "
+                "ON CONFLICT (character_id, section) DO UPDATE SET hash = excluded.hash",
+                [(char_id, section, h) for section, h in hashes.items()])
+
+    def get_hashes(self, name):
+        """Returns a dictionary of section name (and "page") to the hash stored
+        for the character, which is empty if nothing was stored"""
+        query = ("SELECT h.section, h.hash FROM section_hashes h "
+                 "JOIN characters c ON c.id = h.character_id WHERE c.name = ?")
+        return dict(self.connection.execute(query, (name,)).fetchall())
+
+    def get_all_hashes(self):
+        """Returns the stored hashes of every character, keyed by character name"""
+        hashes = {}
+        query = "SELECT c.name, h.section, h.hash FROM section_hashes h JOIN characters c ON c.id = h.character_id"
+        for name, section, h in self.connection.execute(query):
+            hashes.setdefault(name, {})[section] = h
+        return hashes
+
+    def save_character(self, character):
+        self.save_roster([character])
+
+    def character_names(self):
+        query = "SELECT c.name FROM characters c " + ROSTER_ORDER.format("")
+        return [row[0] for row in self.connection.execute(query)]
+
+    def load_character(self, name):
+        """Rebuilds a single character from the database
+
+        Args:
+            name: The name of the character
+        Returns:
+            A Character DTO, or None if the character isn't stored
+        """
+        characters = self.__load("WHERE c.name = ?", (name,))
+        return characters[0] if characters else None
+
+    def load_roster(self):
+        """Rebuilds every stored character from the database
+
+        Returns:
+            A list of Character DTOs in roster order
+        """
+        return self.__load("", ())
+
+    def iter_roster(self, batch_size=16):
+        """Rebuilds the stored characters a batch at a time, for consumers that
+        only need one character at a time and shouldn't hold the whole roster
+
+        Args:
+            batch_size: The number of characters loaded per round of queries
+        Yields:
+            Character DTOs in roster order
+        """
+        ids = [row[0] for row in self.connection.execute("SELECT c.id FROM characters c " + ROSTER_ORDER.format(""))]
+        for start in range(0, len(ids), batch_size):
+            batch = ids[start:start + batch_size]
+            for char in self.__load("WHERE c.id IN ({0})".format(", ".join("?" * len(batch))), tuple(batch)):
+                yield char
+
+    def close(self):
+        self.connection.close()
+
+    def __get_character_id(self, cursor, name):
+        cursor.execute("INSERT INTO characters (name) VALUES (?) ON CONFLICT (name) DO NOTHING", (name,))
+        return cursor.execute("SELECT id FROM characters WHERE name = ?", (name,)).fetchone()[0]
+
+    def __replace_sections(self, cursor, batch, char_id, section_data):
+        """Deletes what's stored for each of the given sections and queues up
+        the rows for their new data"""
+        for section, data in section_data.items():
+            if section == "misc":
+                cursor.execute("DELETE FROM misc_attributes WHERE character_id = ?", (char_id,))
+                cursor.execute("DELETE FROM out_of_shield WHERE character_id = ?", (char_id,))
+                misc = dict(data)
+                for position, oos in enumerate(misc.pop("oos")):
+                    batch.oos_rows.append((char_id, position, oos["move"], oos["startup"]))
+                batch.misc_rows.extend((char_id, k, v) for k, v in misc.items())
+                continue
+
+            cursor.execute("DELETE FROM moves WHERE character_id = ? AND section = ?", (char_id, section))
+            for position, move in enumerate(data):
+                move_id = batch.next_move_id()
+                batch.move_rows.append(self.__move_row(move_id, char_id, section, position, move))
+                for hitbox_position, url in enumerate(move.to_action_dict().get("hitboximg") or []):
+                    batch.hitbox_rows.append((move_id, hitbox_position, url))
+
+    def __move_row(self, move_id, char_id, section, position, move):
+        action_dict = move.to_action_dict()
+        row = [move_id, char_id, section, position, type(move).__name__]
+        row.extend(action_dict.get(key) for key, _ in MOVE_COLUMNS)
+        for key in ("startup", "totalframes", "advantage"):
+            # Index the first number on the page, i.e. the frame the first hit comes out on
+            value = parse_frame_value(action_dict.get(key))
+            row.append(value.first if value is not None else None)
+        return row
+
+    def __load(self, where, params):
+        """Loads the characters matching the where clause with one query per table,
+        grouping the rows in Python rather than querying per character or per move"""
+        chars = self.connection.execute(
+            "SELECT c.id, c.name FROM characters c " + ROSTER_ORDER.format(where), params).fetchall()
+        if not chars:
+            return []
+        char_filter = "WHERE character_id IN (SELECT c.id FROM characters c {0})".format(where)
+
+        hitboxes = {}
+        hitbox_query = ("SELECT move_id, url FROM hitboxes WHERE move_id IN (SELECT id FROM moves {0}) "
+                        "ORDER BY move_id, position").format(char_filter)
+        for move_id, url in self.connection.execute(hitbox_query, params):
+            hitboxes.setdefault(move_id, []).append(url)
+
+        sections = {char_id: {s: [] for s in dto.Character.sections} for char_id, _ in chars}
+        move_query = "SELECT id, character_id, section, kind, {0} FROM moves {1} ORDER BY character_id, section, position".format(
+            ", ".join(c for _, c in MOVE_COLUMNS), char_filter)
+        for row in self.connection.execute(move_query, params):
+            move_id, char_id, section, kind = row[:4]
+            # Keep the None values: a schema fills a field the page left out with None,
+            # and the DTOs read those fields directly
+            action_dict = {key: value for (key, _), value in zip(MOVE_COLUMNS, row[4:])}
+            action_dict["hitboximg"] = hitboxes.get(move_id)
+            sections[char_id][section].append(MOVE_KINDS[kind](action_dict))
+
+        misc = {char_id: {"oos": []} for char_id, _ in chars}
+        misc_query = "SELECT character_id, attribute, value FROM misc_attributes {0}".format(char_filter)
+        for char_id, attribute, value in self.connection.execute(misc_query, params):
+            misc[char_id][attribute] = value
+        oos_query = "SELECT character_id, move, startup FROM out_of_shield {0} ORDER BY character_id, position".format(char_filter)
+        for char_id, move, startup in self.connection.execute(oos_query, params):
+            misc[char_id]["oos"].append({"move": move, "startup": startup})
+
+        return [
+            dto.Character(name, sections[char_id]["ground"], sections[char_id]["aerial"],
+                          sections[char_id]["special"], sections[char_id]["throw"],
+                          sections[char_id]["dodge"], misc[char_id])
+            for char_id, name in chars
+        ]
+
+class StoredRoster(Mapping):
+    """A read-only mapping of character name to Character DTO over a store,
+    which only loads a character from the database when it's looked up. It can
+    stand in for a dictionary of previously parsed characters, i.e. the known
+    characters of a RosterScraper, without loading the whole roster up front.
+
+    Args:
+        store: The FrameDataStore to read from
+    """
+    def __init__(self, store):
+        self.store = store
+        self.__names = store.character_names()
+        self.__name_set = set(self.__names)
+
+    def __getitem__(self, name):
+        char = self.store.load_character(name) if name in self.__name_set else None
+        if char is None:
+            raise KeyError(name)
+        return char
+
+    def __contains__(self, name):
+        return name in self.__name_set
+
+    def __iter__(self):
+        return iter(self.__names)
+
+    def __len__(self):
+        return len(self.__names)
+
+class _InsertBatch(object):
+    """Collects the rows for a transaction so each table is written with a
+    single executemany"""
+    def __init__(self, cursor):
+        self.cursor = cursor
+        self.move_rows = []
+        self.hitbox_rows = []
+        self.misc_rows = []
+        self.oos_rows = []
+        self.__next_move_id = cursor.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM moves").fetchone()[0]
+
+    def next_move_id(self):
+        move_id = self.__next_move_id
+        self.__next_move_id += 1
+        return move_id
+
+    def flush(self):
+        move_columns = ", ".join(c for _, c in MOVE_COLUMNS)
+        self.cursor.executemany(
+            "INSERT INTO moves (id, character_id, section, position, kind, {0}, "
+            "startup_frame, total_frames_value, advantage_value) VALUES ({1})".format(
+                move_columns, ", ".join("?" * (len(MOVE_COLUMNS) + 8))),
+            self.move_rows)
+        self.cursor.executemany("INSERT INTO hitboxes (move_id, position, url) VALUES (?, ?, ?)", self.hitbox_rows)
+        self.cursor.executemany("INSERT INTO misc_attributes (character_id, attribute, value) VALUES (?, ?, ?)", self.misc_rows)
+        self.cursor.executemany("INSERT INTO out_of_shield (character_id, position, move, startup) VALUES (?, ?, ?, ?)", self.oos_rows)
+        self.move_rows, self.hitbox_rows, self.misc_rows, self.oos_rows = [], [], [], []
@@ -0,0 +1,398 @@
+"""A long running HTTP service that keeps the scraped roster in memory and
+answers character, move and query lookups as JSON.
+
+The roster is loaded once into a RosterSnapshot, which encodes every
+character's JSON up front and caches query responses, so a request never
+touches the database or the scraper. A reload builds a new snapshot on a
+worker thread and swaps it in with a single assignment; requests that are in
+flight keep answering from the snapshot they started with.
+
+Usage:
+    python frameserver.py [--db framedata.db | --snapshot roster.snap] [--hitbox-dir hitboxes]
+                          [--host 127.0.0.1] [--port 8080]
+
+Endpoints (all GET unless noted):
+    /status
+    /characters
+    /characters/<name>
+    /characters/<name>/moves/<move name>
+    /moves?name=<move name>
+    /search?q=<words>[&limit=20][&character=][&section=]
+    /query/moves?field=startup[&low=][&high=][&section=]
+    /query/top-moves?field=startup[&k=10][&highest=false]
+    /query/characters?field=weight[&low=][&high=]
+    /query/top-characters?field=weight[&k=10][&highest=true]
+    /query/out-of-shield[?k=10][&max_startup=]
+    /hitboxes/<file>    (with --hitbox-dir; hitbox urls in the JSON point here)
+    POST /reload
+"""
+import argparse
+import asyncio
+import collections
+import json
+import logging
+import os
+import signal
+import time
+from urllib.parse import parse_qs, unquote, urlsplit
+import character as dto
+import framedataquery
+import movesearch
+
+logger = logging.getLogger(__name__)
+
+def move_ref_to_dict(ref):
+    return {"character": ref.character_name, "section": ref.section, "move": ref.move.to_action_dict()}
+
+def encode(data):
+    return json.dumps(data, separators=(',', ':')).encode('utf-8')
+
+class RequestError(Exception):
+    """Raised while answering a request to send an error response
+
+    Args:
+        status: The HTTP status code
+        message: The message sent back in the JSON body
+    """
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+class RosterSnapshot(object):
+    """One immutable, fully indexed version of the roster. Character JSON is
+    encoded when the snapshot is built, and every other response is encoded
+    once and kept in a bounded LRU cache that goes away with the snapshot.
+
+    Args:
+        characters: A list of Character DTOs
+        cache_size: The number of query responses kept encoded
+        search_index: The roster's movesearch.MoveSearchIndex, if one was saved
+            with it. Otherwise it's built from the characters.
+    """
+    def __init__(self, characters, cache_size=4096, search_index=None):
+        self.loaded_at = time.time()
+        self.index = framedataquery.FrameDataIndex(characters)
+        self.search_index = search_index if search_index is not None else movesearch.MoveSearchIndex.build(characters)
+        self.character_names = [c.character_name for c in characters]
+        self.character_bodies = {c.character_name: encode(c.to_dict()) for c in characters}
+        self.status_body = encode({"characters": len(characters), "moves": len(self.index.moves),
+                                   "loaded_at": self.loaded_at})
+        self.cache_size = cache_size
+        self.__responses = collections.OrderedDict()
+
+    def cached(self, key, build):
+        """Returns the encoded response for key, calling build() to make it on a miss"""
+        body = self.__responses.get(key)
+        if body is not None:
+            self.__responses.move_to_end(key)
+            return body
+        body = encode(build())
+        self.__responses[key] = body
+        if len(self.__responses) > self.cache_size:
+            self.__responses.popitem(last=False)
+        return body
+
+class FrameDataService(object):
+    """Routes requests to the current RosterSnapshot and reloads it on demand
+
+    Args:
+        load_roster: A callable that returns a list of Character DTOs. It's run
+            on a worker thread, so it can block on the database.
+        load_search_index: An optional callable that returns the roster's saved
+            movesearch.MoveSearchIndex, run on the same thread after load_roster
+        hitbox_store: An optional hitboxmirror.AssetStore. Hitbox urls that were
+            mirrored into it are rewritten to its files under /hitboxes/, which
+            are served from disk.
+    """
+    hitbox_prefix = "/hitboxes/"
+
+    def __init__(self, load_roster, hitbox_store=None, load_search_index=None):
+        self.load_roster = load_roster
+        self.hitbox_store = hitbox_store
+        self.load_search_index = load_search_index
+        self.snapshot = None
+        self.__reload_lock = None
+
+    async def reload(self):
+        """Builds a new snapshot without blocking the event loop and swaps it in
+
+        Returns:
+            The new RosterSnapshot
+        """
+        if self.__reload_lock is None:
+            self.__reload_lock = asyncio.Lock()
+        # Concurrent reloads would just do the same work twice
+        async with self.__reload_lock:
+            loop = asyncio.get_running_loop()
+            snapshot = await loop.run_in_executor(None, self.__build_snapshot)
+            self.snapshot = snapshot
+            return snapshot
+
+    async def handle(self, method, target):
+        """Answers one request
+
+        Args:
+            method: The HTTP method
+            target: The request target, i.e. '/characters/mario?x=1'
+        Returns:
+            A (status, body bytes, content type) tuple
+        """
+        url = urlsplit(target)
+        parts = [unquote(p) for p in url.path.split('/') if p]
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        try:
+            if parts == ["reload"]:
+                if method != "POST":
+                    raise RequestError(405, "Use POST to reload")
+                snapshot = await self.reload()
+                return 200, snapshot.status_body, "application/json"
+            if method != "GET":
+                raise RequestError(405, "Method not allowed")
+            if len(parts) == 2 and parts[0] == "hitboxes" and self.hitbox_store is not None:
+                return 200, await self.__read_hitbox(parts[1]), "image/gif"
+            # Everything below reads from one snapshot even if a reload lands mid request
+            snapshot = self.snapshot
+            if snapshot is None:
+                raise RequestError(503, "The roster hasn't been loaded yet")
+            return 200, self.__route(snapshot, parts, params), "application/json"
+        except RequestError as e:
+            return e.status, encode({"error": e.message}), "application/json"
+        except Exception:
+            # A bug answering one request shouldn't take down the connection, or go unnoticed
+            logger.exception("Error answering %s %s", method, target)
+            return 500, encode({"error": "Internal server error"}), "application/json"
+
+    def __build_snapshot(self):
+        characters = self.__load()
+        search_index = self.load_search_index() if self.load_search_index is not None else None
+        return RosterSnapshot(characters, search_index=search_index)
+
+    def __load(self):
+        characters = self.load_roster()
+        if self.hitbox_store is not None:
+            import hitboxmirror
+            hitboxmirror.localize_hitboxes(characters, self.hitbox_store, self.hitbox_prefix)
+        return characters
+
+    async def __read_hitbox(self, filename):
+        path = self.hitbox_store.file_path(filename)
+        if path is None or not os.path.exists(path):
+            raise RequestError(404, "No hitbox named {0}".format(filename))
+        def read():
+            with open(path, 'rb') as hitbox_file:
+                return hitbox_file.read()
+        return await asyncio.get_running_loop().run_in_executor(None, read)
+
+    def __route(self, snapshot, parts, params):
+        if parts == ["status"]:
+            return snapshot.status_body
+        if parts == ["characters"]:
+            return snapshot.cached(("characters",), lambda: snapshot.character_names)
+        if len(parts) == 2 and parts[0] == "characters":
+            body = snapshot.character_bodies.get(parts[1])
+            if body is None:
+                raise RequestError(404, "No character named {0}".format(parts[1]))
+            return body
+        if len(parts) == 4 and parts[0] == "characters" and parts[2] == "moves":
+            return snapshot.cached(("move", parts[1], parts[3].lower()),
+                                   lambda: self.__find_move(snapshot, parts[1], parts[3]))
+        if parts == ["moves"]:
+            name = self.__param(params, "name", str)
+            return snapshot.cached(("moves", name.lower()),
+                                   lambda: [move_ref_to_dict(r) for r in snapshot.index.moves_named(name)])
+        if parts == ["search"]:
+            key = ("search",) + tuple(sorted(params.items()))
+            return snapshot.cached(key, lambda: self.__search(snapshot, params))
+        if len(parts) == 2 and parts[0] == "query":
+            key = ("query", parts[1]) + tuple(sorted(params.items()))
+            return snapshot.cached(key, lambda: self.__query(snapshot.index, parts[1], params))
+        raise RequestError(404, "Nothing at /{0}".format("/".join(parts)))
+
+    def __find_move(self, snapshot, char_name, move_name):
+        char = snapshot.index.character(char_name)
+        if char is None:
+            raise RequestError(404, "No character named {0}".format(char_name))
+        move = char.find_move(move_name)
+        if move is None:
+            raise RequestError(404, "{0} has no move named {1}".format(char_name, move_name))
+        section = next(s for s in dto.Character.sections if move in char.section_moves[s])
+        return move_ref_to_dict(framedataquery.MoveRef(char_name, section, move))
+
+    def __search(self, snapshot, params):
+        hits = snapshot.search_index.search(self.__param(params, "q", str), self.__param(params, "limit", self.__positive_int, 20),
+                                            params.get("character"), params.get("section"))
+        results = []
+        for hit in hits:
+            move = hit.resolve(snapshot.index.characters)
+            result = move_ref_to_dict(framedataquery.MoveRef(hit.character_name, hit.section, move))
+            result["score"] = hit.score
+            results.append(result)
+        return results
+
+    def __query(self, index, query, params):
+        if query == "moves":
+            field = self.__field(params, index.move_fields)
+            refs = index.moves_in_range(field, self.__param(params, "low", float, None),
+                                        self.__param(params, "high", float, None), params.get("section"))
+            return [move_ref_to_dict(r) for r in refs]
+        if query == "top-moves":
+            field = self.__field(params, index.move_fields)
+            refs = index.top_moves(field, self.__param(params, "k", self.__positive_int, 10),
+                                   self.__param(params, "highest", self.__bool, False))
+            return [move_ref_to_dict(r) for r in refs]
+        if query == "characters":
+            field = self.__field(params, index.character_fields)
+            chars = index.characters_in_range(field, self.__param(params, "low", float, None),
+                                              self.__param(params, "high", float, None))
+            return [{"name": c.character_name, field: getattr(c.misc_data, field)} for c in chars]
+        if query == "top-characters":
+            field = self.__field(params, index.character_fields)
+            chars = index.top_characters(field, self.__param(params, "k", self.__positive_int, 10),
+                                         self.__param(params, "highest", self.__bool, True))
+            return [{"name": c.character_name, field: getattr(c.misc_data, field)} for c in chars]
+        if query == "out-of-shield":
+            options = index.fastest_out_of_shield(self.__param(params, "k", self.__positive_int, 10),
+                                                  self.__param(params, "max_startup", float, None))
+            return [{"character": c, "move": m, "startup": s} for c, m, s in options]
+        raise RequestError(404, "No query named {0}".format(query))
+
+    def __field(self, params, fields):
+        field = self.__param(params, "field", str)
+        if field not in fields:
+            raise RequestError(400, "field must be one of {0}".format(", ".join(sorted(fields))))
+        return field
+
+    def __param(self, params, name, convert, *default):
+        if name not in params:
+            if default:
+                return default[0]
+            raise RequestError(400, "Missing the {0} parameter".format(name))
+        try:
+            return convert(params[name])
+        except ValueError:
+            raise RequestError(400, "Bad value for {0}: {1}".format(name, params[name]))
+
+    @staticmethod
+    def __positive_int(text):
+        number = int(text)
+        if number < 1:
+            raise ValueError(text)
+        return number
+
+    @staticmethod
+    def __bool(text):
+        if text.lower() not in ("true", "false", "1", "0"):
+            raise ValueError(text)
+        return text.lower() in ("true", "1")
+
+class HttpServer(object):
+    """A minimal HTTP/1.1 server on asyncio streams with keep-alive, which is
+    all the service needs without pulling in a web framework
+
+    Args:
+        service: The FrameDataService that answers requests
+    """
+    reasons = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+               500: "Internal Server Error", 503: "Service Unavailable"}
+
+    def __init__(self, service):
+        self.service = service
+
+    async def serve(self, host, port):
+        server = await asyncio.start_server(self.__handle_connection, host, port)
+        async with server:
+            await server.serve_forever()
+
+    async def __handle_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                method, target, version = request_line.decode('latin-1').split()
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    key, _, value = line.decode('latin-1').partition(":")
+                    headers[key.strip().lower()] = value.strip()
+                if "content-length" in headers:
+                    await reader.readexactly(int(headers["content-length"]))
+
+                status, body, content_type = await self.service.handle(method, target)
+                keep_alive = headers.get("connection", "").lower() != "close" and version == "HTTP/1.1"
+                writer.write("HTTP/1.1 {0} {1}\r\nContent-Type: {2}\r\nContent-Length: {3}\r\n"
+                             "Connection: {4}\r\n\r\n".format(status, self.reasons[status], content_type, len(body),
+                                                              "keep-alive" if keep_alive else "close")
+                             .encode('latin-1') + body)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ValueError, ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+def store_loader(db_path):
+    """Returns a roster loader for FrameDataService that reads from a FrameDataStore"""
+    def load_roster():
+        import framedatastore
+        store = framedatastore.FrameDataStore(db_path)
+        try:
+            return store.load_roster()
+        finally:
+            store.close()
+    return load_roster
+
+def snapshot_loader(snapshot_path):
+    """Returns a roster loader for FrameDataService that reads a rostersnapshot file,
+    which is much faster to start from than the database"""
+    def load_roster():
+        import rostersnapshot
+        with rostersnapshot.SnapshotReader(snapshot_path) as reader:
+            return reader.load_roster()
+    return load_roster
+
+async def reload_on_signal(service):
+    """Reloads the roster for SIGHUP. There's no client to send a failure to,
+    so it's logged and the old snapshot keeps being served."""
+    try:
+        await service.reload()
+    except Exception:
+        logger.exception("Reloading the roster on SIGHUP failed, still serving the previous one")
+
+async def run(service, host, port):
+    await service.reload()
+    loop = asyncio.get_running_loop()
+    # SIGHUP reloads too, so a cron job can swap in a fresh scrape without an HTTP client
+    if hasattr(signal, "SIGHUP"):
+        loop.add_signal_handler(signal.SIGHUP, lambda: asyncio.ensure_future(reload_on_signal(service)))
+    print("Serving {0} characters on http://{1}:{2}".format(len(service.snapshot.character_names), host, port))
+    await HttpServer(service).serve(host, port)
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(description="Serve the scraped frame data over HTTP")
+    arg_parser.add_argument("--db", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'framedata.db'),
+                            help="SQLite database the roster is loaded from")
+    arg_parser.add_argument("--snapshot", default=None,
+                            help="Load the roster from this rostersnapshot file instead of the database")
+    arg_parser.add_argument("--hitbox-dir", default=None,
+                            help="Serve the hitbox gifs mirrored into this directory by hitboxmirror.py")
+    arg_parser.add_argument("--host", default="127.0.0.1")
+    arg_parser.add_argument("--port", type=int, default=8080)
+    args = arg_parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    try:
+        loader = snapshot_loader(args.snapshot) if args.snapshot else store_loader(args.db)
+        # A snapshot has its search index saved next to it
+        load_search_index = (lambda: movesearch.load_for_snapshot(args.snapshot)) if args.snapshot else None
+        hitbox_store = None
+        if args.hitbox_dir:
+            import hitboxmirror
+            hitbox_store = hitboxmirror.AssetStore(args.hitbox_dir)
+        asyncio.run(run(FrameDataService(loader, hitbox_store, load_search_index), args.host, args.port))
+    except KeyboardInterrupt:
+        pass
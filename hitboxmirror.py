@@ -0,0 +1,206 @@
+"""Mirrors the hitbox gifs linked from the roster's moves into a local,
+content-addressed store, so the frontend doesn't hotlink the site.
+
+Every hitbox url in the roster is collected into a set first, so a gif that's
+linked from several moves (echo fighters share a lot of them) is only
+downloaded once, and urls that were mirrored on an earlier run are skipped.
+That only catches repeats of the same url. Two different urls that serve the
+same gif are both downloaded, and deduplicated after the fact: files are
+stored by the sha256 of their bytes, so the second download is never written
+and both urls point at one file.
+
+Usage:
+    python hitboxmirror.py [--db framedata.db] [--asset-dir hitboxes] [--rate 5] [--connections 4]
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import posixpath
+import threading
+from urllib.parse import urlsplit
+import character as dto
+
+class AssetStore(object):
+    """A directory of files stored once by content hash, with an index of the
+    url each one was downloaded from. Files live at objects/<hash[:2]>/<hash><ext>.
+
+    Args:
+        asset_dir: The directory the store lives in
+    """
+    index_filename = 'index.json'
+
+    def __init__(self, asset_dir):
+        self.asset_dir = asset_dir
+        self.objects_dir = os.path.join(asset_dir, 'objects')
+        self.index_path = os.path.join(asset_dir, self.index_filename)
+        # url -> file name, i.e. '<hash>.gif'
+        self.index = {}
+        self.__lock = threading.Lock()
+        os.makedirs(self.objects_dir, exist_ok=True)
+        if os.path.exists(self.index_path):
+            with open(self.index_path) as index_file:
+                self.index = json.load(index_file)
+        # The file names already written, so a repeat of their content isn't written again
+        self.__stored = set(f for f in self.index.values() if os.path.exists(self.file_path(f) or ''))
+
+    def has(self, url):
+        with self.__lock:
+            filename = self.index.get(url)
+        path = self.file_path(filename) if filename is not None else None
+        return path is not None and os.path.exists(path)
+
+    def filename_for(self, url):
+        """Returns the stored file name for a url, or None if it wasn't mirrored"""
+        with self.__lock:
+            return self.index.get(url)
+
+    def file_path(self, filename):
+        """Returns the path on disk of a stored file name, or None for a name that
+        isn't a stored file, so names from a request can be passed straight in"""
+        digest, ext = posixpath.splitext(filename)
+        if len(digest) != 64 or any(c not in "0123456789abcdef" for c in digest) or "/" in ext:
+            return None
+        return os.path.join(self.objects_dir, digest[:2], filename)
+
+    def put(self, url, data):
+        """Stores a downloaded file, writing it only if its content is new
+
+        Args:
+            url: The url the file was downloaded from
+            data: The file's bytes
+        Returns:
+            A (file name, written) tuple, where written is False if another url
+            had already stored the same content
+        """
+        ext = posixpath.splitext(urlsplit(url).path)[1].lower() or '.gif'
+        filename = hashlib.sha256(data).hexdigest() + ext
+        path = self.file_path(filename)
+        with self.__lock:
+            written = filename not in self.__stored and not os.path.exists(path)
+            if written:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                temp_path = '{0}.{1}.tmp'.format(path, threading.get_ident())
+                with open(temp_path, 'wb') as asset_file:
+                    asset_file.write(data)
+                os.replace(temp_path, path)
+            self.__stored.add(filename)
+            self.index[url] = filename
+        return filename, written
+
+    def file_count(self):
+        """Returns the number of distinct files the indexed urls point at"""
+        with self.__lock:
+            return len(set(self.index.values()))
+
+    def flush(self):
+        """Writes the url index to disk"""
+        with self.__lock:
+            temp_path = self.index_path + '.tmp'
+            with open(temp_path, 'w') as index_file:
+                json.dump(self.index, index_file, indent=2, sort_keys=True)
+            os.replace(temp_path, self.index_path)
+
+def hitbox_urls(characters):
+    """Collects every distinct hitbox url in the roster
+
+    Args:
+        characters: An iterable of Character DTOs
+    Returns:
+        A sorted list of urls
+    """
+    urls = set()
+    for char in characters:
+        for section in dto.Character.sections:
+            for move in char.section_moves[section]:
+                urls.update(getattr(move, "hitbox", None) or ())
+    return sorted(urls)
+
+class HitboxMirror(object):
+    """Downloads the hitbox gifs of a roster into an AssetStore
+
+    Args:
+        store: The AssetStore to mirror into
+        async_fetcher: The asyncfetcher.AsyncPageFetcher used to download, which
+            keeps the mirror inside the site's rate limit
+    """
+    def __init__(self, store, async_fetcher):
+        self.store = store
+        self.async_fetcher = async_fetcher
+
+    async def mirror(self, urls):
+        """Downloads every url that isn't already in the store, all at once
+
+        Args:
+            urls: The urls to mirror
+        Returns:
+            A (downloaded, skipped, duplicates, failures) tuple. duplicates is
+            how many of the downloads had the same content as a file already
+            stored, and failures is a dictionary of url to the exception that
+            stopped its download.
+        """
+        missing = [url for url in dict.fromkeys(urls) if not self.store.has(url)]
+        results = await asyncio.gather(*(self.async_fetcher.fetch_asset(url) for url in missing),
+                                       return_exceptions=True)
+        failures = {}
+        duplicates = 0
+        for url, result in zip(missing, results):
+            if isinstance(result, Exception):
+                failures[url] = result
+            elif not self.store.put(url, result)[1]:
+                duplicates += 1
+        self.store.flush()
+        return len(missing) - len(failures), len(set(urls)) - len(missing), duplicates, failures
+
+def localize_hitboxes(characters, store, url_prefix):
+    """Points the hitbox urls of the roster's moves at the mirrored copies.
+    Urls that weren't mirrored are left alone. The DTOs are changed in place.
+
+    Args:
+        characters: A list of Character DTOs
+        store: The AssetStore holding the mirrored gifs
+        url_prefix: What the stored file name is appended to, i.e. '/hitboxes/'
+    Returns:
+        The characters
+    """
+    def local_url(url):
+        filename = store.filename_for(url)
+        return url if filename is None else url_prefix + filename
+
+    for char in characters:
+        for section in dto.Character.sections:
+            for move in char.section_moves[section]:
+                hitboxes = getattr(move, "hitbox", None)
+                if hitboxes:
+                    move.hitbox = [local_url(url) for url in hitboxes]
+    return characters
+
+if __name__ == '__main__':
+    import asyncfetcher
+    import framedatastore
+    import pagefetcher
+
+    script_path = os.path.dirname(os.path.abspath(__file__))
+    arg_parser = argparse.ArgumentParser(description="Mirror the roster's hitbox gifs locally")
+    arg_parser.add_argument("--db", default=os.path.join(script_path, 'framedata.db'),
+                            help="SQLite database to read the roster from")
+    arg_parser.add_argument("--asset-dir", default=os.path.join(script_path, 'hitboxes'),
+                            help="Directory the gifs are stored in")
+    arg_parser.add_argument("--rate", type=asyncfetcher.positive_rate, default=5.0, help="Most downloads a second, on average")
+    arg_parser.add_argument("--connections", type=int, default=4, help="Most downloads in flight at once")
+    args = arg_parser.parse_args()
+
+    store = framedatastore.FrameDataStore(args.db)
+    urls = hitbox_urls(store.iter_roster())
+    store.close()
+
+    fetcher = asyncfetcher.AsyncPageFetcher(pagefetcher.PageFetcher(), rate=args.rate, burst=max(1, int(args.rate)),
+                                            per_host=args.connections)
+    asset_store = AssetStore(args.asset_dir)
+    mirror = HitboxMirror(asset_store, fetcher)
+    downloaded, skipped, duplicates, failures = asyncio.run(mirror.mirror(urls))
+    for url, error in sorted(failures.items()):
+        print("Failed to download {0}: {1!r}".format(url, error))
+    print("Downloaded {0} and skipped {1} of {2} hitbox gifs. {3} downloads repeated a stored gif, "
+          "and the urls share {4} files.".format(downloaded, skipped, len(urls), duplicates, asset_store.file_count()))
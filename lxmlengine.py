@@ -0,0 +1,112 @@
+import lxml.html
+from lxml import etree
+import dataparser as hdp
+import scrapeengine
+
+def class_test(class_name):
+    """An XPath predicate that matches elements that have class_name among their classes"""
+    return "contains(concat(' ', normalize-space(@class), ' '), ' {0} ')".format(class_name)
+
+# Compiled once and shared by every page
+find_sections = etree.XPath("//div[{0}]".format(class_test("moves")))
+find_plain_container = etree.XPath(".//div[normalize-space(@class) = 'movecontainer plain']")
+find_move_containers = etree.XPath(".//div[{0}]".format(class_test("movecontainer")))
+find_move_fields = etree.XPath(".//div[@class] | .//a[{0}]".format(class_test("hitboximg")))
+
+class LxmlMoveExtractor(object):
+    """The lxml counterpart of dataparser.MoveContainerExtractor. One compiled
+    XPath query returns every candidate element of a move container in
+    document order, and the wanted fields are filled in from that single list.
+
+    Args:
+        html_classes: The classes of the elements that hold a move's data
+    """
+    def __init__(self, html_classes):
+        self.html_classes = list(html_classes)
+        self.field_classes = frozenset(c for c in self.html_classes if c != "hitboximg")
+
+    def extract(self, container):
+        return self.read(*self.scan(container))
+
+    def scan(self, container):
+        found = {}
+        hitbox_urls = []
+        for element in find_move_fields(container):
+            if element.tag == "a":
+                hitbox_urls.append(element.attrib['data-featherlight'].strip())
+                continue
+            element_classes = element.attrib['class'].split()
+            if len(element_classes) == 1 and element_classes[0] in self.field_classes and element_classes[0] not in found:
+                found[element_classes[0]] = element
+        return found, hitbox_urls
+
+    def read(self, found, hitbox_urls, fields=None):
+        parsed_data = {}
+        for c in self.html_classes:
+            if fields is not None and c not in fields:
+                continue
+            if c == "hitboximg":
+                parsed_data[c] = hitbox_urls if hitbox_urls else None
+            elif c in found:
+                parsed_data[c] = found[c].text_content().strip()
+        return parsed_data
+
+class LxmlMiscDataParser(hdp.MiscDataParser):
+    """Pulls the 'misc info' rows out of an lxml element and hands them to the
+    row parsing shared with MiscDataParser"""
+    def get_all_misc_data(self):
+        misc_container = None
+        for child in self.html.iterchildren("div"):
+            if child.attrib.get('class', '').split() != ['movecontainer']:
+                misc_container = child
+                break
+        misc_data_elements = [e for e in misc_container.iterchildren() if isinstance(e.tag, str)]
+        regular_misc_data = [e.text_content() for e in misc_data_elements if not e.attrib]
+        oos_elements = [(t.attrib.get('class', '').split(), t.text_content()) for t in misc_data_elements if t.attrib]
+        return self.parse_misc_rows(regular_misc_data, oos_elements)
+
+class LxmlScrapeEngine(scrapeengine.ScrapeEngine):
+    """A ScrapeEngine that parses pages with lxml.html and compiled XPath queries
+    instead of building a BeautifulSoup tree. It produces the same DTOs as the
+    BeautifulSoup engine, at a fraction of the memory and CPU per page.
+
+    Section hashes are taken from lxml's serialization of the html, so they
+    don't match the hashes stored by the BeautifulSoup engine.
+    """
+    move_extractor = LxmlMoveExtractor(scrapeengine.ScrapeEngine.html_classes)
+
+    def parse_page(self, html):
+        """Builds the lxml document that get_frame_data expects from raw html
+
+        Args:
+            html: The raw html of the character's frame data page
+        Returns:
+            The root element of the page
+        """
+        return lxml.html.document_fromstring(html)
+
+    def get_sections(self, page_data):
+        char_moves = find_sections(page_data)
+        # Some characters like Bowser have a section of one-off information before their moves
+        if find_plain_container(char_moves[0]):
+            return char_moves[1:]
+        return char_moves
+
+    def get_section_html(self, section):
+        return lxml.html.tostring(section, encoding='unicode')
+
+    def get_move_containers(self, section):
+        return find_move_containers(section)
+
+    def extract_move_data(self, container, section_name=None):
+        # There's no per-class lookup path for lxml to fall back on
+        return self.extract_move_fields(container, section_name)
+
+    def create_misc_parser(self, misc_attributes, char_name):
+        return LxmlMiscDataParser(misc_attributes, char_name)
+
+# The parse engines that can be picked per run
+engines = {
+    "bs4": scrapeengine.ScrapeEngine,
+    "lxml": LxmlScrapeEngine
+}
@@ -0,0 +1,102 @@
+"""Works out what kind of move a move container holds from the section it's in
+and the fields it has, instead of from how many fields it has.
+
+Each kind of move has a MoveSchema: the fields that identify it, the fields
+its DTO can do without, and the DTO class to build. Every section lists the
+schemas it can hold, most specific first, and a move is the first schema
+whose required fields it has. A stray tag on the page adds a field, which
+can't knock a move out of its kind the way it changed the field count.
+
+The whole roster only has a handful of container layouts, so the schema for
+each (section, fields present) signature is worked out once and memoized.
+A move that fits nothing in its own section, like a counter laid out as a
+dodge in the specials, falls back to the schemas of every section, so it's
+built the same way it was when the field count decided.
+"""
+import functools
+import character as dto
+
+class MoveLayoutError(Exception):
+    """Raised for a move whose fields don't fit any kind of move in its section"""
+    pass
+
+class MoveSchema(object):
+    """A kind of move and the fields its DTO is built from
+
+    Args:
+        dto_class: The CharacterAction DTO class built for the move
+        required: The html classes a move must have to be this kind
+        optional: The html classes the DTO reads but can be None
+    """
+    __slots__ = ("dto_class", "required", "optional", "fields")
+
+    def __init__(self, dto_class, required, optional=()):
+        self.dto_class = dto_class
+        self.required = frozenset(required)
+        self.optional = tuple(optional)
+        # Everything the DTO reads, so extraction can skip the rest
+        self.fields = self.required.union(self.optional)
+
+    def matches(self, present):
+        return self.required <= present
+
+    def build(self, parsed_data):
+        """Builds the DTO, filling in None for any optional field that's missing
+
+        Args:
+            parsed_data: A dictionary of html class to the text of the field
+        Returns:
+            The move DTO
+        """
+        for field in self.optional:
+            if field not in parsed_data:
+                parsed_data[field] = None
+        return self.dto_class(parsed_data)
+
+    def __repr__(self):
+        return "MoveSchema({0})".format(self.dto_class.__name__)
+
+# Every move has these, but only the name is needed to build one
+action_fields = ("totalframes", "landinglag", "notes")
+
+attack = MoveSchema(dto.CharacterAttack,
+                    ("movename", "startup", "basedamage", "shieldlag", "shieldstun"),
+                    action_fields + ("whichhitbox", "advantage", "activeframes", "hitboximg"))
+# Kirby and friends have throws with active frames
+throw_active_frames = MoveSchema(dto.CharacterThrowActiveFrames,
+                                 ("movename", "startup", "basedamage", "activeframes"),
+                                 action_fields + ("hitboximg",))
+throw = MoveSchema(dto.CharacterThrow, ("movename", "startup", "basedamage"), action_fields + ("hitboximg",))
+# Terry's spot dodge attack is a dodge with the frame data of an attack
+terry_dodge = MoveSchema(dto.TerryDodge, ("movename", "startup", "advantage", "activeframes"),
+                         action_fields + ("hitboximg",))
+dodge = MoveSchema(dto.CharacterDodge, ("movename",), action_fields)
+
+# The schemas each section can hold, most specific first
+section_schemas = {
+    "ground": (attack,),
+    "aerial": (attack,),
+    "special": (attack,),
+    "throw": (throw_active_frames, throw),
+    "dodge": (terry_dodge, dodge)
+}
+# Tried when the section isn't known, or nothing in the section fits
+any_section_schemas = (attack, terry_dodge, throw_active_frames, throw, dodge)
+
+@functools.lru_cache(maxsize=256)
+def classify(section_name, present):
+    """Picks the schema for a move
+
+    Args:
+        section_name: The section the move is in, or None if it isn't known
+        present: A frozenset of the html classes the move container has
+    Returns:
+        The MoveSchema of the move
+    Raises:
+        MoveLayoutError: If the move doesn't fit any schema of any section
+    """
+    for schema in section_schemas.get(section_name, ()) + any_section_schemas:
+        if schema.matches(present):
+            return schema
+    raise MoveLayoutError("A move in the {0} section has an unknown layout: {1}".format(
+        section_name, ", ".join(sorted(present))))
@@ -0,0 +1,321 @@
+"""Keyword search over every move name and note in the roster, i.e. to find
+the moves with armor or the moves that mention 'intangible'.
+
+The index is an inverted index built once: each word of a move's name and
+notes maps to the sorted ids of the moves it appears in, and the vocabulary
+is kept sorted so a word prefix ('intang') is a binary search. A query word
+that matches nothing is corrected by up to one typo ('nuetral' finds
+'neutral') through a table of the vocabulary with one letter deleted, so a
+lookup never runs difflib over the roster.
+
+The index is saved as JSON next to the roster snapshot it was built from,
+along with the snapshot's size and modification time, and is only rebuilt
+when the snapshot changes.
+
+Usage:
+    python movesearch.py --snapshot roster.snap "super armor" [--character ganondorf] [--section special]
+"""
+import argparse
+import bisect
+import json
+import os
+import re
+import character as dto
+import rostermanifest
+
+FORMAT_VERSION = 2
+
+word_pattern = re.compile(r"[a-z0-9]+")
+# Left out of the index and out of queries
+stop_words = frozenset(["a", "an", "and", "are", "do", "does", "for", "has", "have", "in", "is", "it",
+                        "of", "on", "or", "the", "that", "to", "what", "which", "with"])
+# Also left out of queries, so "moves that mention intangible" searches for "intangible"
+query_stop_words = stop_words.union(["find", "mention", "mentions", "move", "moves", "show"])
+
+def tokenize(text, skip=stop_words):
+    """Splits text into lowercase index words, i.e. "Ike's Up B" is ['ikes', 'up', 'b']
+
+    Args:
+        text: The text of a move name or note, or None
+        skip: The words to leave out
+    Returns:
+        A list of words in order
+    """
+    if not text:
+        return []
+    text = text.lower().replace("'", "").replace(u"\u2019", "")
+    return [w for w in word_pattern.findall(text) if w not in skip]
+
+def typo_distance(a, b):
+    """The number of single letter insertions, deletions, substitutions and swaps
+    of neighbouring letters that turn a into b"""
+    previous2, previous = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        previous2, previous = previous, current
+    return previous[len(b)]
+
+class SearchHit(object):
+    """A move that matched a search
+
+    Args:
+        character_name: The name of the character
+        section: The section of the page the move is in
+        position: The move's position in its section, i.e. to find it in character.section_moves
+        move_name: The name of the move
+        score: Higher for better matches. A word in the name counts twice, and
+            a prefix or typo match counts less than the whole word.
+    """
+    __slots__ = ("character_name", "section", "position", "move_name", "score")
+
+    def __init__(self, character_name, section, position, move_name, score):
+        self.character_name = character_name
+        self.section = section
+        self.position = position
+        self.move_name = move_name
+        self.score = score
+
+    def resolve(self, roster):
+        """Returns the move DTO for the hit
+
+        Args:
+            roster: A mapping of character name to Character DTO
+        """
+        return roster[self.character_name].section_moves[self.section][self.position]
+
+    def __repr__(self):
+        return "SearchHit({0!r}, {1!r}, {2!r}, {3:.2f})".format(
+            self.character_name, self.section, self.move_name, self.score)
+
+class MoveSearchIndex(object):
+    """An inverted index over the names and notes of every move in the roster
+
+    Args:
+        docs: A list of (character name, section, position, move name) tuples, one per move
+        postings: A dictionary of field ("name" or "notes") to a dictionary of
+            word to the sorted ids (positions in docs) of the moves that have it
+    """
+    fields = ("name", "notes")
+    # How much a match in each field is worth
+    field_weights = {"name": 2.0, "notes": 1.0}
+    prefix_weight = 0.75
+    typo_weight = 0.5
+    # Shorter words are only matched exactly or as a prefix
+    min_typo_length = 4
+    min_prefix_length = 3
+
+    def __init__(self, docs, postings):
+        self.docs = docs
+        self.postings = postings
+        self.vocabulary = sorted(set().union(*(postings[f] for f in self.fields)))
+        # Built on the first query that needs typo correction
+        self.__deletes = None
+
+    @classmethod
+    def build(cls, characters):
+        """Indexes a roster
+
+        Args:
+            characters: An iterable of Character DTOs
+        Returns:
+            A MoveSearchIndex
+        """
+        docs = []
+        postings = {f: {} for f in cls.fields}
+        for char in characters:
+            for section in dto.Character.sections:
+                for position, move in enumerate(char.section_moves[section]):
+                    doc_id = len(docs)
+                    docs.append((char.character_name, section, position, move.name))
+                    for field, text in (("name", move.name), ("notes", move.notes)):
+                        field_postings = postings[field]
+                        for word in set(tokenize(text)):
+                            field_postings.setdefault(word, []).append(doc_id)
+        return cls(docs, postings)
+
+    def search(self, query, limit=20, character=None, section=None):
+        """Finds the moves that match every word of the query, by whole word,
+        by prefix, or with a typo if the word matches nothing else
+
+        Args:
+            query: The words to look for, i.e. "super armor"
+            limit: The most hits to return, or None for all of them. A limit
+                below 1 returns nothing.
+            character: Only return moves of this character
+            section: Only return moves from this section of the page
+        Returns:
+            A list of SearchHits, best first, then in roster order
+        """
+        words = tokenize(query, query_stop_words)
+        if not words or (limit is not None and limit < 1):
+            return []
+        scores = None
+        for word in words:
+            word_scores = self.__score_word(word)
+            if scores is None:
+                scores = word_scores
+            else:
+                scores = {doc_id: score + word_scores[doc_id] for doc_id, score in scores.items() if doc_id in word_scores}
+            if not scores:
+                return []
+
+        hits = []
+        for doc_id in sorted(scores, key=lambda d: (-scores[d], d)):
+            char_name, move_section, position, move_name = self.docs[doc_id]
+            if character is not None and char_name != character:
+                continue
+            if section is not None and move_section != section:
+                continue
+            hits.append(SearchHit(char_name, move_section, position, move_name, scores[doc_id]))
+            if limit is not None and len(hits) >= limit:
+                break
+        return hits
+
+    def expand(self, word):
+        """Finds the indexed words a query word stands for
+
+        Returns:
+            A dictionary of indexed word to how much a match on it is worth: the
+            word itself, words it's a prefix of, or failing those, words one typo away
+        """
+        expansions = {}
+        if len(word) >= self.min_prefix_length:
+            start = bisect.bisect_left(self.vocabulary, word)
+            for indexed in self.vocabulary[start:]:
+                if not indexed.startswith(word):
+                    break
+                expansions[indexed] = self.prefix_weight
+        if self.__has_word(word):
+            expansions[word] = 1.0
+        if not expansions and len(word) >= self.min_typo_length:
+            for indexed in self.__typo_candidates(word):
+                if typo_distance(word, indexed) <= 1:
+                    expansions[indexed] = self.typo_weight
+        return expansions
+
+    def __score_word(self, word):
+        scores = {}
+        for indexed, weight in self.expand(word).items():
+            for field in self.fields:
+                field_score = weight * self.field_weights[field]
+                for doc_id in self.postings[field].get(indexed, ()):
+                    if scores.get(doc_id, 0.0) < field_score:
+                        scores[doc_id] = field_score
+        return scores
+
+    def __has_word(self, word):
+        return any(word in self.postings[f] for f in self.fields)
+
+    def __typo_candidates(self, word):
+        if self.__deletes is None:
+            # Every indexed word under itself and each way of deleting one letter.
+            # Two words one typo apart always share one of these keys.
+            deletes = {}
+            for indexed in self.vocabulary:
+                if len(indexed) < self.min_typo_length - 1:
+                    continue
+                for key in self.__delete_keys(indexed):
+                    deletes.setdefault(key, set()).add(indexed)
+            self.__deletes = deletes
+        candidates = set()
+        for key in self.__delete_keys(word):
+            candidates.update(self.__deletes.get(key, ()))
+        return candidates
+
+    @staticmethod
+    def __delete_keys(word):
+        keys = {word}
+        keys.update(word[:i] + word[i + 1:] for i in range(len(word)))
+        return keys
+
+    def save(self, path, source_stamp=None):
+        """Writes the index to a JSON file
+
+        Args:
+            path: The file to write
+            source_stamp: The [size, mtime_ns] of the snapshot the index was built from
+        """
+        data = {
+            "format": FORMAT_VERSION,
+            "source_stamp": source_stamp,
+            "docs": self.docs,
+            "postings": self.postings
+        }
+        temp_path = path + '.tmp'
+        with open(temp_path, 'w') as index_file:
+            json.dump(data, index_file, separators=(',', ':'))
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path, source_stamp=None):
+        """Reads an index written by save
+
+        Args:
+            path: The file to read
+            source_stamp: If given, the index is only returned if it was built
+                from a snapshot with this [size, mtime_ns]
+        Returns:
+            A MoveSearchIndex, or None if the file is missing, from another
+            format version, or stale
+        """
+        try:
+            with open(path) as index_file:
+                data = json.load(index_file)
+        except (OSError, ValueError):
+            return None
+        if data.get("format") != FORMAT_VERSION:
+            return None
+        if source_stamp is not None and data.get("source_stamp") != source_stamp:
+            return None
+        return cls([tuple(doc) for doc in data["docs"]], data["postings"])
+
+def index_path_for_snapshot(snapshot_path):
+    """Where the search index of a rostersnapshot file lives"""
+    return snapshot_path + '.search.json'
+
+def build_for_snapshot(snapshot_path, characters=None):
+    """Builds the search index of a snapshot and saves it next to the snapshot
+
+    Args:
+        snapshot_path: The rostersnapshot file
+        characters: The snapshot's Character DTOs, if they're already loaded
+    Returns:
+        The MoveSearchIndex
+    """
+    if characters is None:
+        import rostersnapshot
+        with rostersnapshot.SnapshotReader(snapshot_path) as reader:
+            characters = reader.load_roster()
+    index = MoveSearchIndex.build(characters)
+    index.save(index_path_for_snapshot(snapshot_path), rostermanifest.snapshot_stamp(snapshot_path))
+    return index
+
+def load_for_snapshot(snapshot_path):
+    """Loads the search index saved next to a snapshot, rebuilding it if it's
+    missing or the snapshot has changed since
+
+    Returns:
+        A MoveSearchIndex
+    """
+    # Checking the size and modification time, as the roster manifest does, keeps
+    # a query from reading and hashing the whole snapshot
+    index = MoveSearchIndex.load(index_path_for_snapshot(snapshot_path), rostermanifest.snapshot_stamp(snapshot_path))
+    return index if index is not None else build_for_snapshot(snapshot_path)
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(description="Search the roster's move names and notes")
+    arg_parser.add_argument("query", help="The words to search for")
+    arg_parser.add_argument("--snapshot", required=True, help="The rostersnapshot file to search")
+    arg_parser.add_argument("--character", default=None, help="Only show this character's moves")
+    arg_parser.add_argument("--section", default=None, choices=dto.Character.sections,
+                            help="Only show moves from this section")
+    arg_parser.add_argument("--limit", type=int, default=20, help="The most moves to show")
+    args = arg_parser.parse_args()
+
+    for hit in load_for_snapshot(args.snapshot).search(args.query, args.limit, args.character, args.section):
+        print("{0:.2f}  {1} {2}: {3}".format(hit.score, hit.character_name, hit.section, hit.move_name))
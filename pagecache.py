@@ -0,0 +1,268 @@
+import collections
+import hashlib
+import json
+import os
+import threading
+import time
+import scrapemetrics
+from pagefetcher import FetchResult
+
+class PageNotCachedError(Exception):
+    """Raised in offline mode when a page was never cached"""
+    pass
+
+class PageCache(object):
+    """A content-addressed, on-disk store of raw character page html. Each page
+    body is written once under its sha256 hash, and an index maps character names
+    to the hash of their latest page along with when it was stored and last read.
+    The index is kept in memory and written out by flush, or once flush_every
+    pages have been stored since it was last written, rather than on every put.
+
+    Args:
+        cache_dir:
+            The directory that holds the index and the page bodies
+        ttl:
+            The number of seconds a cached page is considered fresh
+        max_bytes:
+            The size cap for all stored page bodies. Once it's exceeded, the least
+            recently used pages are evicted.
+        flush_every:
+            The number of puts after which the index is written without waiting
+            for flush, which bounds what's lost if the process dies mid run
+    """
+    index_filename = 'index.json'
+
+    def __init__(self, cache_dir, ttl=24 * 60 * 60, max_bytes=256 * 1024 * 1024, flush_every=32):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.flush_every = flush_every
+        self.__lock = threading.Lock()
+        # Whether the index has changed since it was written, and how many puts it's behind
+        self.__dirty = False
+        self.__pending_puts = 0
+        self.__index_path = os.path.join(cache_dir, self.index_filename)
+        os.makedirs(os.path.join(cache_dir, 'objects'), exist_ok=True)
+        if os.path.exists(self.__index_path):
+            with open(self.__index_path) as index_file:
+                self.index = json.load(index_file)
+        else:
+            self.index = {}
+        # How many entries point at each body, and the bytes of the bodies they point at
+        self.__references = collections.Counter(e["hash"] for e in self.index.values())
+        self.__body_bytes = sum({e["hash"]: e["size"] for e in self.index.values()}.values())
+        # Bodies on disk that no entry points at, such as the pages of a run that
+        # died before flushing the index. They count against max_bytes and are
+        # the first to go.
+        self.__orphans = self.__find_orphans()
+
+    def get(self, char_name, allow_stale=False):
+        """Retrieves the cached html for the character
+
+        Args:
+            char_name:
+                The name of the character
+            allow_stale:
+                Whether to return the page even if it's older than the ttl
+        Returns:
+            The cached html as a string, or None if there's no usable entry
+        """
+        with self.__lock:
+            entry = self.index.get(char_name)
+            if entry is None or (not allow_stale and not self.__is_fresh(entry)):
+                return None
+            path = self.__object_path(entry["hash"])
+            if not os.path.exists(path):
+                self.__drop_entry(char_name)
+                self.__dirty = True
+                return None
+            entry["accessed_at"] = time.time()
+            self.__dirty = True
+        with open(path, encoding='utf-8') as page_file:
+            return page_file.read()
+
+    def put(self, char_name, html):
+        """Stores the html for the character, then evicts pages if the cache
+        has grown past max_bytes. The body is written right away, and the index
+        entry with the next flush.
+
+        Args:
+            char_name: The name of the character
+            html: The raw html of the character's frame data page
+        """
+        body = html.encode('utf-8')
+        content_hash = hashlib.sha256(body).hexdigest()
+        path = self.__object_path(content_hash)
+        now = time.time()
+        with self.__lock:
+            if not os.path.exists(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                temp_path = '{0}.{1}.tmp'.format(path, threading.get_ident())
+                with open(temp_path, 'wb') as page_file:
+                    page_file.write(body)
+                os.replace(temp_path, path)
+            old_entry = self.index.get(char_name)
+            if old_entry is None or old_entry["hash"] != content_hash:
+                if old_entry is not None:
+                    # The old body is deleted if this was the last entry using it
+                    self.__drop_entry(char_name)
+                if self.__orphans.pop(content_hash, None) is None and not self.__references[content_hash]:
+                    self.__body_bytes += len(body)
+                self.__references[content_hash] += 1
+            self.index[char_name] = {
+                "hash": content_hash,
+                "size": len(body),
+                "stored_at": now,
+                "accessed_at": now
+            }
+            self.__evict()
+            self.__dirty = True
+            self.__pending_puts += 1
+            if self.__pending_puts >= self.flush_every:
+                self.__write_index()
+
+    def touch(self, char_name):
+        """Marks the character's cached page as fresh again, such as after the
+        site reports that it hasn't changed"""
+        with self.__lock:
+            entry = self.index.get(char_name)
+            if entry is not None:
+                entry["stored_at"] = entry["accessed_at"] = time.time()
+                self.__dirty = True
+
+    def has(self, char_name):
+        with self.__lock:
+            return char_name in self.index
+
+    def is_fresh(self, char_name):
+        with self.__lock:
+            entry = self.index.get(char_name)
+            return entry is not None and self.__is_fresh(entry)
+
+    def flush(self):
+        """Persists the index, including any updated access times, if it has
+        changed since it was last written"""
+        with self.__lock:
+            if self.__dirty:
+                self.__write_index()
+
+    def __is_fresh(self, entry):
+        return time.time() - entry["stored_at"] < self.ttl
+
+    def __object_path(self, content_hash):
+        return os.path.join(self.cache_dir, 'objects', content_hash[:2], content_hash + '.html')
+
+    def __find_orphans(self):
+        """Returns the hash and size of every body in objects/ that no entry points at"""
+        orphans = {}
+        for directory, _, filenames in os.walk(os.path.join(self.cache_dir, 'objects')):
+            for filename in filenames:
+                content_hash, extension = os.path.splitext(filename)
+                if extension == '.html' and content_hash not in self.__references:
+                    orphans[content_hash] = os.path.getsize(os.path.join(directory, filename))
+        return orphans
+
+    def __drop_entry(self, char_name):
+        """Removes an entry from the index, and its body from disk if no other entry shares it"""
+        entry = self.index.pop(char_name)
+        self.__references[entry["hash"]] -= 1
+        if not self.__references[entry["hash"]]:
+            del self.__references[entry["hash"]]
+            self.__body_bytes -= entry["size"]
+            self.__remove_body(entry["hash"])
+
+    def __remove_body(self, content_hash):
+        path = self.__object_path(content_hash)
+        if os.path.exists(path):
+            os.remove(path)
+
+    def __evict(self):
+        """Drops unreferenced bodies, then the least recently used entries, until
+        the stored bodies fit under max_bytes. Bodies are shared between entries
+        with identical content, so a body is only counted and deleted once."""
+        if self.__body_bytes + sum(self.__orphans.values()) <= self.max_bytes:
+            return
+        for content_hash in self.__orphans:
+            self.__remove_body(content_hash)
+        self.__orphans = {}
+        by_last_access = sorted(self.index.items(), key=lambda item: item[1]["accessed_at"])
+        for name, _ in by_last_access:
+            if self.__body_bytes <= self.max_bytes:
+                break
+            self.__drop_entry(name)
+
+    def __write_index(self):
+        temp_path = self.__index_path + '.tmp'
+        with open(temp_path, 'w') as index_file:
+            json.dump(self.index, index_file, indent=2, sort_keys=True)
+        os.replace(temp_path, self.__index_path)
+        self.__dirty = False
+        self.__pending_puts = 0
+
+class CachingFetcher(object):
+    """Sits in front of a PageFetcher and serves pages from a PageCache. Fresh pages
+    are read straight from disk, stale pages are revalidated with a conditional
+    request, and in offline mode the network is never touched.
+
+    Args:
+        cache:
+            The PageCache to read from and write to
+        fetcher:
+            The PageFetcher used for cache misses and revalidation. Not needed offline.
+        offline:
+            Only serve pages from the cache, regardless of their age
+        metrics:
+            A scrapemetrics recorder that counts cache hits, misses and revalidations
+    """
+    def __init__(self, cache, fetcher=None, offline=False, metrics=None):
+        self.cache = cache
+        self.fetcher = fetcher
+        self.offline = offline
+        self.metrics = metrics if metrics is not None else scrapemetrics.disabled
+
+    def fetch(self, char_name, url, conditional=True):
+        """Retrieves the page for the given character, preferring the cache.
+        Matches PageFetcher.fetch so it can be handed to a ScrapeEngine.
+
+        Args:
+            char_name:
+                The name of the character
+            url:
+                The url of the character's frame data page
+            conditional:
+                Whether the caller still holds the previous parse of this page, in
+                which case a successful revalidation is reported as a 304
+        Returns:
+            A FetchResult for the page
+        """
+        if self.offline:
+            html = self.cache.get(char_name, allow_stale=True)
+            if html is None:
+                self.metrics.count("cache_miss", 1, char_name)
+                raise PageNotCachedError("{0} is not in the page cache".format(char_name))
+            self.metrics.count("cache_hit", 1, char_name)
+            return FetchResult(char_name, html, 200, from_cache=True)
+
+        html = self.cache.get(char_name)
+        if html is not None:
+            self.metrics.count("cache_hit", 1, char_name)
+            return FetchResult(char_name, html, 200, from_cache=True)
+        self.metrics.count("cache_miss", 1, char_name)
+
+        # Only revalidate if there's a stale body to fall back on, otherwise a
+        # 304 would leave us with nothing
+        has_stale_page = self.cache.has(char_name)
+        result = self.fetcher.fetch(char_name, url, conditional=has_stale_page)
+        if result.not_modified:
+            self.metrics.count("cache_revalidated", 1, char_name)
+            self.cache.touch(char_name)
+            if conditional:
+                return result
+            return FetchResult(char_name, self.cache.get(char_name, allow_stale=True), 200, from_cache=True)
+        self.cache.put(char_name, result.html)
+        return result
+
+    def save_validators(self):
+        self.cache.flush()
+        if self.fetcher is not None:
+            self.fetcher.save_validators()
@@ -0,0 +1,125 @@
+import json
+import os
+import threading
+import requests
+import scrapemetrics
+from requests.adapters import HTTPAdapter
+
+class FetchResult(object):
+    """The response for a single character page.
+
+    Args:
+        name:
+            The name of the character the page belongs to
+        html:
+            The raw html of the page, or None if the server reported that the
+            page hasn't changed since the last fetch
+        status:
+            The HTTP status code of the response
+        from_cache:
+            True if the html was read from the on-disk page cache
+    """
+    def __init__(self, name, html, status, from_cache=False):
+        self.name = name
+        self.html = html
+        self.status = status
+        self.from_cache = from_cache
+
+    @property
+    def not_modified(self):
+        return self.status == 304
+
+class PageFetcher(object):
+    """Fetches character pages over a single pooled requests.Session so that
+    connections are reused across characters instead of paying for a new
+    TCP/TLS handshake on every page. The ETag and Last-Modified headers of each
+    page are remembered so that later fetches can be made conditional; a 304
+    response means the caller can skip both the download and the parse.
+
+    Args:
+        validators_path:
+            Optional path of a json file used to persist the validators between runs
+        pool_size:
+            The maximum number of connections kept open to the site
+        metrics:
+            A scrapemetrics recorder that counts downloaded bytes and 304s
+        timeout:
+            Seconds to wait for the site to connect or send data before giving
+            up, so a stalled request can't hang the scrape
+    """
+    def __init__(self, validators_path=None, pool_size=10, metrics=None, timeout=30.0):
+        self.validators_path = validators_path
+        self.timeout = timeout
+        self.metrics = metrics if metrics is not None else scrapemetrics.disabled
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.validators = {}
+        self.__lock = threading.Lock()
+        if validators_path is not None and os.path.exists(validators_path):
+            with open(validators_path) as validators_file:
+                self.validators = json.load(validators_file)
+
+    def fetch(self, char_name, url, conditional=True):
+        """Retrieves the page at the url for the given character
+
+        Args:
+            char_name:
+                The name of the character, used as the key for the page's validators
+            url:
+                The url of the character's frame data page
+            conditional:
+                Whether to send the stored validators with the request. Only ask
+                for a conditional request if the previous result is still on hand,
+                since a 304 response has no body.
+        Returns:
+            A FetchResult for the page
+        """
+        headers = {}
+        if conditional:
+            with self.__lock:
+                stored = self.validators.get(char_name, {})
+            if stored.get("etag"):
+                headers["If-None-Match"] = stored["etag"]
+            if stored.get("last_modified"):
+                headers["If-Modified-Since"] = stored["last_modified"]
+
+        response = self.session.get(url, headers=headers, timeout=self.timeout)
+        if response.status_code == 304:
+            self.metrics.count("not_modified", 1, char_name)
+            return FetchResult(char_name, None, 304)
+        response.raise_for_status()
+        self.metrics.count("bytes_downloaded", len(response.content), char_name)
+
+        page_validators = {
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified")
+        }
+        with self.__lock:
+            self.validators[char_name] = page_validators
+        return FetchResult(char_name, response.text, response.status_code)
+
+    def fetch_asset(self, url):
+        """Downloads a binary file, i.e. a hitbox gif, over the same pooled session
+
+        Args:
+            url: The url of the file
+        Returns:
+            The body of the response as bytes
+        """
+        response = self.session.get(url, timeout=self.timeout)
+        response.raise_for_status()
+        self.metrics.count("bytes_downloaded", len(response.content))
+        return response.content
+
+    def save_validators(self):
+        """Writes the stored validators to validators_path, if one was provided"""
+        if self.validators_path is None:
+            return
+        with self.__lock:
+            with open(self.validators_path, 'w') as validators_file:
+                json.dump(self.validators, validators_file, indent=2, sort_keys=True)
+
+    def close(self):
+        self.session.close()
@@ -0,0 +1,124 @@
+"""Parses many character pages at once on a pool of worker processes.
+
+Parsing is CPU-bound and holds the GIL, so threads don't help. The pages are
+split into chunks and each chunk is sent to a worker, which parses every page
+in it and sends back each Character encoded with rostersnapshot, about a third
+of the size of pickling the DTOs. Nothing is shared between workers.
+
+If a pool can't be started, or a worker dies, whatever is left is parsed in
+the calling process instead, so a run always finishes. Workers are started
+with rosterscraper.parse_pool_context, never forked from a process that may be
+running other threads.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+import rostersnapshot
+import rosterscraper
+import scrapeengine as engine
+import scrapemetrics
+
+class ParseError(Exception):
+    """Stands in for an exception raised in a worker, which might not survive
+    being sent back to the parent"""
+    pass
+
+def parse_chunk(chunk, engine_class=engine.ScrapeEngine, keep_metrics=False):
+    """Parses a chunk of pages. Lives at the module level so it can run in a worker.
+
+    Args:
+        chunk: A list of (character name, html) tuples
+        engine_class: The ScrapeEngine class used to parse the pages
+        keep_metrics: Time the parse stages of every page, so the parent can replay them
+    Returns:
+        A list of (character name, encoded character or None, error message or None)
+        tuples, and the list of metrics events (empty unless keep_metrics)
+    """
+    metrics = scrapemetrics.MetricsRecorder(keep_events=True) if keep_metrics else scrapemetrics.disabled
+    results = []
+    for name, html in chunk:
+        try:
+            with metrics.timer("parse", name):
+                character = rosterscraper.parse_character_html(name, html, engine_class, metrics)
+            results.append((name, rostersnapshot.encode_character(character), None))
+        except Exception as ex:
+            results.append((name, None, "{0}: {1}".format(type(ex).__name__, ex)))
+    return results, metrics.events if keep_metrics else []
+
+class ParseFarm(object):
+    """Spreads the parsing of many pages over worker processes
+
+    Args:
+        workers:
+            The number of worker processes. Defaults to the number of cores. A
+            value of 1 parses everything in the calling process.
+        chunk_size:
+            The number of pages sent to a worker at once. Defaults to splitting
+            the pages into about four chunks per worker, which keeps every worker
+            busy without paying for a round trip per page.
+        engine_class:
+            The ScrapeEngine class used to parse pages
+        metrics:
+            A scrapemetrics.MetricsRecorder for the parse stages of every page.
+            Stages timed in a worker are sent back and replayed into it.
+    """
+    def __init__(self, workers=None, chunk_size=None, engine_class=engine.ScrapeEngine, metrics=None):
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.chunk_size = chunk_size
+        self.engine_class = engine_class
+        self.metrics = metrics if metrics is not None else scrapemetrics.disabled
+
+    def parse(self, pages):
+        """Parses every page. A page that fails to parse doesn't stop the others.
+
+        Args:
+            pages: An iterable of (character name, html) tuples
+        Yields:
+            A rosterscraper.RosterResult for each page, as each chunk finishes
+        """
+        pages = list(pages)
+        if not pages:
+            return
+        chunk_size = self.chunk_size or max(1, -(-len(pages) // (self.workers * 4)))
+        chunks = [pages[i:i + chunk_size] for i in range(0, len(pages), chunk_size)]
+        if self.workers == 1:
+            for chunk in chunks:
+                yield from self.__parse_in_process(chunk)
+            return
+
+        unfinished = dict(enumerate(chunks))
+        try:
+            with ProcessPoolExecutor(max_workers=self.workers, mp_context=rosterscraper.parse_pool_context()) as pool:
+                futures = {pool.submit(parse_chunk, chunk, self.engine_class, self.metrics.enabled): i
+                           for i, chunk in enumerate(chunks)}
+                for future in as_completed(futures):
+                    try:
+                        encoded, events = future.result()
+                    except BrokenProcessPool:
+                        # Left in unfinished and parsed below
+                        continue
+                    del unfinished[futures[future]]
+                    self.metrics.replay(events)
+                    yield from self.__decode(encoded)
+        except (OSError, NotImplementedError, BrokenProcessPool):
+            # No usable process pool here, i.e. no /dev/shm or no fork/spawn support
+            pass
+
+        for i in sorted(unfinished):
+            yield from self.__parse_in_process(unfinished[i])
+
+    def __decode(self, encoded):
+        for name, blob, error in encoded:
+            if error is not None:
+                yield rosterscraper.RosterResult(name, error=ParseError(error))
+            else:
+                yield rosterscraper.RosterResult(name, rostersnapshot.decode_character(name, blob))
+
+    def __parse_in_process(self, chunk):
+        for name, html in chunk:
+            try:
+                with self.metrics.timer("parse", name):
+                    character = rosterscraper.parse_character_html(name, html, self.engine_class, self.metrics)
+                yield rosterscraper.RosterResult(name, character)
+            except Exception as ex:
+                yield rosterscraper.RosterResult(name, error=ex)
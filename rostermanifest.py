@@ -0,0 +1,172 @@
+"""A small JSON manifest of the roster, saved next to a roster snapshot, so a
+quick lookup can find a character without reading characters.txt or the
+snapshot's directory.
+
+For each character the manifest holds its slug (the name in characters.txt and
+the site's urls), its display name, and the offset and length of its blob in
+the snapshot. Looking a character up reads the manifest, then just that blob.
+The manifest records the size and modification time of the snapshot it
+describes, and is rebuilt if the snapshot has changed since.
+"""
+import json
+import os
+
+FORMAT_VERSION = 1
+
+# Display names that can't be worked out from the slug
+display_name_overrides = {
+    "banjo_and_kazooie": "Banjo & Kazooie",
+    "bowser_jr": "Bowser Jr.",
+    "dr_mario": "Dr. Mario",
+    "king_k_rool": "King K. Rool",
+    "mr_game_and_watch": "Mr. Game & Watch",
+    "pac_man": "Pac-Man",
+    "pt_charizard": "Pokemon Trainer (Charizard)",
+    "pt_ivysaur": "Pokemon Trainer (Ivysaur)",
+    "pt_squirtle": "Pokemon Trainer (Squirtle)",
+    "rob": "R.O.B.",
+    "wii_fit_trainer": "Wii Fit Trainer"
+}
+
+def display_name(slug):
+    """Turns a slug into the character's name, i.e. 'rosalina_and_luma' is 'Rosalina and Luma'"""
+    if slug in display_name_overrides:
+        return display_name_overrides[slug]
+    return " ".join(w if w == "and" else w.capitalize() for w in slug.split("_"))
+
+def read_character_list(path):
+    """Reads the slugs in a characters.txt file
+
+    Returns:
+        A list of slugs in file order
+    """
+    with open(path) as char_file:
+        return char_file.read().split()
+
+class ManifestEntry(object):
+    """One character in the manifest
+
+    Args:
+        slug: The character's slug
+        name: The character's display name
+        offset: Where the character's blob starts in the snapshot
+        length: The length of the blob
+    """
+    __slots__ = ("slug", "name", "offset", "length")
+
+    def __init__(self, slug, name, offset, length):
+        self.slug = slug
+        self.name = name
+        self.offset = offset
+        self.length = length
+
+class RosterManifest(object):
+    """The characters of a roster snapshot and where they are in it
+
+    Args:
+        snapshot_path: The rostersnapshot file the manifest describes
+        entries: A list of ManifestEntry objects in roster order
+        stamp: The [size, mtime_ns] of the snapshot when the manifest was built
+    """
+    def __init__(self, snapshot_path, entries, stamp):
+        self.snapshot_path = snapshot_path
+        self.entries = entries
+        self.stamp = stamp
+        self.__by_key = {}
+        for entry in entries:
+            self.__by_key[entry.slug] = entry
+            self.__by_key.setdefault(self.__normalize(entry.name), entry)
+
+    @classmethod
+    def build(cls, snapshot_path):
+        """Builds the manifest of a snapshot from its directory"""
+        import rostersnapshot
+        with rostersnapshot.SnapshotReader(snapshot_path) as reader:
+            entries = [ManifestEntry(slug, display_name(slug), *reader.character_location(slug))
+                       for slug in reader.character_names()]
+        return cls(snapshot_path, entries, snapshot_stamp(snapshot_path))
+
+    def find(self, name):
+        """Looks a character up by slug or display name, ignoring case
+
+        Returns:
+            The ManifestEntry, or None if there's no such character
+        """
+        return self.__by_key.get(name) or self.__by_key.get(self.__normalize(name))
+
+    def load_character(self, name):
+        """Decodes one character straight from its blob in the snapshot
+
+        Args:
+            name: The character's slug or display name
+        Returns:
+            A Character DTO, or None if there's no such character
+        """
+        entry = self.find(name)
+        if entry is None:
+            return None
+        import rostersnapshot
+        with open(self.snapshot_path, 'rb') as snapshot_file:
+            snapshot_file.seek(entry.offset)
+            blob = snapshot_file.read(entry.length)
+        return rostersnapshot.decode_character(entry.slug, blob)
+
+    def save(self, path):
+        data = {
+            "format": FORMAT_VERSION,
+            "snapshot_stamp": self.stamp,
+            "characters": [[e.slug, e.name, e.offset, e.length] for e in self.entries]
+        }
+        temp_path = path + '.tmp'
+        with open(temp_path, 'w') as manifest_file:
+            json.dump(data, manifest_file, indent=1)
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path, snapshot_path):
+        """Reads a saved manifest
+
+        Returns:
+            A RosterManifest, or None if the file is missing, from another
+            format version, or older than the snapshot
+        """
+        try:
+            with open(path) as manifest_file:
+                data = json.load(manifest_file)
+        except (OSError, ValueError):
+            return None
+        if data.get("format") != FORMAT_VERSION or data.get("snapshot_stamp") != snapshot_stamp(snapshot_path):
+            return None
+        return cls(snapshot_path, [ManifestEntry(*e) for e in data["characters"]], data["snapshot_stamp"])
+
+    @staticmethod
+    def __normalize(name):
+        return " ".join(name.lower().replace("_", " ").split())
+
+def snapshot_stamp(snapshot_path):
+    stat = os.stat(snapshot_path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+def manifest_path_for_snapshot(snapshot_path):
+    """Where the manifest of a rostersnapshot file lives"""
+    return snapshot_path + '.manifest.json'
+
+def build_for_snapshot(snapshot_path):
+    """Builds the manifest of a snapshot and saves it next to the snapshot
+
+    Returns:
+        The RosterManifest
+    """
+    manifest = RosterManifest.build(snapshot_path)
+    manifest.save(manifest_path_for_snapshot(snapshot_path))
+    return manifest
+
+def load_for_snapshot(snapshot_path):
+    """Loads the manifest saved next to a snapshot, rebuilding it if it's
+    missing or the snapshot has changed since
+
+    Returns:
+        A RosterManifest
+    """
+    manifest = RosterManifest.load(manifest_path_for_snapshot(snapshot_path), snapshot_path)
+    return manifest if manifest is not None else build_for_snapshot(snapshot_path)
@@ -0,0 +1,315 @@
+import multiprocessing
+import os
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+import character as dto
+import scrapeengine as engine
+import scrapemetrics
+
+def parse_pool_context():
+    """Returns the multiprocessing context parse pools are started with. A pool
+    starts its workers while other threads are running (the fetch threads, the
+    throttled fetcher's event loop), and a forked child gets a copy of every lock
+    one of them happened to hold at the time, with no thread left to release it.
+    So workers come from a forkserver, or are spawned where there isn't one."""
+    start_methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in start_methods else "spawn")
+
+def parse_character_html(char_name, html, engine_class=engine.ScrapeEngine, metrics=None):
+    """Builds the Character DTO for a character from the raw html of their
+    frame data page. This lives at the module level so it can be shipped
+    off to a worker process.
+
+    Args:
+        char_name: The name of the character as it appears in characters.txt
+        html: The raw html of the character's frame data page
+        engine_class: The ScrapeEngine class used to parse the page
+        metrics: The scrapemetrics recorder for the parse stages
+    Returns:
+        A Character DTO with the character's name and their frame data
+    """
+    scraper = engine_class(char_name, metrics=metrics)
+    with scraper.metrics.timer("html_build", char_name):
+        page = scraper.parse_page(html)
+    return scraper.get_frame_data(page)
+
+def parse_changed_sections(char_name, html, stored_hashes, engine_class=engine.ScrapeEngine, metrics=None):
+    """Hashes every section of a character's page and parses only the sections
+    whose hash differs from the stored one. Lives at the module level so it can
+    be shipped off to a worker process.
+
+    Args:
+        char_name:
+            The name of the character
+        html:
+            The raw html of the character's frame data page
+        stored_hashes:
+            The section hashes from the last time the page was parsed
+        engine_class:
+            The ScrapeEngine class used to parse the page
+        metrics:
+            The scrapemetrics recorder for the parse stages
+    Returns:
+        A tuple of the page's hashes, including the hash of the whole page under
+        "page", and a dictionary of the parsed data for each changed section
+    """
+    scraper = engine_class(char_name, metrics=metrics)
+    with scraper.metrics.timer("html_build", char_name):
+        page = scraper.parse_page(html)
+    with scraper.metrics.timer("section_split", char_name):
+        sections = scraper.get_sections(page)
+    with scraper.metrics.timer("section_hashing", char_name):
+        hashes = scraper.hash_sections(sections)
+        hashes["page"] = scraper.hash_html(html)
+    section_data = {}
+    for section_name, section in zip(scraper.section_names, sections):
+        if stored_hashes.get(section_name) != hashes[section_name]:
+            section_data[section_name] = scraper.get_section_data(section_name, section)
+    return hashes, section_data
+
+def build_character(char_name, section_data, stored=None):
+    """Builds the whole Character DTO of a page from the sections that were
+    parsed again, taking the others from the character as it's stored
+
+    Args:
+        char_name:
+            The name of the character
+        section_data:
+            A dictionary of section name to its parsed data, as returned by parse_changed_sections
+        stored:
+            The stored Character DTO. Only needed if section_data doesn't have every section.
+    Returns:
+        The Character DTO
+    Raises:
+        ValueError: If a section wasn't parsed again and there's no stored character to take it from
+    """
+    sections = []
+    for section_name in engine.ScrapeEngine.section_names:
+        if section_name in section_data:
+            sections.append(section_data[section_name])
+        elif stored is None:
+            raise ValueError("The {0} section of {1} wasn't parsed and isn't stored, rescrape with --full".format(
+                section_name, char_name))
+        elif section_name == "misc":
+            sections.append(stored.misc_data.to_attributes_dict())
+        else:
+            sections.append(stored.section_moves[section_name])
+    return dto.Character(char_name, *sections)
+
+class RosterResult(object):
+    """The outcome of scraping a single character from the roster.
+
+    Args:
+        name:
+            The name of the character
+        character:
+            The Character DTO if the scrape succeeded, else None
+        error:
+            The exception that stopped the scrape, else None
+        unchanged:
+            True if the page hasn't changed since it was last parsed, in which
+            case character is the previously parsed Character DTO
+        changed_sections:
+            For incremental scrapes, the names of the sections that were parsed again
+    """
+    def __init__(self, name, character=None, error=None, unchanged=False, changed_sections=None):
+        self.name = name
+        self.character = character
+        self.error = error
+        self.unchanged = unchanged
+        self.changed_sections = changed_sections
+
+    @property
+    def ok(self):
+        return self.error is None
+
+class RosterScraper(object):
+    """Scrapes a whole roster of characters. Page fetches are overlapped on a
+    thread pool capped at max_workers, and since parsing is CPU-bound, the
+    pages are parsed on a process pool so the work is spread across cores.
+
+    Args:
+        characters:
+            The character names to scrape, in roster order
+        max_workers:
+            The maximum number of page fetches in flight at once. A value of 1
+            scrapes the roster serially in the current process.
+        parse_workers:
+            The number of processes used for parsing. Defaults to the number of cores.
+        fetcher:
+            The PageFetcher used for every page. Defaults to the engine's shared fetcher.
+        known:
+            A dictionary of previously parsed Character DTOs keyed by character name.
+            Pages for these characters are fetched conditionally, and if the site
+            reports that a page hasn't changed, the known DTO is reused without
+            downloading or parsing the page again.
+        engine_class:
+            The ScrapeEngine class used to parse pages, i.e. lxmlengine.LxmlScrapeEngine
+        metrics:
+            A scrapemetrics.MetricsRecorder for the fetch and parse stages of
+            every character. Stages timed in the parse pool are sent back and
+            replayed into it.
+    """
+    def __init__(self, characters, max_workers=8, parse_workers=None, fetcher=None, known=None,
+                 engine_class=engine.ScrapeEngine, metrics=None):
+        self.characters = list(characters)
+        self.max_workers = max(1, max_workers)
+        self.parse_workers = parse_workers or os.cpu_count() or 1
+        self.fetcher = fetcher
+        self.known = known if known is not None else {}
+        self.engine_class = engine_class
+        self.metrics = metrics if metrics is not None else scrapemetrics.disabled
+
+    def scrape(self):
+        """Scrapes every character on the roster. A character that fails to
+        fetch or parse doesn't stop the run; its error is recorded on its result.
+
+        Returns:
+            A list of RosterResult objects in roster order
+        """
+        results = {r.name: r for r in self.iter_scrape()}
+        return [results[c] for c in self.characters]
+
+    def iter_scrape(self):
+        """Scrapes the roster, yielding each character's result as soon as it's
+        ready instead of holding the whole roster until the end. Consuming the
+        results as they come keeps memory flat however big the roster is.
+
+        Yields:
+            A RosterResult for each character, in the order they finish
+        """
+        if self.max_workers == 1:
+            for c in self.characters:
+                yield self.__scrape_serially(c)
+            return
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as fetch_pool, \
+                ProcessPoolExecutor(max_workers=self.parse_workers, mp_context=parse_pool_context()) as parse_pool:
+            fetches = {fetch_pool.submit(self.__fetch, c): c for c in self.characters}
+            parses = {}
+            # Hand each page to the parse pool as soon as it arrives so parsing
+            # overlaps with the fetches that are still in flight
+            for fetch in as_completed(fetches):
+                char_name = fetches[fetch]
+                try:
+                    step = self.handle_page(fetch.result())
+                except Exception as ex:
+                    yield RosterResult(char_name, error=ex)
+                    continue
+                if isinstance(step, RosterResult):
+                    yield step
+                    continue
+                function, args = self.__instrument(step)
+                parses[parse_pool.submit(function, *args)] = char_name
+                # Pass on whatever has already been parsed while the fetches finish
+                for parse in [p for p in parses if p.done()]:
+                    yield self.__finish_parse(parses.pop(parse), parse)
+            for parse in as_completed(parses):
+                yield self.__finish_parse(parses[parse], parse)
+
+    def handle_page(self, page):
+        """Decides what to do with a fetched page. Runs in the calling process.
+
+        Args:
+            page: The FetchResult for the character's page
+        Returns:
+            A RosterResult if the character needs no more work, otherwise a
+            (function, args) tuple to run in the parse pool
+        """
+        if page.not_modified:
+            return RosterResult(page.name, self.known[page.name], unchanged=True)
+        return (parse_character_html, (page.name, page.html, self.engine_class))
+
+    def handle_parsed(self, char_name, parsed):
+        """Turns the value returned from the parse pool into the character's
+        RosterResult. Runs in the calling process.
+
+        Args:
+            char_name: The name of the character
+            parsed: The return value of the function given by handle_page
+        Returns:
+            The RosterResult for the character
+        """
+        return RosterResult(char_name, parsed)
+
+    def __finish_parse(self, char_name, parse):
+        try:
+            return self.handle_parsed(char_name, self.__collect(parse.result()))
+        except Exception as ex:
+            return RosterResult(char_name, error=ex)
+
+    def __instrument(self, step):
+        """Wraps a parse step so its stage timings make it back from the worker"""
+        if not self.metrics.enabled:
+            return step
+        return (scrapemetrics.measured_call, step)
+
+    def __collect(self, parsed):
+        if not self.metrics.enabled:
+            return parsed
+        result, events = parsed
+        self.metrics.replay(events)
+        return result
+
+    def __fetch(self, char_name):
+        scraper = engine.ScrapeEngine(char_name, self.fetcher)
+        with self.metrics.timer("fetch", char_name):
+            return scraper.fetch_page(conditional=char_name in self.known)
+
+    def __scrape_serially(self, char_name):
+        try:
+            step = self.handle_page(self.__fetch(char_name))
+            if isinstance(step, RosterResult):
+                return step
+            function, args = self.__instrument(step)
+            return self.handle_parsed(char_name, self.__collect(function(*args)))
+        except Exception as ex:
+            return RosterResult(char_name, error=ex)
+
+class IncrementalScraper(RosterScraper):
+    """Rescrapes the roster straight into a FrameDataStore, doing work in proportion
+    to what changed on the site rather than to the size of the roster. A page that
+    hasn't changed since the last run is skipped before it's parsed, and for a page
+    that has, only the sections whose html hash differs are parsed and upserted.
+
+    Args:
+        characters:
+            The character names to scrape, in roster order
+        store:
+            The FrameDataStore holding the previous run's data and section hashes
+        max_workers:
+            The maximum number of page fetches in flight at once
+        parse_workers:
+            The number of processes used for parsing
+        fetcher:
+            The PageFetcher used for every page
+        engine_class:
+            The ScrapeEngine class used to parse pages. Section hashes depend on
+            the engine, so switching engines re-parses every section once.
+        metrics:
+            A scrapemetrics.MetricsRecorder, as for RosterScraper
+    """
+    def __init__(self, characters, store, max_workers=8, parse_workers=None, fetcher=None,
+                 engine_class=engine.ScrapeEngine, metrics=None):
+        super().__init__(characters, max_workers, parse_workers, fetcher, store.get_all_hashes(), engine_class,
+                         metrics)
+        self.store = store
+
+    def handle_page(self, page):
+        stored_hashes = self.known.get(page.name, {})
+        if page.not_modified or stored_hashes.get("page") == engine.ScrapeEngine.hash_html(page.html):
+            return RosterResult(page.name, unchanged=True, changed_sections=[])
+        return (parse_changed_sections, (page.name, page.html, stored_hashes, self.engine_class))
+
+    def handle_parsed(self, char_name, parsed):
+        hashes, section_data = parsed
+        # Build the whole character before anything is saved. A section that can't
+        # make a character then leaves the old data and hashes alone, so it's
+        # parsed again next run instead of being marked as up to date.
+        with self.metrics.timer("character_dto", char_name):
+            stored = None
+            if any(s not in section_data for s in self.engine_class.section_names):
+                stored = self.store.load_character(char_name)
+            character = build_character(char_name, section_data, stored)
+        with self.metrics.timer("storage", char_name):
+            self.store.save_sections(char_name, section_data, hashes)
+        return RosterResult(char_name, character, changed_sections=list(section_data))
@@ -0,0 +1,343 @@
+"""A versioned binary snapshot of the whole roster that loads one character at a time.
+
+File layout (all integers little endian):
+    header:     magic b"UFDSNAP\\0", format version (u16), character count (u32)
+    directory:  per character: name length (u16), utf-8 name, blob offset (u64), blob length (u32)
+    blobs:      one self-contained blob per character
+
+A character blob starts with its own string table, so a blob can be decoded
+without touching the rest of the file:
+    ref width (1 byte, 'H' or 'I'), string count (u32), string end offsets, utf-8 string data
+followed by a flat array of refs of that width. Every string in the character
+(move names, frame fields, hitbox urls, misc values) is stored once in the
+table and referred to by its index, with the largest ref meaning None.
+
+The ref array holds, in order:
+    for each section in Character.sections:
+        move count, then per move: kind, field count, (field, value ref) pairs,
+        hitbox marker (0: the kind has no hitbox field, 1: None, 2 + n: n urls), hitbox url refs
+    misc attribute count, (key ref, value ref) pairs,
+    out of shield count, (move ref, startup + 1) pairs
+"""
+import array
+import hashlib
+import mmap
+import os
+import shutil
+import struct
+import sys
+import character as dto
+
+MAGIC = b"UFDSNAP\0"
+FORMAT_VERSION = 1
+
+header_struct = struct.Struct("<8sHI")
+directory_entry_struct = struct.Struct("<QI")
+
+# The move kinds and action dictionary keys by the id they're written with.
+# Only ever append to these, or bump FORMAT_VERSION.
+MOVE_KINDS = (
+    dto.CharacterAttack, dto.CharacterThrow, dto.CharacterThrowActiveFrames, dto.CharacterDodge, dto.TerryDodge
+)
+ACTION_KEYS = (
+    "movename", "totalframes", "landinglag", "notes", "startup", "activeframes",
+    "basedamage", "shieldlag", "shieldstun", "whichhitbox", "advantage"
+)
+
+class SnapshotFormatError(Exception):
+    """Raised when a file isn't a roster snapshot this version can read"""
+    pass
+
+class _StringTable(object):
+    """Interns the strings of one character blob"""
+    def __init__(self):
+        self.strings = []
+        self.__refs = {}
+
+    def ref(self, text):
+        if text is None:
+            return None
+        ref = self.__refs.get(text)
+        if ref is None:
+            ref = self.__refs[text] = len(self.strings)
+            self.strings.append(text)
+        return ref
+
+def encode_character(char):
+    """Encodes a Character DTO as a snapshot blob
+
+    Args:
+        char: The Character DTO
+    Returns:
+        The blob as bytes
+    """
+    strings = _StringTable()
+    refs = []
+
+    for section in dto.Character.sections:
+        moves = char.section_moves[section]
+        refs.append(len(moves))
+        for move in moves:
+            action_dict = move.to_action_dict()
+            hitboxes = action_dict.pop("hitboximg", False)
+            refs.append(MOVE_KINDS.index(type(move)))
+            refs.append(len(action_dict))
+            for key, value in action_dict.items():
+                refs.append(ACTION_KEYS.index(key))
+                refs.append(strings.ref(value))
+            # False means the kind has no hitbox field at all, None that the move has no hitbox images
+            if hitboxes is False:
+                refs.append(0)
+            elif hitboxes is None:
+                refs.append(1)
+            else:
+                refs.append(2 + len(hitboxes))
+                refs.extend(strings.ref(url) for url in hitboxes)
+
+    misc = char.misc_data.to_attributes_dict()
+    oos_options = misc.pop("oos") or []
+    refs.append(len(misc))
+    for key, value in misc.items():
+        refs.append(strings.ref(key))
+        refs.append(strings.ref(value))
+    refs.append(len(oos_options))
+    for oos in oos_options:
+        refs.append(strings.ref(oos["move"]))
+        refs.append(0 if oos["startup"] is None else oos["startup"] + 1)
+
+    encoded = [s.encode('utf-8') for s in strings.strings]
+    ends = array.array('I')
+    end = 0
+    for data in encoded:
+        end += len(data)
+        ends.append(end)
+
+    typecode = 'H' if max([len(encoded)] + [r for r in refs if r is not None]) < 0xFFFF else 'I'
+    none_ref = 0xFFFF if typecode == 'H' else 0xFFFFFFFF
+    ref_array = array.array(typecode, (none_ref if r is None else r for r in refs))
+    if sys.byteorder == 'big':
+        ends.byteswap()
+        ref_array.byteswap()
+    return b"".join([
+        typecode.encode('ascii'), struct.pack("<I", len(encoded)), ends.tobytes(), b"".join(encoded),
+        ref_array.tobytes()
+    ])
+
+def decode_character(name, blob):
+    """Rebuilds a Character DTO from a snapshot blob
+
+    Args:
+        name: The name of the character
+        blob: The bytes written by encode_character
+    Returns:
+        A Character DTO
+    """
+    blob = memoryview(blob)
+    typecode = chr(blob[0])
+    count = struct.unpack_from("<I", blob, 1)[0]
+    ends = array.array('I')
+    ends.frombytes(blob[5:5 + 4 * count])
+    if sys.byteorder == 'big':
+        ends.byteswap()
+    data_start = 5 + 4 * count
+    data = bytes(blob[data_start:data_start + (ends[-1] if count else 0)])
+    strings = []
+    start = 0
+    for end in ends:
+        strings.append(data[start:end].decode('utf-8'))
+        start = end
+
+    refs = array.array(typecode)
+    refs.frombytes(blob[data_start + len(data):])
+    if sys.byteorder == 'big':
+        refs.byteswap()
+    none_ref = 0xFFFF if typecode == 'H' else 0xFFFFFFFF
+    string = lambda ref: None if ref == none_ref else strings[ref]
+    position = 0
+
+    sections = {}
+    for section in dto.Character.sections:
+        moves = []
+        move_count = refs[position]
+        position += 1
+        for _ in range(move_count):
+            kind, field_count = refs[position], refs[position + 1]
+            position += 2
+            action_dict = {}
+            for _ in range(field_count):
+                action_dict[ACTION_KEYS[refs[position]]] = string(refs[position + 1])
+                position += 2
+            hitbox_marker = refs[position]
+            position += 1
+            if hitbox_marker == 1:
+                action_dict["hitboximg"] = None
+            elif hitbox_marker > 1:
+                action_dict["hitboximg"] = [strings[r] for r in refs[position:position + hitbox_marker - 2]]
+                position += hitbox_marker - 2
+            moves.append(MOVE_KINDS[kind](action_dict))
+        sections[section] = moves
+
+    misc = {}
+    misc_count = refs[position]
+    position += 1
+    for _ in range(misc_count):
+        misc[strings[refs[position]]] = string(refs[position + 1])
+        position += 2
+    oos_count = refs[position]
+    position += 1
+    misc["oos"] = []
+    for _ in range(oos_count):
+        startup = refs[position + 1]
+        misc["oos"].append({"move": strings[refs[position]], "startup": startup - 1 if startup else None})
+        position += 2
+
+    return dto.Character(name, sections["ground"], sections["aerial"], sections["special"],
+                         sections["throw"], sections["dodge"], misc)
+
+def save_snapshot(path, characters):
+    """Writes the roster to a snapshot file. The file is written next to path
+    and renamed over it, so readers never see a half written snapshot.
+
+    The directory comes before the blobs but can't be sized until every name
+    is known, so each blob is spooled to a temp file as it's encoded, and only
+    the names and blob lengths are kept in memory.
+
+    Args:
+        path: The path of the snapshot file
+        characters: An iterable of Character DTOs. Each one is encoded as it
+            comes, so a generator like FrameDataStore.iter_roster is never held in full.
+    """
+    temp_path = path + ".tmp"
+    blobs_path = path + ".blobs.tmp"
+    try:
+        names, lengths = [], []
+        with open(blobs_path, 'w+b') as blobs_file:
+            for char in characters:
+                blob = encode_character(char)
+                names.append(char.character_name.encode('utf-8'))
+                lengths.append(len(blob))
+                blobs_file.write(blob)
+            offset = header_struct.size + sum(2 + len(n) + directory_entry_struct.size for n in names)
+
+            with open(temp_path, 'wb') as snapshot_file:
+                snapshot_file.write(header_struct.pack(MAGIC, FORMAT_VERSION, len(names)))
+                for name, length in zip(names, lengths):
+                    snapshot_file.write(struct.pack("<H", len(name)) + name)
+                    snapshot_file.write(directory_entry_struct.pack(offset, length))
+                    offset += length
+                blobs_file.seek(0)
+                shutil.copyfileobj(blobs_file, snapshot_file)
+        os.replace(temp_path, path)
+    finally:
+        for leftover in (blobs_path, temp_path):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+
+class SnapshotReader(object):
+    """Reads a snapshot file lazily. Opening it only reads the directory, and
+    each character is decoded the first time it's asked for.
+
+    Args:
+        path: The path of the snapshot file
+    """
+    def __init__(self, path):
+        self.path = path
+        self.__characters = {}
+        self.__data = None
+        self.__file = open(path, 'rb')
+        try:
+            # mmap can't map an empty file, so check the size before mapping it
+            if os.fstat(self.__file.fileno()).st_size < header_struct.size:
+                raise SnapshotFormatError("{0} is too short to be a roster snapshot".format(path))
+            self.__data = mmap.mmap(self.__file.fileno(), 0, access=mmap.ACCESS_READ)
+            self.__directory = self.__read_directory()
+        except Exception:
+            # Don't leak the file or the mapping of a snapshot that can't be read
+            self.close()
+            raise
+
+    def __read_directory(self):
+        magic, version, count = header_struct.unpack_from(self.__data, 0)
+        if magic != MAGIC:
+            raise SnapshotFormatError("{0} isn't a roster snapshot".format(self.path))
+        if version != FORMAT_VERSION:
+            raise SnapshotFormatError("{0} is snapshot format version {1}, expected {2}".format(
+                self.path, version, FORMAT_VERSION))
+
+        # Keep the directory in file order, which is the order the roster was saved in
+        directory = {}
+        position = header_struct.size
+        try:
+            for _ in range(count):
+                name_length = struct.unpack_from("<H", self.__data, position)[0]
+                name = self.__data[position + 2:position + 2 + name_length].decode('utf-8')
+                position += 2 + name_length
+                directory[name] = directory_entry_struct.unpack_from(self.__data, position)
+                position += directory_entry_struct.size
+        except (struct.error, UnicodeDecodeError):
+            raise SnapshotFormatError("{0} is truncated or corrupt".format(self.path))
+        return directory
+
+    def character_names(self):
+        return list(self.__directory)
+
+    def __contains__(self, name):
+        return name in self.__directory
+
+    def __len__(self):
+        return len(self.__directory)
+
+    def character_location(self, name):
+        """Returns the (offset, length) of a character's blob in the file, or
+        None if the character isn't in the snapshot"""
+        return self.__directory.get(name)
+
+    def character_blob(self, name):
+        """Returns a character's encoded blob as bytes, or None if the character
+        isn't in the snapshot. The encoding is deterministic, so two snapshots
+        hold the same data for a character exactly when the blobs are equal,
+        which lets them be compared without decoding either one."""
+        if name not in self.__directory:
+            return None
+        offset, length = self.__directory[name]
+        return self.__data[offset:offset + length]
+
+    def character_digest(self, name):
+        """Returns the sha256 hex digest of a character's encoded blob, or None if
+        the character isn't in the snapshot, for comparing against a stored hash"""
+        blob = self.character_blob(name)
+        return hashlib.sha256(blob).hexdigest() if blob is not None else None
+
+    def load_character(self, name):
+        """Decodes a single character
+
+        Args:
+            name: The name of the character
+        Returns:
+            A Character DTO, or None if the character isn't in the snapshot
+        """
+        if name not in self.__characters:
+            if name not in self.__directory:
+                return None
+            offset, length = self.__directory[name]
+            self.__characters[name] = decode_character(name, self.__data[offset:offset + length])
+        return self.__characters[name]
+
+    def load_roster(self):
+        """Decodes every character
+
+        Returns:
+            A list of Character DTOs in the order they were saved
+        """
+        return [self.load_character(name) for name in self.__directory]
+
+    def close(self):
+        if self.__data is not None:
+            self.__data.close()
+        self.__file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -1,21 +1,182 @@
-import scrapeengine as engine
+import argparse
+import json
 import os
+import asyncfetcher
+import framedatastore
+import lxmlengine
+import movesearch
+import pagecache
+import pagefetcher
+import parsefarm
+import rostermanifest
+import rosterscraper
+import rostersnapshot
+import scrapemetrics
 
 script_path = os.path.dirname(__file__)
 characters_filename = 'characters.txt'
 characters_filepath = os.path.join(script_path, characters_filename)
+default_cache_dir = os.path.join(script_path, 'page_cache')
+default_db_path = os.path.join(script_path, 'framedata.db')
 
-char_frame_data = []
+def save_results(store, results, metrics, batch_size=8):
+    """Saves the characters from a stream of RosterResults, committing in small
+    batches so results reach the database as the run goes
 
-with open(characters_filepath) as char_file:
-    characters = char_file.readlines()
-characters = [char_name.strip() for char_name in characters]
+    Returns:
+        The number of characters that succeeded, and the failed RosterResults
+    """
+    succeeded = 0
+    failures = []
+    changed = []
+    for result in results:
+        if not result.ok:
+            failures.append(result)
+            continue
+        succeeded += 1
+        if not result.unchanged:
+            changed.append(result.character)
+        if len(changed) >= batch_size:
+            with metrics.timer("storage"):
+                store.save_roster(changed)
+            changed = []
+    with metrics.timer("storage"):
+        store.save_roster(changed)
+    return succeeded, failures
 
-for char in characters:
-    data_parser = engine.ScrapeEngine(char)
-    char_html = data_parser.get_page_for_character_name()
-    print("Getting data for {0}".format(char))
-    char_data = data_parser.get_frame_data(char_html)
-    char_frame_data.append(char_data)
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Scrape frame data from UltimateFrameData")
+    arg_parser.add_argument("-w", "--workers", type=int, default=1,
+                            help="Maximum number of character pages fetched at once (1 scrapes serially)")
+    arg_parser.add_argument("-p", "--parse-workers", type=int, default=None,
+                            help="Number of processes used to parse pages (defaults to the number of cores)")
+    arg_parser.add_argument("--cache-dir", default=default_cache_dir,
+                            help="Directory of the on-disk cache of character pages")
+    arg_parser.add_argument("--cache-ttl", type=int, default=24 * 60 * 60,
+                            help="Seconds before a cached page is revalidated against the site")
+    arg_parser.add_argument("--cache-max-mb", type=int, default=256,
+                            help="Size cap of the page cache in megabytes")
+    arg_parser.add_argument("--no-cache", action="store_true",
+                            help="Always download pages from the site")
+    arg_parser.add_argument("--offline", action="store_true",
+                            help="Only read pages from the cache, never from the network")
+    arg_parser.add_argument("--db", default=default_db_path,
+                            help="SQLite database the scraped frame data is written to")
+    arg_parser.add_argument("--engine", choices=sorted(lxmlengine.engines), default="bs4",
+                            help="The html engine used to parse pages")
+    arg_parser.add_argument("--full", action="store_true",
+                            help="Re-parse whole characters instead of only the page sections that changed")
+    arg_parser.add_argument("--reparse", action="store_true",
+                            help="Parse every cached page again on a pool of -p processes, without the network")
+    arg_parser.add_argument("--chunk-size", type=int, default=None,
+                            help="Pages sent to a parse process at once with --reparse")
+    arg_parser.add_argument("--snapshot", default=None,
+                            help="Also write the stored roster to this rostersnapshot file for fast loading, "
+                                 "along with its move search index and manifest")
+    arg_parser.add_argument("--rate", type=asyncfetcher.positive_rate, default=5.0,
+                            help="Most requests a second sent to the site, on average")
+    arg_parser.add_argument("--host-connections", type=int, default=4,
+                            help="Most requests in flight to the site at once")
+    arg_parser.add_argument("--timeout", type=float, default=20.0,
+                            help="Seconds before a request is abandoned and retried")
+    arg_parser.add_argument("--retries", type=int, default=4,
+                            help="Times a request is retried after a timeout, dropped connection or 429/5xx")
+    arg_parser.add_argument("--metrics", default=None,
+                            help="Write a line of JSON for every stage timing and counter to this file, "
+                                 "followed by a summary line")
+    args = arg_parser.parse_args(argv)
+    if args.reparse and args.no_cache:
+        arg_parser.error("--reparse parses the page cache, so it can't be used with --no-cache")
+    engine_class = lxmlengine.engines[args.engine]
 
-print("ayyy")
\ No newline at end of file
+    metrics_file = None
+    metrics = None
+    if args.metrics:
+        metrics_file = open(args.metrics, 'w')
+        metrics = scrapemetrics.MetricsRecorder(scrapemetrics.JsonLinesLog(metrics_file))
+
+    # Their event loop threads are stopped however the run ends
+    blocking_fetchers = []
+
+    def throttled(page_fetcher):
+        # Every fetch thread goes through one rate limited, retrying fetcher
+        blocking_fetcher = asyncfetcher.BlockingFetcher(asyncfetcher.AsyncPageFetcher(
+            page_fetcher, rate=args.rate, burst=max(1, int(args.rate)), per_host=args.host_connections,
+            timeout=args.timeout, retries=args.retries, metrics=metrics))
+        blocking_fetchers.append(blocking_fetcher)
+        return blocking_fetcher
+
+    if args.no_cache:
+        fetcher = throttled(pagefetcher.PageFetcher(metrics=metrics, timeout=args.timeout))
+    else:
+        cache = pagecache.PageCache(args.cache_dir, args.cache_ttl, args.cache_max_mb * 1024 * 1024)
+        validators_path = os.path.join(args.cache_dir, 'validators.json')
+        upstream = None
+        if not args.offline:
+            upstream = throttled(pagefetcher.PageFetcher(validators_path, metrics=metrics, timeout=args.timeout))
+        fetcher = pagecache.CachingFetcher(cache, upstream, args.offline, metrics)
+
+    try:
+        characters = rostermanifest.read_character_list(characters_filepath)
+
+        # Results are consumed as each character finishes, and only their outcome
+        # is kept, so the parsed roster is never held in memory all at once
+        failures = []
+        succeeded = 0
+        store = framedatastore.FrameDataStore(args.db)
+        # Characters are stored as they finish, so record the order they're listed in
+        store.set_roster_order(characters)
+        if args.reparse:
+            reparse_metrics = metrics or scrapemetrics.disabled
+            pages = []
+            for char_name in characters:
+                html = cache.get(char_name, allow_stale=True)
+                if html is None:
+                    reparse_metrics.count("cache_miss", 1, char_name)
+                    error = pagecache.PageNotCachedError("{0} is not in the page cache".format(char_name))
+                    failures.append(rosterscraper.RosterResult(char_name, error=error))
+                else:
+                    reparse_metrics.count("cache_hit", 1, char_name)
+                    pages.append((char_name, html))
+            farm = parsefarm.ParseFarm(args.parse_workers, args.chunk_size, engine_class, reparse_metrics)
+            succeeded, parse_failures = save_results(store, farm.parse(pages), reparse_metrics)
+            failures.extend(parse_failures)
+        elif args.full:
+            # Characters that are already stored only need to be parsed again if their page changed
+            known = framedatastore.StoredRoster(store)
+            scraper = rosterscraper.RosterScraper(characters, args.workers, args.parse_workers, fetcher, known,
+                                                  engine_class, metrics)
+            succeeded, failures = save_results(store, scraper.iter_scrape(), scraper.metrics)
+        else:
+            scraper = rosterscraper.IncrementalScraper(characters, store, args.workers, args.parse_workers, fetcher,
+                                                       engine_class, metrics)
+            for result in scraper.iter_scrape():
+                if not result.ok:
+                    failures.append(result)
+                    continue
+                succeeded += 1
+                if result.changed_sections:
+                    print("Updated {0}: {1}".format(result.name, ", ".join(result.changed_sections)))
+        if args.snapshot:
+            rostersnapshot.save_snapshot(args.snapshot, store.iter_roster())
+            # Keep the move search index and the manifest in step with the snapshot they sit next to
+            movesearch.build_for_snapshot(args.snapshot)
+            rostermanifest.build_for_snapshot(args.snapshot)
+        store.close()
+        fetcher.save_validators()
+    finally:
+        for blocking_fetcher in blocking_fetchers:
+            blocking_fetcher.close()
+
+    for failed in failures:
+        print("Failed to get data for {0}: {1!r}".format(failed.name, failed.error))
+
+    print("Got data for {0} of {1} characters".format(succeeded, len(characters)))
+
+    if metrics_file is not None:
+        metrics_file.write(json.dumps(dict(metrics.summary(), kind="summary")) + "\n")
+        metrics_file.close()
+        print("Wrote metrics to {0}".format(args.metrics))
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,10 @@
-import requests
+import hashlib
+import threading
 import dataparser as hdp
+import pagefetcher
+import scrapemetrics
 import character as dto
+import moveschema
 from bs4 import BeautifulSoup
 
 class ScrapeEngine(object):
@@ -12,9 +16,33 @@ class ScrapeEngine(object):
             "basedamage", "shieldlag", "shieldstun",
             "whichhitbox", "advantage", "activeframes"
     ]
+    # The sections of a frame data page, in page order
+    section_names = ("ground", "aerial", "special", "throw", "dodge", "misc")
+    move_extractor = hdp.MoveContainerExtractor(html_classes)
 
-    def __init__(self, char_name):
+    __default_fetcher = None
+    __default_fetcher_lock = threading.Lock()
+
+    def __init__(self, char_name, fetcher=None, single_pass_extraction=True, metrics=None):
         self.character_name = char_name
+        self.fetcher = fetcher
+        # Stage timings go to a scrapemetrics recorder, or nowhere by default
+        self.metrics = metrics if metrics is not None else scrapemetrics.disabled
+        # The per-class lookups of AttackDataParser are kept around to
+        # benchmark and cross-check the single pass extractor against
+        self.single_pass_extraction = single_pass_extraction
+
+    @classmethod
+    def default_fetcher(cls):
+        """The PageFetcher shared by every engine that isn't given its own, so
+        that scraping the roster reuses pooled connections"""
+        with cls.__default_fetcher_lock:
+            if cls.__default_fetcher is None:
+                cls.__default_fetcher = pagefetcher.PageFetcher()
+            return cls.__default_fetcher
+
+    def get_page_url(self):
+        return '{0}{1}.php'.format(self.ufd_url, self.character_name)
 
     def get_page_for_character_name(self):
         """Retrieves the html for the character's frame data web page
@@ -22,8 +50,42 @@ class ScrapeEngine(object):
         Returns:
             The html of the character's frame data page as a BeautifulSoup object
         """
-        page_data = requests.get('{0}{1}.php'.format(self.ufd_url, self.character_name))
-        return BeautifulSoup(page_data.text, 'lxml')
+        html = self.get_html_for_character_name()
+        with self.metrics.timer("html_build", self.character_name):
+            return self.parse_page(html)
+
+    def get_html_for_character_name(self):
+        """Retrieves the raw html for the character's frame data web page without
+        building a BeautifulSoup object, so the text can be handed off to another
+        thread or process for parsing
+
+        Returns:
+            The html of the character's frame data page as a string
+        """
+        return self.fetch_page(conditional=False).html
+
+    def fetch_page(self, conditional=True):
+        """Fetches the character's frame data page through the engine's fetcher
+
+        Args:
+            conditional:
+                Whether to make a conditional request using the validators from
+                the last fetch of this page
+        Returns:
+            A FetchResult whose html is None if the page hasn't changed
+        """
+        fetcher = self.fetcher if self.fetcher is not None else self.default_fetcher()
+        return fetcher.fetch(self.character_name, self.get_page_url(), conditional)
+
+    def parse_page(self, html):
+        """Builds the BeautifulSoup object that get_frame_data expects from raw html
+
+        Args:
+            html: The raw html of the character's frame data page
+        Returns:
+            The html of the character's frame data page as a BeautifulSoup object
+        """
+        return BeautifulSoup(html, 'lxml')
 
     def get_frame_data(self, page_data):
         """This function will retrieve the frame data from the html provided by BeautifulSoup
@@ -33,88 +95,166 @@ class ScrapeEngine(object):
         Returns:
             A Character DTO with the character's name and their frame data
         """
+        section_data = dict(self.iter_frame_data(page_data))
+        with self.metrics.timer("character_dto", self.character_name):
+            return dto.Character(self.character_name, section_data["ground"], section_data["aerial"],
+                                 section_data["special"], section_data["throw"], section_data["dodge"],
+                                 section_data["misc"])
+
+    def iter_frame_data(self, page_data):
+        """Parses the frame data page one section at a time, so a consumer can
+        start on a section before the rest of the page is parsed
+
+        Args:
+            page_data: The frame data webpage as returned by parse_page
+        Yields:
+            A (section name, section data) tuple for each section, in the order of
+            section_names. See get_section_data for the section data.
+        """
+        with self.metrics.timer("section_split", self.character_name):
+            sections = self.get_sections(page_data)
+        for section_name, section in zip(self.section_names, sections):
+            yield section_name, self.get_section_data(section_name, section)
+
+    def get_sections(self, page_data):
+        """Splits the frame data page into its sections of moves
+
+        Args:
+            page_data: The frame data webpage as a BeautifulSoup object
+        Returns:
+            The html containers for each section, in the order of section_names
+        """
         # There are 6 sections: ground moves, aerials, specials, throws, dodges, and misc info
         char_moves = page_data.find_all("div", class_="moves")
+        return self.__ensure_containers_hold_moves(char_moves)
+
+    def get_section_data(self, section_name, section):
+        """Parses a single section of the frame data page
+
+        Args:
+            section_name:
+                One of section_names
+            section:
+                The html container for the section
+        Returns:
+            A dictionary of misc attributes for the misc section, else a list of move DTOs
+        """
+        if section_name == "misc":
+            with self.metrics.timer("misc_parsing", self.character_name):
+                return self.__get_misc_data(section, self.character_name)
+        with self.metrics.timer("move_extraction", self.character_name):
+            moves = self.__get_action_frame_data(section, section_name)
+        self.metrics.count("moves", len(moves), self.character_name)
+        return moves
 
-        char_moves = self.__ensure_containers_hold_moves(char_moves)
+    def hash_sections(self, sections):
+        """Fingerprints each section's html so that a rescrape can tell which
+        sections changed without parsing them
 
-        ground_data = self.__get_action_frame_data(char_moves[0])
-        aerial_data = self.__get_action_frame_data(char_moves[1])
-        specials_data = self.__get_action_frame_data(char_moves[2])
-        throws_data = self.__get_action_frame_data(char_moves[3])
-        dodges_data = self.__get_action_frame_data(char_moves[4])
-        misc_data = self.__get_misc_data(char_moves[5], self.character_name)
+        Args:
+            sections: The section containers returned by get_sections
+        Returns:
+            A dictionary of section name to the sha256 hex digest of its html
+        """
+        return {name: self.hash_html(self.get_section_html(section)) for name, section in zip(self.section_names, sections)}
+
+    @staticmethod
+    def hash_html(html):
+        return hashlib.sha256(html.encode('utf-8')).hexdigest()
+
+    def get_section_html(self, section):
+        """Serializes a section container back into html"""
+        return str(section)
+
+    def iter_section_moves(self, section, section_name=None):
+        """Parses the moves of a section one at a time
+
+        Args:
+            section: The html container for a section of moves
+            section_name: One of section_names, used to tell what kind of move each one is
+        Yields:
+            A move DTO for each move, in page order
+        """
+        for container in self.get_move_containers(section):
+            yield self.__get_move_from_container(container, section_name)
 
-        return dto.Character(self.character_name, ground_data, aerial_data, specials_data, throws_data, dodges_data, misc_data)
+    def get_move_containers(self, section):
+        """Finds the container of every move in a section
 
-    def __get_action_frame_data(self, moves):
+        Args:
+            section: The html container for the section
+        Returns:
+            A list of the movecontainer elements in page order
+        """
+        return section.find_all("div", class_="movecontainer")
+
+    def extract_move_data(self, container, section_name=None):
+        """Extracts the raw data we actually want from a move's html container
+
+        Args:
+            container: The movecontainer element
+            section_name: The section the move is in. If given, only the fields
+                that the move's kind of DTO reads are extracted.
+        Returns:
+            A dictionary of html class name to the text of the matching element
+        """
+        if self.single_pass_extraction:
+            return self.extract_move_fields(container, section_name)
+        return hdp.AttackDataParser(container).get_move_data(self.html_classes)
+
+    def extract_move_fields(self, container, section_name=None):
+        """Extracts a move's data with the engine's single pass move_extractor,
+        classifying the move by its layout before any text is read
+
+        Args:
+            container: The movecontainer element
+            section_name: The section the move is in, or None to read every field
+        Returns:
+            A dictionary of html class name to the text of the matching element
+        """
+        found, hitbox_urls = self.move_extractor.scan(container)
+        if section_name is None:
+            return self.move_extractor.read(found, hitbox_urls)
+        schema = moveschema.classify(section_name, frozenset(found))
+        return self.move_extractor.read(found, hitbox_urls, schema.fields)
+
+    def create_move(self, parsed_data, section_name=None):
+        """Builds the move DTO for the data extracted from a move's container
+
+        Args:
+            parsed_data: The dictionary returned by extract_move_data
+            section_name: The section the move is in, or None if it isn't known
+        Returns:
+            A DTO that derives from the base CharacterAction class
+        Raises:
+            moveschema.MoveLayoutError: If the move doesn't fit any kind of move in the section
+        """
+        return moveschema.classify(section_name, frozenset(parsed_data)).build(parsed_data)
+
+    def create_misc_parser(self, misc_attributes, char_name):
+        return hdp.MiscDataParser(misc_attributes, char_name)
+
+    def __get_action_frame_data(self, moves, section_name):
         """Retrieves the ground moves from the character's frame data page
 
         Args:
             moves:
                 The html elements that represent the current section of moves on the character page
+            section_name:
+                The name of the section
         Returns:
             A list of html elements that represent a given move's data
         """
-        move_html = moves.find_all("div", class_="movecontainer")
-        move_list = []
-        for move in move_html:
-            m = self.__get_move_from_container(move)
-            move_list.append(m)
-        return move_list   
+        return list(self.iter_section_moves(moves, section_name))
 
-    def __get_move_from_container(self, attack_container):
+    def __get_move_from_container(self, attack_container, section_name):
         """Extracts the raw data we actually want from the html container
 
         Returns:
             A DTO that derives from the base CharacterAction class
         """
-        parser = hdp.AttackDataParser(attack_container)
-        parsed_data = {}
-        for c in self.html_classes:
-            if c == "hitboximg":
-                data = parser.extract_hitbox()
-            else:
-                data = parser.get_data_from_element("div", c)
-            # If the element couldn't be found, skip it and try the next
-            # (This covers elements that BS4 reports as nonexistent 
-            # or empty hitbox visualization lists)
-            if data is None:
-                if c == "hitboximg":
-                    parsed_data[c] = None
-                else:
-                    continue
-            else:
-                parsed_data[c] = data
-        return self.__generate_dto(parsed_data)
-
-    def __generate_dto(self, parsed_data_dict):
-        """Return a child DTO based on the parent CharacterAction class based on the
-        number of keys in the parsed data dictionary. The idea is that if there are 4
-        keys, it's the character's dodge, etc.
-
-        Returns:
-            The appropriate DTO
-        """
-        keys_in_pdd = len(list(parsed_data_dict.keys()))
-        # A dodge can have 4 or 5 different items because if you give a kid
-        # some HTML tags he'll sprinkle them everywhere, trying to make
-        # round pegs fit in square holes 
-        if keys_in_pdd == 4 or keys_in_pdd == 5:
-            return dto.CharacterDodge(parsed_data_dict)
-        # Unless it's Terry's spot-dodge mechanic where he can u-tilt out of spot dodge
-        # because the dude who wrote this website thinks an attack is a dodge
-        elif parsed_data_dict["movename"].lower() == "spot dodge attack":
-            return dto.TerryDodge(parsed_data_dict)
-        # A throw has 7 items. 
-        elif keys_in_pdd == 7:
-            return dto.CharacterThrow(parsed_data_dict)
-        # Unless it has 8, then it's a throw with active frames.
-        elif keys_in_pdd == 8:
-            return dto.CharacterThrowActiveFrames(parsed_data_dict)
-        # Ok, now it DEFINITELY has to be an attack.
-        else:
-            return dto.CharacterAttack(parsed_data_dict)
+        parsed_data = self.extract_move_data(attack_container, section_name)
+        return self.create_move(parsed_data, section_name)
 
     def __ensure_containers_hold_moves(self, retrieved_elements):
         """Some characters like Bowser might have extraneous information placed in 'move' 
@@ -135,7 +275,7 @@ class ScrapeEngine(object):
 
     def __get_misc_data(self, misc_attributes, char_name):
         """Retrieves any miscellaneous attributes for the character from their page"""
-        parser = hdp.MiscDataParser(misc_attributes, char_name)
+        parser = self.create_misc_parser(misc_attributes, char_name)
         parsed_misc_attributes = parser.get_all_misc_data()
         return parsed_misc_attributes
 
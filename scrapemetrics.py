@@ -0,0 +1,182 @@
+"""Timers and counters for the stages of the scrape pipeline.
+
+Everything that can be instrumented takes a metrics object and defaults to
+`disabled`, a NullMetrics whose methods do nothing and whose timer is a shared
+no-op context manager, so an uninstrumented run pays for a method call per
+stage and nothing else. Hand a MetricsRecorder in instead to collect totals
+and percentiles per stage and totals per character, and give it a callback to see every event as it
+happens, i.e. JsonLinesLog for a structured log.
+
+Stages: fetch, html_build, section_split, section_hashing, move_extraction,
+misc_parsing, character_dto, parse (a whole worker parse), storage and
+rate_limit_wait. Counters: cache_hit, cache_miss, cache_revalidated,
+not_modified, bytes_downloaded, retries and moves.
+"""
+import json
+import math
+import threading
+import time
+
+class _NullTimer(object):
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+_null_timer = _NullTimer()
+
+class NullMetrics(object):
+    """Metrics that go nowhere. The default everywhere, so instrumentation
+    costs nothing unless it's asked for."""
+    enabled = False
+
+    def timer(self, stage, character=None):
+        return _null_timer
+
+    def record(self, stage, seconds, character=None):
+        pass
+
+    def count(self, counter, amount=1, character=None):
+        pass
+
+    def replay(self, events):
+        pass
+
+disabled = NullMetrics()
+
+class _Timer(object):
+    __slots__ = ("metrics", "stage", "character", "start")
+
+    def __init__(self, metrics, stage, character):
+        self.metrics = metrics
+        self.stage = stage
+        self.character = character
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.metrics.record(self.stage, time.perf_counter() - self.start, self.character)
+        return False
+
+class MetricsRecorder(object):
+    """Collects timings and counters from every stage of a scrape. Safe to share
+    between the fetch threads.
+
+    Each measurement is an event dictionary with a kind ("timer" or "counter"),
+    a name, the character it belongs to (or None) and a value (seconds, or the
+    amount counted).
+
+    Args:
+        callback:
+            Called with each event as it's recorded, i.e. to write a structured log
+        keep_events:
+            Keep every event in the events list, so a worker process can send
+            them back to the parent to replay
+    """
+    enabled = True
+
+    def __init__(self, callback=None, keep_events=False):
+        self.callback = callback
+        self.events = [] if keep_events else None
+        # stage -> [calls, seconds]
+        self.timings = {}
+        # stage -> every duration recorded, for the percentiles
+        self.durations = {}
+        self.counters = {}
+        # character -> {stage: seconds}
+        self.character_timings = {}
+        self.__lock = threading.Lock()
+
+    def timer(self, stage, character=None):
+        """A context manager that records how long its block took under stage"""
+        return _Timer(self, stage, character)
+
+    def record(self, stage, seconds, character=None):
+        self.__add({"kind": "timer", "name": stage, "character": character, "value": seconds})
+
+    def count(self, counter, amount=1, character=None):
+        self.__add({"kind": "counter", "name": counter, "character": character, "value": amount})
+
+    def replay(self, events):
+        """Records events that were collected somewhere else, i.e. in a parse worker"""
+        for event in events:
+            self.__add(event)
+
+    def summary(self):
+        """Returns the totals as plain data
+
+        Returns:
+            A dictionary with the calls, seconds and p50/p95/max seconds of each
+            stage, the counters, and the seconds spent in each stage for each character
+        """
+        with self.__lock:
+            stages = {}
+            for stage, (calls, seconds) in self.timings.items():
+                durations = sorted(self.durations[stage])
+                stages[stage] = {"calls": calls, "seconds": seconds, "p50": percentile(durations, 50),
+                                 "p95": percentile(durations, 95), "max": durations[-1]}
+            return {
+                "stages": stages,
+                "counters": dict(self.counters),
+                "characters": {c: dict(stages) for c, stages in self.character_timings.items()}
+            }
+
+    def __add(self, event):
+        with self.__lock:
+            name, value = event["name"], event["value"]
+            if event["kind"] == "timer":
+                totals = self.timings.setdefault(name, [0, 0.0])
+                totals[0] += 1
+                totals[1] += value
+                self.durations.setdefault(name, []).append(value)
+                if event["character"] is not None:
+                    stages = self.character_timings.setdefault(event["character"], {})
+                    stages[name] = stages.get(name, 0.0) + value
+            else:
+                self.counters[name] = self.counters.get(name, 0) + value
+            if self.events is not None:
+                self.events.append(event)
+        if self.callback is not None:
+            self.callback(event)
+
+def percentile(sorted_values, percent):
+    """Returns the nearest-rank percentile of a sorted, non-empty list, i.e. the
+    smallest value that at least percent percent of the values are at or below"""
+    rank = max(1, int(math.ceil(percent * len(sorted_values) / 100.0)))
+    return sorted_values[rank - 1]
+
+class JsonLinesLog(object):
+    """A MetricsRecorder callback that writes each event as a line of JSON
+
+    Args:
+        stream: A writable text file
+    """
+    def __init__(self, stream):
+        self.stream = stream
+        self.__lock = threading.Lock()
+
+    def __call__(self, event):
+        line = json.dumps(dict(event, time=time.time()))
+        with self.__lock:
+            self.stream.write(line + "\n")
+
+def measured_call(function, args):
+    """Runs a parse function with its own recorder and returns its events along
+    with its result. Lives at the module level so it can run in a worker process,
+    where the parent's recorder isn't reachable.
+
+    Args:
+        function: A parse function that takes a metrics keyword argument
+        args: The positional arguments for the function; the first is the character name
+    Returns:
+        A (result, events) tuple
+    """
+    recorder = MetricsRecorder(keep_events=True)
+    with recorder.timer("parse", args[0]):
+        result = function(*args, metrics=recorder)
+    return result, recorder.events
@@ -0,0 +1,230 @@
+"""Compares two versions of the roster and reports what changed, move by move
+and field by field, i.e. to see what a balance patch did to the frame data.
+
+Nothing is compared field by field until a cheaper comparison says it changed:
+characters with identical data are skipped first (for snapshot files, by
+comparing their encoded bytes without decoding them), then identical sections
+within a changed character.
+
+Usage:
+    python snapshotdiff.py old.snap new.snap [--json]
+"""
+import argparse
+import json
+import sys
+import character as dto
+
+# Compared like a section of moves, after them
+misc_section = "misc"
+
+class FieldChange(object):
+    """A field that has a different value in the new roster"""
+    __slots__ = ("field", "old", "new")
+
+    def __init__(self, field, old, new):
+        self.field = field
+        self.old = old
+        self.new = new
+
+    def to_dict(self):
+        return {"field": self.field, "old": self.old, "new": self.new}
+
+class MoveChange(object):
+    """A move, or the misc attributes, that differ between the rosters
+
+    Args:
+        character: The name of the character
+        section: The section of the page, or "misc" for the misc attributes
+        name: The name of the move, or None for the misc attributes
+        status: "added", "removed" or "changed"
+        changes: The FieldChanges of a changed move
+    """
+    __slots__ = ("character", "section", "name", "status", "changes")
+
+    def __init__(self, character, section, name, status, changes=None):
+        self.character = character
+        self.section = section
+        self.name = name
+        self.status = status
+        self.changes = changes or []
+
+    def to_dict(self):
+        return {
+            "character": self.character, "section": self.section, "move": self.name,
+            "status": self.status, "changes": [c.to_dict() for c in self.changes]
+        }
+
+class RosterDiff(object):
+    """Everything that changed between two rosters
+
+    Args:
+        added_characters: The names of characters only in the new roster
+        removed_characters: The names of characters only in the old roster
+        changes: A list of MoveChanges, grouped by character and in page order
+        unchanged_characters: The number of characters whose data was the same
+    """
+    def __init__(self, added_characters, removed_characters, changes, unchanged_characters):
+        self.added_characters = added_characters
+        self.removed_characters = removed_characters
+        self.changes = changes
+        self.unchanged_characters = unchanged_characters
+
+    def __bool__(self):
+        return bool(self.added_characters or self.removed_characters or self.changes)
+
+    def to_dict(self):
+        return {
+            "added_characters": self.added_characters,
+            "removed_characters": self.removed_characters,
+            "unchanged_characters": self.unchanged_characters,
+            "changes": [c.to_dict() for c in self.changes]
+        }
+
+def section_records(char):
+    """Flattens each section of a character into comparable records
+
+    Returns:
+        A dictionary of section name (and "misc") to a dictionary of record
+        key to field dictionary. Moves are keyed by name, numbered if a name
+        repeats within its section; the misc attributes are one record keyed by None.
+    """
+    sections = {}
+    for section in dto.Character.sections:
+        records = {}
+        seen = {}
+        for move in char.section_moves[section]:
+            fields = move.to_action_dict()
+            fields["kind"] = type(move).__name__
+            occurrence = seen.get(move.name, 0)
+            seen[move.name] = occurrence + 1
+            records[move.name if occurrence == 0 else "{0} ({1})".format(move.name, occurrence + 1)] = fields
+        sections[section] = records
+    sections[misc_section] = {None: char.misc_data.to_attributes_dict()}
+    return sections
+
+def diff_characters(old, new):
+    """Compares two versions of a character, skipping sections that are equal
+
+    Args:
+        old: The old Character DTO
+        new: The new Character DTO
+    Returns:
+        A list of MoveChanges
+    """
+    changes = []
+    old_sections, new_sections = section_records(old), section_records(new)
+    for section in dto.Character.sections + (misc_section,):
+        old_records, new_records = old_sections[section], new_sections[section]
+        # Dictionary equality stops at the first difference, and never has to
+        # serialize either side the way a hash would
+        if old_records == new_records:
+            continue
+        for name, new_fields in new_records.items():
+            old_fields = old_records.get(name)
+            if old_fields is None:
+                changes.append(MoveChange(new.character_name, section, name, "added"))
+                continue
+            field_changes = [
+                FieldChange(field, old_fields.get(field), new_fields.get(field))
+                for field in list(dict.fromkeys(list(old_fields) + list(new_fields)))
+                if old_fields.get(field) != new_fields.get(field)
+            ]
+            if field_changes:
+                changes.append(MoveChange(new.character_name, section, name, "changed", field_changes))
+        for name in old_records:
+            if name not in new_records:
+                changes.append(MoveChange(new.character_name, section, name, "removed"))
+    return changes
+
+def diff_rosters(old_roster, new_roster, old_digests=None, new_digests=None):
+    """Compares two rosters
+
+    Args:
+        old_roster: A mapping of character name to the old Character DTO. Only
+            characters whose digests differ are looked up, so it can load lazily.
+        new_roster: The same for the new roster
+        old_digests: An optional dictionary of character name to something that's
+            equal exactly when the old character's data is, such as a stored hash
+            or its encoded bytes. Characters with equal digests are skipped;
+            without digests, every character is compared section by section.
+        new_digests: The same for the new roster
+    Returns:
+        A RosterDiff
+    """
+    old_names, new_names = list(old_roster), list(new_roster)
+    old_name_set, new_name_set = set(old_names), set(new_names)
+    changes = []
+    unchanged = 0
+    for name in new_names:
+        if name not in old_name_set:
+            continue
+        if old_digests is not None and new_digests is not None:
+            if old_digests[name] == new_digests[name]:
+                unchanged += 1
+                continue
+        character_changes = diff_characters(old_roster[name], new_roster[name])
+        if character_changes:
+            changes.extend(character_changes)
+        else:
+            unchanged += 1
+    return RosterDiff([n for n in new_names if n not in old_name_set],
+                      [n for n in old_names if n not in new_name_set], changes, unchanged)
+
+class _SnapshotRoster(object):
+    """Lets diff_rosters read a SnapshotReader like a mapping, decoding on lookup"""
+    def __init__(self, reader):
+        self.reader = reader
+
+    def __iter__(self):
+        return iter(self.reader.character_names())
+
+    def __getitem__(self, name):
+        return self.reader.load_character(name)
+
+def diff_snapshot_files(old_path, new_path):
+    """Compares two rostersnapshot files. Characters whose encoded data is
+    byte for byte the same are skipped without being decoded. The blobs are
+    compared directly rather than hashed, since neither file stores a hash.
+
+    Args:
+        old_path: The path of the old snapshot
+        new_path: The path of the new snapshot
+    Returns:
+        A RosterDiff
+    """
+    import rostersnapshot
+    with rostersnapshot.SnapshotReader(old_path) as old, rostersnapshot.SnapshotReader(new_path) as new:
+        old_blobs = {n: old.character_blob(n) for n in old.character_names()}
+        new_blobs = {n: new.character_blob(n) for n in new.character_names()}
+        return diff_rosters(_SnapshotRoster(old), _SnapshotRoster(new), old_blobs, new_blobs)
+
+def format_diff(diff):
+    """Returns the diff as readable lines of text"""
+    lines = ["Added {0}".format(name) for name in diff.added_characters]
+    lines.extend("Removed {0}".format(name) for name in diff.removed_characters)
+    for change in diff.changes:
+        where = "{0} {1}".format(change.character, change.section)
+        if change.name is not None:
+            where += " {0}".format(change.name)
+        if change.status != "changed":
+            lines.append("{0}: {1}".format(where, change.status))
+            continue
+        for field in change.changes:
+            lines.append("{0}: {1} {2!r} -> {3!r}".format(where, field.field, field.old, field.new))
+    return lines
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(description="Show what changed between two roster snapshots")
+    arg_parser.add_argument("old", help="The older rostersnapshot file")
+    arg_parser.add_argument("new", help="The newer rostersnapshot file")
+    arg_parser.add_argument("--json", action="store_true", help="Print the diff as JSON")
+    args = arg_parser.parse_args()
+
+    diff = diff_snapshot_files(args.old, args.new)
+    if args.json:
+        print(json.dumps(diff.to_dict(), indent=2))
+    else:
+        for line in format_diff(diff):
+            print(line)
+        print("{0} changes, {1} characters unchanged".format(len(diff.changes), diff.unchanged_characters))
+    sys.exit(1 if diff else 0)
@@ -0,0 +1,129 @@
+"""Runs AsyncPageFetcher against a stub HTTP server on the test's event loop,
+to check which failures are retried and how long it waits between attempts."""
+import argparse
+import asyncio
+import os
+import sys
+import time
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+import requests
+import asyncfetcher
+import pagefetcher
+
+class StubSite(object):
+    """Answers each path with the next response in its script, then 200 for
+    every request after that. A response is a (status, headers, delay) tuple."""
+    def __init__(self, scripts):
+        self.scripts = {path: list(script) for path, script in scripts.items()}
+        self.requests = {}
+        # The most requests the site was answering at the same time
+        self.in_flight = 0
+        self.most_in_flight = 0
+        self.server = None
+        self.__handlers = set()
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.__handle, "127.0.0.1", 0)
+        return "http://127.0.0.1:{0}".format(self.server.sockets[0].getsockname()[1])
+
+    async def close(self):
+        # Let slow responses finish, so no worker thread is left waiting on one
+        await asyncio.gather(*self.__handlers)
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def __handle(self, reader, writer):
+        self.__handlers.add(asyncio.current_task())
+        request_line = await reader.readline()
+        while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+            pass
+        path = request_line.split()[1].decode()
+        self.requests[path] = self.requests.get(path, 0) + 1
+        self.in_flight += 1
+        self.most_in_flight = max(self.most_in_flight, self.in_flight)
+        script = self.scripts.get(path, [])
+        status, headers, delay = script.pop(0) if script else (200, {}, 0)
+        if delay:
+            await asyncio.sleep(delay)
+        self.in_flight -= 1
+        body = "<html>{0}</html>".format(path).encode() if status == 200 else b""
+        lines = ["HTTP/1.1 {0} Stub".format(status), "Content-Length: {0}".format(len(body)), "Connection: close"]
+        lines.extend("{0}: {1}".format(k, v) for k, v in headers.items())
+        try:
+            writer.write(("\r\n".join(lines) + "\r\n\r\n").encode() + body)
+            await writer.drain()
+        except ConnectionError:
+            # The client gave up on an attempt that timed out
+            pass
+        writer.close()
+
+class AsyncPageFetcherTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.site = StubSite({
+            "/flaky": [(503, {}, 0)],
+            "/limited": [(429, {"Retry-After": "0.5"}, 0)],
+            "/slow": [(200, {}, 1.0)],
+            "/missing": [(404, {}, 0)] * 5
+        })
+        self.base_url = await self.site.start()
+        self.page_fetcher = pagefetcher.PageFetcher(timeout=5.0)
+        self.fetcher = asyncfetcher.AsyncPageFetcher(self.page_fetcher, rate=100.0, burst=10, timeout=0.3,
+                                                     retries=3, backoff=0.01)
+
+    async def asyncTearDown(self):
+        await self.site.close()
+        self.page_fetcher.close()
+
+    async def test_retries_a_503(self):
+        result = await self.fetcher.fetch("flaky", self.base_url + "/flaky")
+        self.assertEqual(result.status, 200)
+        self.assertEqual(result.html, "<html>/flaky</html>")
+        self.assertEqual(self.site.requests["/flaky"], 2)
+
+    async def test_waits_for_retry_after_on_a_429(self):
+        start = time.monotonic()
+        result = await self.fetcher.fetch("limited", self.base_url + "/limited")
+        self.assertEqual(result.status, 200)
+        self.assertEqual(self.site.requests["/limited"], 2)
+        self.assertGreaterEqual(time.monotonic() - start, 0.5)
+
+    async def test_retries_a_timeout(self):
+        outcomes = await self.fetcher.fetch_all([("slow", self.base_url + "/slow", False)])
+        self.assertTrue(outcomes[0].ok)
+        self.assertEqual(outcomes[0].attempts, 2)
+        self.assertEqual(outcomes[0].result.html, "<html>/slow</html>")
+
+    async def test_timed_out_attempts_keep_their_host_slot(self):
+        fetcher = asyncfetcher.AsyncPageFetcher(self.page_fetcher, rate=100.0, burst=10, per_host=1, timeout=0.3,
+                                                retries=3, backoff=0.01)
+        start = time.monotonic()
+        result = await fetcher.fetch("slow", self.base_url + "/slow")
+        self.assertEqual(result.status, 200)
+        # The retry had to wait for the abandoned request to finish first
+        self.assertGreaterEqual(time.monotonic() - start, 1.0)
+        self.assertEqual(self.site.most_in_flight, 1)
+
+    async def test_does_not_retry_a_404(self):
+        with self.assertRaises(requests.HTTPError) as raised:
+            await self.fetcher.fetch("missing", self.base_url + "/missing")
+        self.assertEqual(raised.exception.response.status_code, 404)
+        self.assertEqual(raised.exception.attempts, 1)
+        self.assertEqual(self.site.requests["/missing"], 1)
+
+class RateTest(unittest.TestCase):
+    def test_token_bucket_rejects_a_rate_that_is_not_positive(self):
+        for rate in (0, -1.0):
+            with self.assertRaises(ValueError):
+                asyncfetcher.TokenBucket(rate, 1)
+
+    def test_positive_rate(self):
+        self.assertEqual(asyncfetcher.positive_rate("2.5"), 2.5)
+        for text in ("0", "-3", "nan", "inf", "fast"):
+            with self.assertRaises(argparse.ArgumentTypeError):
+                asyncfetcher.positive_rate(text)
+
+if __name__ == '__main__':
+    unittest.main()
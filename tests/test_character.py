@@ -0,0 +1,111 @@
+"""Checks MoveNameIndex lookups and the alias tables the Mii and Terry special
+DTOs fill their slots from."""
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+import character as dto
+import moveschema
+
+def moves(*names):
+    return [moveschema.dodge.build({"movename": name}) for name in names]
+
+def names(found):
+    return [m.name for m in found]
+
+def specials_of(character_name, *move_names):
+    misc = {key: None for _, key in dto.CharacterMiscAttributes.attribute_keys}
+    return dto.Character(character_name, [], [], moves(*move_names), [], [], misc).special_attacks
+
+class MoveNameIndexTest(unittest.TestCase):
+    def test_exact_ignores_case_spacing_and_curly_apostrophes(self):
+        index = dto.MoveNameIndex(moves("Air Dodge,  Up", u"Hero’s Spin"))
+        self.assertEqual(index.exact("air dodge, up").name, "Air Dodge,  Up")
+        self.assertEqual(index.exact("HERO'S SPIN").name, u"Hero’s Spin")
+        self.assertIsNone(index.exact("air dodge"))
+
+    def test_exact_returns_the_first_of_repeated_names(self):
+        repeated = moves("Jab", "Jab")
+        self.assertIs(dto.MoveNameIndex(repeated).exact("jab"), repeated[0])
+
+    def test_phrases_match_whole_words(self):
+        index = dto.MoveNameIndex(moves("Thrust Uppercut", "Up Tilt", "Down Tilt"))
+        self.assertEqual(names(index.all("up")), ["Up Tilt"])
+        self.assertEqual(names(index.all("uppercut")), ["Thrust Uppercut"])
+        self.assertEqual(names(index.all("tilt")), ["Up Tilt", "Down Tilt"])
+        self.assertEqual(index.all("upper"), [])
+        self.assertIsNone(index.first("upper"))
+
+    def test_ambiguous_names_go_to_the_first_on_the_page(self):
+        index = dto.MoveNameIndex(moves("Neutral Air", "Forward Air", "Air Dodge, Neutral", "Air Dodge, Forward"))
+        self.assertEqual(index.first("neutral").name, "Neutral Air")
+        self.assertEqual(index.first("forward").name, "Forward Air")
+        # Whichever phrase matches earliest wins, not the first phrase given
+        self.assertEqual(index.first("air dodge", "forward").name, "Forward Air")
+        self.assertEqual(names(index.all("neutral")), ["Neutral Air", "Air Dodge, Neutral"])
+
+    def test_all_lists_each_move_once_in_page_order(self):
+        index = dto.MoveNameIndex(moves("Forward Smash", "Up Smash", "Down Smash"))
+        self.assertEqual(names(index.all("down smash", "smash", "up")), ["Forward Smash", "Up Smash", "Down Smash"])
+
+    def test_phrases_longer_than_the_index_keeps_do_not_match(self):
+        index = dto.MoveNameIndex(moves("Side B Forward Burning Knuckle"))
+        self.assertEqual(index.first("b forward burning").name, "Side B Forward Burning Knuckle")
+        self.assertIsNone(index.first("side b forward burning"))
+
+class SpecialAliasTest(unittest.TestCase):
+    def test_each_mii_gets_its_own_alias_table(self):
+        self.assertIsInstance(specials_of("mii_brawler"), dto.MiiBrawlerSpecialAttacks)
+        self.assertIsInstance(specials_of("mii_swordfighter"), dto.MiiSwordFighterSpecialAttacks)
+        self.assertIsInstance(specials_of("mii_gunner"), dto.MiiGunnerSpecialAttacks)
+        self.assertIsInstance(specials_of("terry"), dto.TerrySpecialAttacks)
+        self.assertIsInstance(specials_of("mario"), dto.CharacterSpecialAttacks)
+
+    def test_mii_brawler_slots(self):
+        specials = specials_of("mii_brawler", "Shot Put", "Onslaught", "Thrust Uppercut", "Helicopter Kick",
+                               "Counter Throw")
+        self.assertEqual(names(specials.neutral_special), ["Shot Put"])
+        self.assertEqual(names(specials.side_special), ["Onslaught"])
+        self.assertEqual(names(specials.up_special), ["Thrust Uppercut", "Helicopter Kick"])
+        self.assertEqual(names(specials.down_special), ["Counter Throw"])
+
+    def test_mii_swordfighter_slots(self):
+        specials = specials_of("mii_swordfighter", "Gale Strike", "Chakram", u"Hero’s Spin",
+                               "Skyward Slash Dash", "Blade Counter")
+        self.assertEqual(names(specials.neutral_special), ["Gale Strike"])
+        self.assertEqual(names(specials.side_special), ["Chakram"])
+        self.assertEqual(names(specials.up_special), [u"Hero’s Spin", "Skyward Slash Dash"])
+        self.assertEqual(names(specials.down_special), ["Blade Counter"])
+
+    def test_mii_gunner_slots(self):
+        specials = specials_of("mii_gunner", "Charge Blast", "Laser Blaze", "Gunner Missile", "Arm Rocket")
+        self.assertEqual(names(specials.neutral_special), ["Charge Blast", "Laser Blaze"])
+        self.assertEqual(names(specials.side_special), ["Gunner Missile"])
+        self.assertEqual(names(specials.up_special), ["Arm Rocket"])
+        # No down special custom is listed
+        self.assertEqual(specials.down_special, [])
+
+    def test_a_mii_move_from_another_mii_fills_no_slot(self):
+        specials = specials_of("mii_gunner", "Shot Put", "Gale Stab")
+        for slot in (specials.neutral_special, specials.side_special, specials.up_special, specials.down_special):
+            self.assertEqual(slot, [])
+
+    def test_terry_slots_match_the_direction_or_the_move_name(self):
+        specials = specials_of("terry", "Neutral B (Power Wave)", "Side B Forward (Burning Knuckle)",
+                               "Side B Back (Crack Shoot)", "Rising Tackle", "Power Dunk")
+        self.assertEqual(specials.neutral_special.name, "Neutral B (Power Wave)")
+        self.assertEqual(specials.side_special.name, "Side B Forward (Burning Knuckle)")
+        self.assertEqual(specials.up_special.name, "Rising Tackle")
+        self.assertEqual(specials.down_special.name, "Power Dunk")
+
+    def test_terry_slots_without_a_match_are_none(self):
+        specials = specials_of("terry", "Power Wave")
+        self.assertEqual(specials.neutral_special.name, "Power Wave")
+        self.assertIsNone(specials.side_special)
+        self.assertIsNone(specials.up_special)
+        self.assertIsNone(specials.down_special)
+
+if __name__ == '__main__':
+    unittest.main()
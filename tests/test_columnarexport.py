@@ -0,0 +1,53 @@
+"""Checks saving and loading the columnar export of the roster."""
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+root = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+sys.path.insert(0, root)
+sys.path.insert(0, os.path.join(root, 'benchmarks'))
+
+import numpy as np
+import columnarexport
+import corpus
+import rosterscraper
+
+class MoveTableTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        roster = [rosterscraper.parse_character_html(name, html) for name, html in corpus.load_corpus()]
+        self.table = columnarexport.MoveTable.from_roster(roster)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_round_trip(self):
+        self.table.save(self.directory)
+        loaded = columnarexport.MoveTable.load(self.directory)
+        self.assertEqual(sorted(loaded.columns), sorted(self.table.columns))
+        self.assertEqual(len(loaded), len(self.table))
+        np.testing.assert_array_equal(loaded["startup_first"], self.table["startup_first"])
+
+    def test_stale_columns_are_not_loaded(self):
+        self.table.save(self.directory)
+        old_column = os.path.join(self.directory, "old_column.npy")
+        np.save(old_column, np.zeros(len(self.table)))
+        columnarexport.MoveTable(dict(self.table.columns, old_column=np.zeros(len(self.table)))).save(self.directory)
+        self.assertIn("old_column", columnarexport.MoveTable.load(self.directory).columns)
+
+        self.table.save(self.directory)
+        self.assertNotIn("old_column", columnarexport.MoveTable.load(self.directory).columns)
+        self.assertFalse(os.path.exists(old_column))
+
+    def test_files_the_export_did_not_write_are_kept(self):
+        user_file = os.path.join(self.directory, "my_analysis.npy")
+        np.save(user_file, np.zeros(3))
+        self.table.save(self.directory)
+        self.table.save(self.directory)
+        self.assertTrue(os.path.exists(user_file))
+        self.assertNotIn("my_analysis", columnarexport.MoveTable.load(self.directory).columns)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,33 @@
+"""Checks the typing of raw frame data fields into FrameValues."""
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+import dataformat
+
+class ParseFrameValueTest(unittest.TestCase):
+    def test_ranges_and_numbers(self):
+        value = dataformat.parse_frame_value("5-7/12-15")
+        self.assertEqual(value.segments, (dataformat.FrameRange(5, 7), dataformat.FrameRange(12, 15)))
+        self.assertEqual(dataformat.parse_frame_value("-8 to -4").segments, (dataformat.FrameRange(-8, -4),))
+        self.assertEqual(dataformat.parse_frame_value("4.0%").first, 4.0)
+        self.assertIsNone(dataformat.parse_frame_value("--"))
+
+    def test_hit_annotations_are_skipped(self):
+        value = dataformat.parse_frame_value("14 (Hit 1), 17")
+        self.assertEqual(value.segments, (dataformat.FrameRange(14, 14), dataformat.FrameRange(17, 17)))
+        value = dataformat.parse_frame_value("3-4 (Hits 1-2), 8-9 (hit 3)")
+        self.assertEqual(value.segments, (dataformat.FrameRange(3, 4), dataformat.FrameRange(8, 9)))
+
+    def test_shared_results_cannot_be_changed(self):
+        value = dataformat.parse_frame_value("5-7")
+        with self.assertRaises(AttributeError):
+            value.low = 1
+        with self.assertRaises(AttributeError):
+            value.segments[0].high = 9
+        self.assertEqual(dataformat.parse_frame_value("5-7").low, 5)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+"""Checks the framedata.py command line: which arguments each subcommand
+accepts, and what query prints or returns for them."""
+import contextlib
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+root = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+sys.path.insert(0, root)
+sys.path.insert(0, os.path.join(root, 'benchmarks'))
+
+import corpus
+import framedata
+import rostersnapshot
+import rosterscraper
+
+class ArgumentTest(unittest.TestCase):
+    def parse(self, argv):
+        args, options = framedata.build_arg_parser().parse_known_args(argv)
+        return args, options
+
+    def test_scrape_and_export_pass_their_options_through(self):
+        for command in ("scrape", "export"):
+            with self.subTest(command=command):
+                args, options = self.parse([command, "--full", "-w", "8", "--help"])
+                self.assertTrue(args.passthrough)
+                self.assertEqual(options, ["--full", "-w", "8", "--help"])
+
+    def test_query_arguments(self):
+        args, options = self.parse(["query", "King Dedede", "Up Smash", "--section", "ground", "--limit", "5"])
+        self.assertEqual(options, [])
+        self.assertEqual((args.character, args.move, args.section, args.limit),
+                         ("King Dedede", "Up Smash", "ground", 5))
+        self.assertEqual(args.snapshot, framedata.default_snapshot_path)
+
+    def test_bad_arguments_exit_with_usage(self):
+        for argv in ([], ["stats"], ["query", "--section", "misc"], ["query", "--limit", "many"],
+                     ["query", "mario", "--frobnicate"]):
+            with self.subTest(argv=argv):
+                with contextlib.redirect_stderr(io.StringIO()), self.assertRaises(SystemExit) as raised:
+                    framedata.main(argv)
+                self.assertEqual(raised.exception.code, 2)
+
+class QueryTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.mkdtemp()
+        cls.snapshot_path = os.path.join(cls.directory, "roster.snap")
+        cls.roster = [rosterscraper.parse_character_html(name, html) for name, html in corpus.load_corpus(
+            characters=["mario", "mii_brawler"])]
+        rostersnapshot.save_snapshot(cls.snapshot_path, cls.roster)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.directory)
+
+    def query(self, *argv):
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            error = framedata.main(["query", "--snapshot", self.snapshot_path] + list(argv))
+        return error, out.getvalue()
+
+    def test_list(self):
+        self.assertEqual(self.query("--list"), (None, "mario\tMario\nmii_brawler\tMii Brawler\n"))
+
+    def test_character(self):
+        error, out = self.query("Mii Brawler")
+        self.assertIsNone(error)
+        self.assertEqual(json.loads(out), self.roster[1].to_dict())
+
+    def test_move(self):
+        error, out = self.query("mario", "up smash")
+        self.assertIsNone(error)
+        self.assertEqual(json.loads(out)["section"], "ground")
+        self.assertEqual(json.loads(out)["move"]["movename"], "Up Smash")
+
+    def test_misses_are_returned_as_messages(self):
+        self.assertEqual(self.query("wario"), ("No character named wario", ""))
+        self.assertEqual(self.query("mario", "Up Smash", "--section", "aerial"),
+                         ("mario has no move named Up Smash", ""))
+        self.assertEqual(self.query(), ("Give a character, --list or --search", ""))
+
+    def test_search(self):
+        error, out = self.query("--search", "up smash", "--limit", "1")
+        self.assertIsNone(error)
+        self.assertEqual(len(out.splitlines()), 1)
+        self.assertIn("Up Smash", out)
+
+    def test_missing_snapshot(self):
+        error = framedata.main(["query", "--snapshot", os.path.join(self.directory, "nope.snap"), "--list"])
+        self.assertIn("There's no roster snapshot at", error)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+"""Checks FrameDataIndex's rankings, including moves and characters whose
+fields are missing or have no number in them."""
+import os
+import sys
+import unittest
+
+root = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+sys.path.insert(0, root)
+sys.path.insert(0, os.path.join(root, 'benchmarks'))
+
+import character as dto
+import corpus
+import framedataquery
+import moveschema
+import rosterscraper
+
+def attack(name, startup, advantage=None, landing_lag="--"):
+    fields = {"movename": name, "startup": startup, "basedamage": "5.0%", "shieldlag": "4", "shieldstun": "3",
+              "totalframes": "30", "landinglag": landing_lag}
+    if advantage is not None:
+        fields["advantage"] = advantage
+    return moveschema.attack.build(fields)
+
+def character(name, ground, weight, oos):
+    misc = {key: "1.0" for _, key in dto.CharacterMiscAttributes.attribute_keys}
+    misc["weight"] = weight
+    misc["oos"] = [{"move": move, "startup": startup} for move, startup in oos]
+    return dto.Character(name, ground, [], [], [], [], misc)
+
+class FrameDataIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.index = framedataquery.FrameDataIndex([
+            character("alpha", [attack("Jab", "4", "-12"), attack("Smash", "15", "-30", landing_lag="12")],
+                      "100", [("Up B", 5), ("Neutral Air", 8)]),
+            character("beta", [attack("Jab", "2-3", "-8 to -4"), attack("Grab Attack", "--")],
+                      "--", [("Up Smash", 3)]),
+            character("gamma", [attack("Jab", "Frame 6 (Hit 1)"), attack("Counter", None)],
+                      "95.5", [])
+        ])
+
+    def names(self, refs):
+        return [(r.character_name, r.move.name) for r in refs]
+
+    def test_top_moves_rank_by_the_first_number(self):
+        self.assertEqual(self.names(self.index.top_moves("startup", k=3)),
+                         [("beta", "Jab"), ("alpha", "Jab"), ("gamma", "Jab")])
+        self.assertEqual(self.names(self.index.top_moves("startup", k=1, highest=True)), [("alpha", "Smash")])
+
+    def test_moves_without_a_number_are_left_out(self):
+        # Grab Attack's startup is "--" and Counter's is missing
+        self.assertEqual(len(self.index.top_moves("startup", k=10)), 4)
+        # Only the moves that list their advantage are ranked by it
+        self.assertEqual(self.names(self.index.top_moves("advantage", k=10, highest=True)),
+                         [("beta", "Jab"), ("alpha", "Jab"), ("alpha", "Smash")])
+        self.assertEqual(self.names(self.index.moves_in_range("landing_lag", low=0)), [("alpha", "Smash")])
+
+    def test_top_moves_of_nothing(self):
+        self.assertEqual(self.index.top_moves("startup", k=0), [])
+        self.assertEqual(self.index.top_moves("shield_lag", k=-1, highest=True), [])
+
+    def test_top_characters(self):
+        heaviest = self.index.top_characters("weight", k=5)
+        # beta's weight isn't a number, so it's not ranked at all
+        self.assertEqual([c.character_name for c in heaviest], ["alpha", "gamma"])
+        self.assertEqual([c.character_name for c in self.index.top_characters("weight", k=1, highest=False)],
+                         ["gamma"])
+        self.assertEqual(self.index.top_characters("weight", k=0), [])
+
+    def test_fastest_out_of_shield(self):
+        self.assertEqual(self.index.fastest_out_of_shield(k=2),
+                         [("beta", "Up Smash", 3), ("alpha", "Up B", 5)])
+        self.assertEqual(self.index.fastest_out_of_shield(k=10, max_startup=5),
+                         [("beta", "Up Smash", 3), ("alpha", "Up B", 5)])
+        self.assertEqual(self.index.fastest_out_of_shield(k=1, max_startup=10), [("beta", "Up Smash", 3)])
+        self.assertEqual(self.index.fastest_out_of_shield(k=0), [])
+
+class CorpusIndexTest(unittest.TestCase):
+    def test_every_field_is_keyed_by_the_typed_value(self):
+        roster = [rosterscraper.parse_character_html(name, html) for name, html in corpus.load_corpus()]
+        index = framedataquery.FrameDataIndex(roster)
+        for field, attribute in index.move_fields.items():
+            with self.subTest(field=field):
+                ranked = index.top_moves(field, k=len(index.moves))
+                values = [getattr(r.move, attribute).first for r in ranked]
+                self.assertEqual(values, sorted(values))
+                expected = sum(1 for r in index.moves if getattr(r.move, attribute, None) is not None)
+                self.assertEqual(len(ranked), expected)
+                self.assertGreater(len(ranked), 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+"""Checks that FrameDataStore round trips characters and keeps them in roster order."""
+import os
+import sys
+import unittest
+
+root = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+sys.path.insert(0, root)
+sys.path.insert(0, os.path.join(root, 'benchmarks'))
+
+import character as dto
+import corpus
+import framedatastore
+import moveschema
+import rosterscraper
+
+class FrameDataStoreTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.roster = [rosterscraper.parse_character_html(name, html) for name, html in corpus.load_corpus(
+            characters=["mario", "bowser", "cloud", "terry"])]
+
+    def setUp(self):
+        self.store = framedatastore.FrameDataStore(":memory:")
+
+    def tearDown(self):
+        self.store.close()
+
+    def test_round_trip(self):
+        self.store.save_roster(self.roster)
+        self.assertEqual([c.to_dict() for c in self.store.load_roster()], [c.to_dict() for c in self.roster])
+
+    def test_characters_load_in_roster_order_whatever_order_they_were_saved_in(self):
+        names = [c.character_name for c in self.roster]
+        self.store.set_roster_order(names)
+        for char in reversed(self.roster):
+            self.store.save_character(char)
+        self.assertEqual(self.store.character_names(), names)
+        self.assertEqual([c.character_name for c in self.store.load_roster()], names)
+        self.assertEqual([c.character_name for c in self.store.iter_roster(batch_size=3)], names)
+
+    def test_characters_missing_from_the_roster_order_go_last(self):
+        self.store.set_roster_order(["terry", "mario"])
+        self.store.save_roster(self.roster)
+        self.assertEqual(self.store.character_names(), ["terry", "mario", "bowser", "cloud"])
+
+    def test_moves_missing_optional_fields_round_trip(self):
+        mario = self.roster[0]
+        attack = moveschema.attack.build({"movename": "Odd Jab", "startup": "3", "basedamage": "2.0%",
+                                          "shieldlag": "4", "shieldstun": "2"})
+        dodge = moveschema.dodge.build({"movename": "Odd Roll"})
+        char = dto.Character("mario", mario.section_moves["ground"] + [attack], mario.section_moves["aerial"],
+                             mario.section_moves["special"], mario.section_moves["throw"],
+                             mario.section_moves["dodge"] + [dodge], mario.misc_data.to_attributes_dict())
+        self.store.save_character(char)
+        loaded = self.store.load_character("mario")
+        self.assertEqual(loaded.to_dict(), char.to_dict())
+        self.assertIsNone(loaded.find_move("Odd Jab").advantage)
+        self.assertIsNone(loaded.find_move("Odd Roll").total_frames)
+
+if __name__ == '__main__':
+    unittest.main()
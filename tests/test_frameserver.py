@@ -0,0 +1,69 @@
+"""Checks the error responses of FrameDataService."""
+import json
+import os
+import sys
+import unittest
+
+root = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+sys.path.insert(0, root)
+sys.path.insert(0, os.path.join(root, 'benchmarks'))
+
+import corpus
+import frameserver
+import rosterscraper
+
+def corpus_roster():
+    return [rosterscraper.parse_character_html(name, html) for name, html in corpus.load_corpus()]
+
+class FrameDataServiceTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.fail_reload = False
+        roster = corpus_roster()
+
+        def load_roster():
+            if self.fail_reload:
+                raise RuntimeError("the database is gone")
+            return roster
+        self.service = frameserver.FrameDataService(load_roster)
+        await self.service.reload()
+
+    async def get(self, target, method="GET"):
+        status, body, _ = await self.service.handle(method, target)
+        return status, json.loads(body)
+
+    async def test_top_k_must_be_positive(self):
+        for query in ("top-moves?field=startup", "top-characters?field=weight", "out-of-shield?x=1"):
+            for k in ("0", "-2"):
+                status, body = await self.get("/query/{0}&k={1}".format(query, k))
+                self.assertEqual(status, 400, query)
+                self.assertIn("k", body["error"])
+        status, body = await self.get("/query/top-moves?field=startup&k=3")
+        self.assertEqual((status, len(body)), (200, 3))
+
+    async def test_search_limit_must_be_positive(self):
+        status, body = await self.get("/search?q=intangible&limit=0")
+        self.assertEqual(status, 400)
+        self.assertIn("limit", body["error"])
+        status, body = await self.get("/search?q=intangible&limit=2")
+        self.assertEqual((status, len(body)), (200, 2))
+
+    async def test_unexpected_error_is_a_json_500(self):
+        self.fail_reload = True
+        with self.assertLogs("frameserver", "ERROR") as logs:
+            status, body = await self.get("/reload", "POST")
+        self.assertEqual(status, 500)
+        self.assertEqual(body, {"error": "Internal server error"})
+        self.assertIn("the database is gone", "\n".join(logs.output))
+        self.assertIn(500, frameserver.HttpServer.reasons)
+        # The old snapshot is still served
+        status, _ = await self.get("/characters/mario")
+        self.assertEqual(status, 200)
+
+    async def test_failed_signal_reload_is_logged(self):
+        self.fail_reload = True
+        with self.assertLogs("frameserver", "ERROR") as logs:
+            await frameserver.reload_on_signal(self.service)
+        self.assertIn("SIGHUP", logs.output[0])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+"""Checks that HitboxMirror downloads each url once and stores each distinct
+gif once, whichever urls it came from."""
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+import hitboxmirror
+
+class StubAssetFetcher(object):
+    """Serves the bytes of each url from a dictionary, like AsyncPageFetcher.fetch_asset"""
+    def __init__(self, assets):
+        self.assets = assets
+        self.requests = []
+
+    async def fetch_asset(self, url):
+        self.requests.append(url)
+        await asyncio.sleep(0)
+        if url not in self.assets:
+            raise IOError("no such asset {0}".format(url))
+        return self.assets[url]
+
+def stored_files(asset_dir):
+    return sorted(f for _, _, files in os.walk(os.path.join(asset_dir, 'objects')) for f in files)
+
+class HitboxMirrorTest(unittest.TestCase):
+    def setUp(self):
+        self.asset_dir = tempfile.mkdtemp()
+        self.fetcher = StubAssetFetcher({
+            "https://site/hitboxes/mario/jab.gif": b"jab",
+            "https://site/hitboxes/drmario/jab.gif": b"jab",
+            "https://site/hitboxes/mario/utilt.gif": b"utilt"
+        })
+
+    def tearDown(self):
+        shutil.rmtree(self.asset_dir)
+
+    def mirror(self, urls):
+        store = hitboxmirror.AssetStore(self.asset_dir)
+        return store, asyncio.run(hitboxmirror.HitboxMirror(store, self.fetcher).mirror(urls))
+
+    def test_urls_with_the_same_content_share_one_file(self):
+        urls = sorted(self.fetcher.assets)
+        store, (downloaded, skipped, duplicates, failures) = self.mirror(urls + urls[:1])
+        self.assertEqual((downloaded, skipped, duplicates, failures), (3, 0, 1, {}))
+        # Each url is downloaded once, but the clone's jab is only stored once
+        self.assertEqual(sorted(self.fetcher.requests), urls)
+        self.assertEqual(len(stored_files(self.asset_dir)), 2)
+        self.assertEqual(store.file_count(), 2)
+        self.assertEqual(store.filename_for(urls[0]), store.filename_for(urls[1]))
+
+    def test_mirrored_urls_are_skipped_on_the_next_run(self):
+        urls = sorted(self.fetcher.assets)
+        self.mirror(urls[:1])
+        self.fetcher.requests = []
+        _, (downloaded, skipped, duplicates, _) = self.mirror(urls)
+        self.assertEqual((downloaded, skipped, duplicates), (2, 1, 1))
+        self.assertNotIn(urls[0], self.fetcher.requests)
+        self.assertEqual(len(stored_files(self.asset_dir)), 2)
+
+    def test_failed_downloads_are_reported_and_not_indexed(self):
+        missing = "https://site/hitboxes/mario/missing.gif"
+        store, (downloaded, _, _, failures) = self.mirror([missing, "https://site/hitboxes/mario/utilt.gif"])
+        self.assertEqual(downloaded, 1)
+        self.assertEqual(list(failures), [missing])
+        self.assertIsNone(store.filename_for(missing))
+
+    def test_put_only_writes_new_content(self):
+        store = hitboxmirror.AssetStore(self.asset_dir)
+        filename, written = store.put("https://site/a.gif", b"gif")
+        self.assertTrue(written)
+        self.assertEqual(store.put("https://site/b.gif", b"gif"), (filename, False))
+        # A store opened later knows the file is already there
+        self.assertEqual(hitboxmirror.AssetStore(self.asset_dir).put("https://site/c.gif", b"gif"), (filename, False))
+        self.assertEqual(stored_files(self.asset_dir), [filename])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+"""Checks that moves are classified by their section and layout into the same
+DTOs the scraper built from the number of fields, over the frozen benchmark corpus."""
+import os
+import sys
+import unittest
+
+root = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+sys.path.insert(0, root)
+sys.path.insert(0, os.path.join(root, 'benchmarks'))
+
+import character as dto
+import corpus
+import lxmlengine
+import moveschema
+
+def key_count_dto_class(parsed_data):
+    """The DTO class the scraper picked by counting fields, before moveschema"""
+    keys = len(parsed_data)
+    if keys == 4 or keys == 5:
+        return dto.CharacterDodge
+    elif parsed_data["movename"].lower() == "spot dodge attack":
+        return dto.TerryDodge
+    elif keys == 7:
+        return dto.CharacterThrow
+    elif keys == 8:
+        return dto.CharacterThrowActiveFrames
+    return dto.CharacterAttack
+
+class ClassifyTest(unittest.TestCase):
+    def test_counter_in_specials_is_a_dodge(self):
+        present = frozenset(["movename", "totalframes", "landinglag", "notes"])
+        self.assertIs(moveschema.classify("special", present), moveschema.dodge)
+
+    def test_unknown_layout_raises(self):
+        with self.assertRaises(moveschema.MoveLayoutError):
+            moveschema.classify("ground", frozenset(["startup", "notes"]))
+
+class CorpusDispatchTest(unittest.TestCase):
+    def test_dto_classes_match_key_count_dispatch(self):
+        pages = corpus.load_corpus()
+        for engine_name, engine_class in sorted(lxmlengine.engines.items()):
+            for name, html in pages:
+                scraper = engine_class(name)
+                sections = scraper.get_sections(scraper.parse_page(html))
+                for section_name, section in zip(scraper.section_names[:5], sections[:5]):
+                    for container in scraper.get_move_containers(section):
+                        expected = key_count_dto_class(scraper.extract_move_data(container))
+                        move = scraper.create_move(scraper.extract_move_data(container, section_name), section_name)
+                        with self.subTest(engine=engine_name, character=name, move=move.name):
+                            self.assertIs(type(move), expected)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+"""Checks searching the move index and keeping the saved index in step with its snapshot."""
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+root = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+sys.path.insert(0, root)
+sys.path.insert(0, os.path.join(root, 'benchmarks'))
+
+import corpus
+import movesearch
+import rostersnapshot
+import rosterscraper
+
+class MoveSearchTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.roster = [rosterscraper.parse_character_html(name, html) for name, html in corpus.load_corpus()]
+        cls.index = movesearch.MoveSearchIndex.build(cls.roster)
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.snapshot_path = os.path.join(self.temp_dir, "roster.snap")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_search(self):
+        hits = self.index.search("armor", character="terry")
+        self.assertEqual([h.move_name for h in hits], ["Spot Dodge Attack"])
+        self.assertEqual(self.index.search("nuetral air", limit=None)[0].move_name, "Neutral Air")
+        self.assertEqual(len(self.index.search("intangible", limit=5)), 5)
+
+    def test_limit_below_one_finds_nothing(self):
+        for limit in (0, -1):
+            self.assertEqual(self.index.search("intangible", limit=limit), [])
+
+    def test_index_is_rebuilt_when_the_snapshot_changes(self):
+        rostersnapshot.save_snapshot(self.snapshot_path, self.roster[:2])
+        movesearch.build_for_snapshot(self.snapshot_path)
+        self.assertEqual(len(movesearch.load_for_snapshot(self.snapshot_path).docs),
+                         sum(len(c.section_moves[s]) for c in self.roster[:2] for s in c.sections))
+
+        rostersnapshot.save_snapshot(self.snapshot_path, self.roster)
+        index_path = movesearch.index_path_for_snapshot(self.snapshot_path)
+        stamp = movesearch.rostermanifest.snapshot_stamp(self.snapshot_path)
+        self.assertIsNone(movesearch.MoveSearchIndex.load(index_path, stamp))
+        self.assertEqual(len(movesearch.load_for_snapshot(self.snapshot_path).docs), len(self.index.docs))
+        self.assertIsNotNone(movesearch.MoveSearchIndex.load(index_path, stamp))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+"""Checks the page cache's index batching and eviction."""
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+import pagecache
+
+class PageCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.index_path = os.path.join(self.cache_dir, pagecache.PageCache.index_filename)
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def saved_index(self):
+        if not os.path.exists(self.index_path):
+            return {}
+        with open(self.index_path) as index_file:
+            return json.load(index_file)
+
+    def test_index_is_written_on_flush(self):
+        cache = pagecache.PageCache(self.cache_dir, flush_every=100)
+        for i in range(10):
+            cache.put("char{0}".format(i), "<html>{0}</html>".format(i))
+        self.assertEqual(self.saved_index(), {})
+        cache.flush()
+        self.assertEqual(len(self.saved_index()), 10)
+        reopened = pagecache.PageCache(self.cache_dir)
+        self.assertEqual(reopened.get("char3"), "<html>3</html>")
+
+    def test_index_is_written_every_flush_every_puts(self):
+        cache = pagecache.PageCache(self.cache_dir, flush_every=4)
+        for i in range(6):
+            cache.put("char{0}".format(i), "<html>{0}</html>".format(i))
+        self.assertEqual(len(self.saved_index()), 4)
+
+    def test_eviction_drops_the_least_recently_used(self):
+        cache = pagecache.PageCache(self.cache_dir, max_bytes=50)
+        cache.put("old", "<html>" + "a" * 10 + "</html>")
+        cache.put("new", "<html>" + "b" * 10 + "</html>")
+        cache.put("newest", "<html>" + "c" * 10 + "</html>")
+        cache.flush()
+        self.assertEqual(sorted(self.saved_index()), ["new", "newest"])
+        self.assertIsNone(cache.get("old", allow_stale=True))
+
+    def body_files(self):
+        return [f for _, _, files in os.walk(os.path.join(self.cache_dir, "objects")) for f in files]
+
+    def test_replaced_body_is_deleted(self):
+        cache = pagecache.PageCache(self.cache_dir)
+        cache.put("mario", "<html>shared</html>")
+        cache.put("luigi", "<html>shared</html>")
+        cache.put("mario", "<html>mario</html>")
+        self.assertEqual(len(self.body_files()), 2)
+        cache.put("luigi", "<html>luigi</html>")
+        cache.put("luigi", "<html>luigi</html>")
+        self.assertEqual(len(self.body_files()), 2)
+        self.assertEqual(cache.get("luigi"), "<html>luigi</html>")
+
+    def test_unreferenced_bodies_count_against_the_cap(self):
+        cache = pagecache.PageCache(self.cache_dir, flush_every=100)
+        for i in range(5):
+            cache.put("lost{0}".format(i), "<html>{0}</html>".format("x" * 20 + str(i)))
+        # The index is never flushed, so the next cache only finds the bodies
+        cache = pagecache.PageCache(self.cache_dir, max_bytes=100)
+        self.assertEqual(len(self.body_files()), 5)
+        cache.put("mario", "<html>mario</html>")
+        self.assertEqual(len(self.body_files()), 1)
+        self.assertEqual(cache.get("mario"), "<html>mario</html>")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+"""Checks that ParseFarm parses the same characters with or without worker
+processes, and reports broken pages and metrics either way."""
+import os
+import sys
+import unittest
+
+root = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+sys.path.insert(0, root)
+sys.path.insert(0, os.path.join(root, 'benchmarks'))
+
+import corpus
+import parsefarm
+import rosterscraper
+import scrapemetrics
+
+class ParseFarmTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.pages = list(corpus.load_corpus())
+        cls.expected = {name: rosterscraper.parse_character_html(name, html).to_dict() for name, html in cls.pages}
+
+    def parsed(self, farm, pages):
+        return {r.name: r for r in farm.parse(pages)}
+
+    def test_workers_match_a_serial_parse(self):
+        for workers, chunk_size in ((1, None), (2, None), (2, 3)):
+            with self.subTest(workers=workers, chunk_size=chunk_size):
+                results = self.parsed(parsefarm.ParseFarm(workers, chunk_size), self.pages)
+                self.assertEqual({n: r.character.to_dict() for n, r in results.items()}, self.expected)
+
+    def test_a_broken_page_fails_alone(self):
+        pages = self.pages[:2] + [("nobody", "<html><body>not a frame data page</body></html>")]
+        for workers in (1, 2):
+            with self.subTest(workers=workers):
+                results = self.parsed(parsefarm.ParseFarm(workers), pages)
+                self.assertEqual(sorted(n for n, r in results.items() if r.ok), sorted(n for n, _ in self.pages[:2]))
+                self.assertFalse(results["nobody"].ok)
+        # A worker's exception comes back as a ParseError carrying its message
+        self.assertIsInstance(self.parsed(parsefarm.ParseFarm(2), pages)["nobody"].error, parsefarm.ParseError)
+
+    def test_no_pages(self):
+        self.assertEqual(list(parsefarm.ParseFarm(2).parse([])), [])
+
+    def test_stages_are_recorded_from_the_workers(self):
+        for workers in (1, 2):
+            with self.subTest(workers=workers):
+                metrics = scrapemetrics.MetricsRecorder()
+                list(parsefarm.ParseFarm(workers, metrics=metrics).parse(self.pages))
+                summary = metrics.summary()
+                self.assertEqual(summary["stages"]["parse"]["calls"], len(self.pages))
+                self.assertIn("move_extraction", summary["stages"])
+                self.assertEqual(sorted(summary["characters"]), sorted(n for n, _ in self.pages))
+
+    def test_workers_are_not_forked(self):
+        # Pools start while fetch threads are running, which fork isn't safe with
+        self.assertIn(rosterscraper.parse_pool_context().get_start_method(), ("forkserver", "spawn"))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+"""Checks that a saved roster manifest is only trusted while its snapshot is
+unchanged, and that lookups through it match the snapshot."""
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+root = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+sys.path.insert(0, root)
+sys.path.insert(0, os.path.join(root, 'benchmarks'))
+
+import corpus
+import rostermanifest
+import rostersnapshot
+import rosterscraper
+
+class RosterManifestTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.roster = [rosterscraper.parse_character_html(name, html) for name, html in corpus.load_corpus(
+            characters=["mario", "bowser", "mii_brawler"])]
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.snapshot_path = os.path.join(self.directory, "roster.snap")
+        self.manifest_path = rostermanifest.manifest_path_for_snapshot(self.snapshot_path)
+        rostersnapshot.save_snapshot(self.snapshot_path, self.roster)
+        rostermanifest.build_for_snapshot(self.snapshot_path)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_saved_manifest_is_used_while_the_snapshot_is_unchanged(self):
+        manifest = rostermanifest.RosterManifest.load(self.manifest_path, self.snapshot_path)
+        self.assertEqual([e.slug for e in manifest.entries], ["mario", "bowser", "mii_brawler"])
+        self.assertEqual(manifest.stamp, rostermanifest.snapshot_stamp(self.snapshot_path))
+
+    def test_rewritten_snapshot_invalidates_the_manifest(self):
+        rostersnapshot.save_snapshot(self.snapshot_path, self.roster[:2])
+        self.assertIsNone(rostermanifest.RosterManifest.load(self.manifest_path, self.snapshot_path))
+        manifest = rostermanifest.load_for_snapshot(self.snapshot_path)
+        self.assertEqual([e.slug for e in manifest.entries], ["mario", "bowser"])
+        # The rebuilt manifest was saved, so the next load uses it
+        self.assertIsNotNone(rostermanifest.RosterManifest.load(self.manifest_path, self.snapshot_path))
+
+    def test_touched_snapshot_of_the_same_size_invalidates_the_manifest(self):
+        stat = os.stat(self.snapshot_path)
+        os.utime(self.snapshot_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000))
+        self.assertIsNone(rostermanifest.RosterManifest.load(self.manifest_path, self.snapshot_path))
+
+    def test_other_format_versions_and_unreadable_files_are_rebuilt(self):
+        with open(self.manifest_path) as manifest_file:
+            data = json.load(manifest_file)
+        data["format"] = rostermanifest.FORMAT_VERSION + 1
+        with open(self.manifest_path, 'w') as manifest_file:
+            json.dump(data, manifest_file)
+        self.assertIsNone(rostermanifest.RosterManifest.load(self.manifest_path, self.snapshot_path))
+        with open(self.manifest_path, 'w') as manifest_file:
+            manifest_file.write("{not json")
+        self.assertIsNone(rostermanifest.RosterManifest.load(self.manifest_path, self.snapshot_path))
+        os.remove(self.manifest_path)
+        self.assertEqual(len(rostermanifest.load_for_snapshot(self.snapshot_path).entries), 3)
+
+    def test_lookup_by_slug_or_display_name(self):
+        manifest = rostermanifest.load_for_snapshot(self.snapshot_path)
+        self.assertEqual(manifest.find("Mii Brawler").slug, "mii_brawler")
+        self.assertEqual(manifest.find("mii brawler").slug, "mii_brawler")
+        self.assertEqual(manifest.find("BOWSER").slug, "bowser")
+        self.assertIsNone(manifest.find("wario"))
+        self.assertEqual(manifest.load_character("bowser").to_dict(), self.roster[1].to_dict())
+        self.assertIsNone(manifest.load_character("wario"))
+
+    def test_display_names(self):
+        self.assertEqual(rostermanifest.display_name("rosalina_and_luma"), "Rosalina and Luma")
+        self.assertEqual(rostermanifest.display_name("mr_game_and_watch"), "Mr. Game & Watch")
+        self.assertEqual(rostermanifest.display_name("mario"), "Mario")
+
+if __name__ == '__main__':
+    unittest.main()
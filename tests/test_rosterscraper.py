@@ -0,0 +1,47 @@
+"""Checks that IncrementalScraper only stores sections that make a whole character."""
+import os
+import sys
+import unittest
+
+root = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+sys.path.insert(0, root)
+sys.path.insert(0, os.path.join(root, 'benchmarks'))
+
+import corpus
+import framedatastore
+import rosterscraper
+
+class IncrementalScraperTest(unittest.TestCase):
+    def setUp(self):
+        self.store = framedatastore.FrameDataStore(":memory:")
+        self.scraper = rosterscraper.IncrementalScraper(["mario"], self.store, max_workers=1)
+        _, html = corpus.load_corpus(characters=["mario"])[0]
+        self.hashes, self.section_data = rosterscraper.parse_changed_sections("mario", html, {})
+        self.scraper.handle_parsed("mario", (self.hashes, self.section_data))
+
+    def tearDown(self):
+        self.store.close()
+
+    def test_changed_section_is_merged_with_the_stored_ones(self):
+        hashes = dict(self.hashes, ground="changed", page="changed")
+        ground = self.section_data["ground"][:2]
+        result = self.scraper.handle_parsed("mario", (hashes, {"ground": ground}))
+        self.assertEqual(len(result.character.section_moves["ground"]), 2)
+        self.assertEqual(len(result.character.section_moves["aerial"]), len(self.section_data["aerial"]))
+        self.assertEqual(self.store.get_hashes("mario")["ground"], "changed")
+
+    def test_section_that_cannot_build_a_character_is_not_saved(self):
+        hashes = dict(self.hashes, misc="changed", page="changed")
+        with self.assertRaises(KeyError):
+            self.scraper.handle_parsed("mario", (hashes, {"misc": {"weight": "98"}}))
+        self.assertEqual(self.store.get_hashes("mario"), self.hashes)
+        stored = self.store.load_character("mario")
+        self.assertEqual(stored.misc_data.to_attributes_dict(), self.section_data["misc"])
+
+    def test_missing_section_without_stored_character_raises(self):
+        with self.assertRaises(ValueError):
+            self.scraper.handle_parsed("luigi", ({"ground": "h"}, {"ground": self.section_data["ground"]}))
+        self.assertEqual(self.store.get_hashes("luigi"), {})
+
+if __name__ == '__main__':
+    unittest.main()
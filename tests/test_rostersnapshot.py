@@ -0,0 +1,79 @@
+"""Checks that rostersnapshot round trips a roster and rejects files that aren't snapshots."""
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+root = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+sys.path.insert(0, root)
+sys.path.insert(0, os.path.join(root, 'benchmarks'))
+
+import corpus
+import rostersnapshot
+import rosterscraper
+
+class SnapshotReaderTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, "roster.snap")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def write(self, data):
+        with open(self.path, 'wb') as snapshot_file:
+            snapshot_file.write(data)
+
+    def test_round_trip(self):
+        roster = [rosterscraper.parse_character_html(name, html) for name, html in corpus.load_corpus()]
+        rostersnapshot.save_snapshot(self.path, roster)
+        with rostersnapshot.SnapshotReader(self.path) as reader:
+            self.assertEqual(reader.character_names(), [c.character_name for c in roster])
+            self.assertEqual([c.to_dict() for c in reader.load_roster()], [c.to_dict() for c in roster])
+
+    def test_saves_from_a_generator_and_leaves_no_temp_files(self):
+        roster = [rosterscraper.parse_character_html(name, html) for name, html in corpus.load_corpus(
+            characters=["mario", "cloud"])]
+        rostersnapshot.save_snapshot(self.path, (c for c in roster))
+        self.assertEqual(os.listdir(self.temp_dir), ["roster.snap"])
+        with rostersnapshot.SnapshotReader(self.path) as reader:
+            self.assertEqual([c.to_dict() for c in reader.load_roster()], [c.to_dict() for c in roster])
+
+    def test_failed_save_keeps_the_old_snapshot(self):
+        roster = [rosterscraper.parse_character_html(name, html) for name, html in corpus.load_corpus(
+            characters=["mario", "cloud"])]
+        rostersnapshot.save_snapshot(self.path, roster)
+        with open(self.path, 'rb') as snapshot_file:
+            saved = snapshot_file.read()
+
+        def failing_roster():
+            yield roster[0]
+            raise IOError("the database went away")
+        with self.assertRaises(IOError):
+            rostersnapshot.save_snapshot(self.path, failing_roster())
+        self.assertEqual(os.listdir(self.temp_dir), ["roster.snap"])
+        with open(self.path, 'rb') as snapshot_file:
+            self.assertEqual(snapshot_file.read(), saved)
+
+    def test_empty_file_is_too_short(self):
+        self.write(b"")
+        with self.assertRaisesRegex(rostersnapshot.SnapshotFormatError, "too short"):
+            rostersnapshot.SnapshotReader(self.path)
+
+    def test_other_file_is_rejected(self):
+        self.write(b"<html>not a snapshot</html>")
+        with self.assertRaisesRegex(rostersnapshot.SnapshotFormatError, "isn't a roster snapshot"):
+            rostersnapshot.SnapshotReader(self.path)
+
+    def test_truncated_directory_is_rejected(self):
+        roster = [rosterscraper.parse_character_html(name, html) for name, html in corpus.load_corpus(
+            characters=["mario", "kirby"])]
+        rostersnapshot.save_snapshot(self.path, roster)
+        with open(self.path, 'rb') as snapshot_file:
+            self.write(snapshot_file.read(rostersnapshot.header_struct.size + 4))
+        with self.assertRaisesRegex(rostersnapshot.SnapshotFormatError, "truncated"):
+            rostersnapshot.SnapshotReader(self.path)
+
+if __name__ == '__main__':
+    unittest.main()
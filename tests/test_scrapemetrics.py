@@ -0,0 +1,87 @@
+"""Checks MetricsRecorder's totals, percentiles and per-character timings,
+and that events from a worker replay into the same totals."""
+import io
+import json
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+import scrapemetrics
+
+class MetricsRecorderTest(unittest.TestCase):
+    def setUp(self):
+        self.metrics = scrapemetrics.MetricsRecorder()
+        for i in range(1, 101):
+            self.metrics.record("parse", i / 100.0, "mario" if i % 2 else "luigi")
+        self.metrics.record("storage", 0.5)
+        self.metrics.count("cache_hit", 1, "mario")
+        self.metrics.count("cache_hit", 2, "luigi")
+        self.metrics.count("bytes_downloaded", 2048)
+
+    def test_totals(self):
+        summary = self.metrics.summary()
+        self.assertEqual(summary["stages"]["parse"]["calls"], 100)
+        self.assertAlmostEqual(summary["stages"]["parse"]["seconds"], 50.5)
+        self.assertEqual(summary["stages"]["storage"]["calls"], 1)
+        self.assertEqual(summary["counters"], {"cache_hit": 3, "bytes_downloaded": 2048})
+
+    def test_percentiles(self):
+        parse = self.metrics.summary()["stages"]["parse"]
+        self.assertEqual((parse["p50"], parse["p95"], parse["max"]), (0.5, 0.95, 1.0))
+        storage = self.metrics.summary()["stages"]["storage"]
+        self.assertEqual((storage["p50"], storage["p95"], storage["max"]), (0.5, 0.5, 0.5))
+
+    def test_nearest_rank_percentile(self):
+        self.assertEqual(scrapemetrics.percentile([3], 50), 3)
+        self.assertEqual(scrapemetrics.percentile([1, 2, 3, 4], 50), 2)
+        self.assertEqual(scrapemetrics.percentile([1, 2, 3, 4], 51), 3)
+        self.assertEqual(scrapemetrics.percentile([1, 2, 3, 4], 100), 4)
+        self.assertEqual(scrapemetrics.percentile([1, 2, 3, 4], 0), 1)
+
+    def test_character_timings(self):
+        characters = self.metrics.summary()["characters"]
+        # The odd hundredths are mario's and the even ones luigi's; storage isn't anyone's
+        self.assertEqual(sorted(characters), ["luigi", "mario"])
+        self.assertAlmostEqual(characters["mario"]["parse"], 25.0)
+        self.assertAlmostEqual(characters["luigi"]["parse"], 25.5)
+
+    def test_replayed_events_count_like_local_ones(self):
+        worker = scrapemetrics.MetricsRecorder(keep_events=True)
+        with worker.timer("move_extraction", "peach"):
+            pass
+        worker.count("moves", 40, "peach")
+        self.metrics.replay(worker.events)
+        summary = self.metrics.summary()
+        self.assertEqual(summary["stages"]["move_extraction"]["calls"], 1)
+        self.assertEqual(summary["counters"]["moves"], 40)
+        self.assertIn("move_extraction", summary["characters"]["peach"])
+
+    def test_measured_call_times_the_whole_parse(self):
+        def parse(name, html, metrics=None):
+            metrics.count("moves", len(html), name)
+            return name.upper()
+        result, events = scrapemetrics.measured_call(parse, ("mario", "abc"))
+        self.assertEqual(result, "MARIO")
+        self.assertEqual([(e["kind"], e["name"], e["character"]) for e in events],
+                         [("counter", "moves", "mario"), ("timer", "parse", "mario")])
+
+    def test_callback_sees_every_event(self):
+        stream = io.StringIO()
+        metrics = scrapemetrics.MetricsRecorder(scrapemetrics.JsonLinesLog(stream))
+        metrics.record("fetch", 0.25, "mario")
+        metrics.count("retries")
+        events = [json.loads(line) for line in stream.getvalue().splitlines()]
+        self.assertEqual([(e["kind"], e["name"], e["value"]) for e in events],
+                         [("timer", "fetch", 0.25), ("counter", "retries", 1)])
+
+    def test_disabled_metrics_record_nothing(self):
+        disabled = scrapemetrics.disabled
+        self.assertFalse(disabled.enabled)
+        with disabled.timer("parse", "mario"):
+            disabled.count("moves", 3)
+        self.assertIs(disabled.timer("fetch"), disabled.timer("parse"))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+"""Checks what snapshotdiff reports between two rosters, and that unchanged
+characters in snapshot files are skipped without being decoded."""
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+root = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+sys.path.insert(0, root)
+sys.path.insert(0, os.path.join(root, 'benchmarks'))
+
+import corpus
+import rostersnapshot
+import rosterscraper
+import snapshotdiff
+
+def corpus_roster():
+    return [rosterscraper.parse_character_html(name, html) for name, html in corpus.load_corpus(
+        characters=["mario", "bowser", "cloud", "terry"])]
+
+class UnreadableRoster(dict):
+    """A roster that fails the test if a character is looked up"""
+    def __getitem__(self, name):
+        raise AssertionError("{0} was decoded".format(name))
+
+class SnapshotDiffTest(unittest.TestCase):
+    def setUp(self):
+        self.old = corpus_roster()
+        self.new = corpus_roster()
+
+    def diff(self):
+        return snapshotdiff.diff_rosters({c.character_name: c for c in self.old},
+                                         {c.character_name: c for c in self.new})
+
+    def test_identical_rosters(self):
+        diff = self.diff()
+        self.assertFalse(diff)
+        self.assertEqual(diff.unchanged_characters, 4)
+
+    def test_changed_added_and_removed_moves(self):
+        cloud = self.new[2]
+        cloud.section_moves["ground"][0].startup_frames = "99"
+        cloud.section_moves["aerial"].pop()
+        cloud.section_moves["aerial"].append(cloud.section_moves["ground"][1])
+        cloud.misc_data.weight = "200"
+        diff = self.diff()
+        self.assertEqual(diff.unchanged_characters, 3)
+        summary = [(c.character, c.section, c.name, c.status) for c in diff.changes]
+        self.assertEqual(summary, [
+            ("cloud", "ground", cloud.section_moves["ground"][0].name, "changed"),
+            ("cloud", "aerial", cloud.section_moves["ground"][1].name, "added"),
+            ("cloud", "aerial", "Down Air", "removed"),
+            ("cloud", "misc", None, "changed")
+        ])
+        self.assertEqual([c.to_dict() for c in diff.changes[0].changes],
+                         [{"field": "startup", "old": self.old[2].section_moves["ground"][0].startup_frames,
+                           "new": "99"}])
+        self.assertEqual(diff.changes[3].changes[0].to_dict(), {"field": "weight", "old": self.old[2].misc_data.weight,
+                                                                 "new": "200"})
+
+    def test_repeated_move_names_are_numbered(self):
+        mario = self.new[0]
+        mario.section_moves["ground"].append(mario.section_moves["ground"][0])
+        diff = self.diff()
+        first = mario.section_moves["ground"][0].name
+        self.assertEqual([(c.name, c.status) for c in diff.changes], [("{0} (2)".format(first), "added")])
+
+    def test_added_and_removed_characters(self):
+        diff = snapshotdiff.diff_rosters({c.character_name: c for c in self.old[:3]},
+                                         {c.character_name: c for c in self.new[1:]})
+        self.assertEqual(diff.added_characters, ["terry"])
+        self.assertEqual(diff.removed_characters, ["mario"])
+
+    def test_equal_digests_skip_the_lookup(self):
+        names = [c.character_name for c in self.old]
+        digests = {n: "same" for n in names}
+        diff = snapshotdiff.diff_rosters(UnreadableRoster.fromkeys(names), UnreadableRoster.fromkeys(names),
+                                         digests, dict(digests))
+        self.assertEqual(diff.unchanged_characters, 4)
+
+class SnapshotFileDiffTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_only_changed_characters_are_decoded(self):
+        old, new = corpus_roster(), corpus_roster()
+        new[3].section_moves["dodge"][0].total_frames = "40"
+        old_path, new_path = os.path.join(self.directory, "old.snap"), os.path.join(self.directory, "new.snap")
+        rostersnapshot.save_snapshot(old_path, old)
+        rostersnapshot.save_snapshot(new_path, new)
+
+        decoded = []
+        load_character = rostersnapshot.SnapshotReader.load_character
+
+        def recording_load(reader, name):
+            decoded.append(name)
+            return load_character(reader, name)
+        rostersnapshot.SnapshotReader.load_character = recording_load
+        try:
+            diff = snapshotdiff.diff_snapshot_files(old_path, new_path)
+        finally:
+            rostersnapshot.SnapshotReader.load_character = load_character
+        self.assertEqual(decoded, ["terry", "terry"])
+        self.assertEqual(diff.unchanged_characters, 3)
+        self.assertEqual([(c.character, c.section, c.status) for c in diff.changes], [("terry", "dodge", "changed")])
+
+if __name__ == '__main__':
+    unittest.main()